@@ -1,6 +1,7 @@
 import io
 import os
 import sys
+import argparse
 import subprocess
 import requests
 import zipfile
@@ -9,17 +10,46 @@ import shutil
 import logging
 import time
 import threading
-import pyautogui
+import hashlib
+import hmac
+import secrets
+import socket
+import socketserver
+import struct
+import zlib
+import uuid
+import errno
+import csv
+import re
+import atexit
+import random
+import tempfile
+import platform
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler, BaseHTTPRequestHandler
+from collections import OrderedDict
 import qtawesome as qta
+try:
+    # Optional: inotify/ReadDirectoryChangesW change events for live write-back, polling is used without it
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QMessageBox, QInputDialog,
                              QLabel, QVBoxLayout, QPushButton, QWidget, QFileDialog, QGridLayout,
-                             QProgressBar, QGroupBox)
-from PyQt5.QtGui import QPixmap, QPalette, QBrush, QFont
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+                             QProgressBar, QGroupBox, QListView, QLineEdit, QDialog, QListWidget,
+                             QListWidgetItem, QHBoxLayout)
+from PyQt5.QtGui import QPixmap, QPalette, QBrush, QFont, QIcon, QImage, QImageReader, QImageIOHandler
+from PyQt5.QtCore import (Qt, QThread, pyqtSignal, QObject, QRunnable, QThreadPool, QSize, QTimer,
+                          QAbstractListModel, QModelIndex, QSortFilterProxyModel)
+from xenia_client import DATA_ROOT_ENV, DAEMON_FILE, DaemonClient
 
 def resource_path(relative_path):
     """ Get absolute path to resource, works for dev and for PyInstaller """
-    base_path = os.path.dirname(os.path.abspath(sys.executable if getattr(sys, 'frozen', False) else __file__))
+    base_path = os.environ.get(DATA_ROOT_ENV) or \
+        os.path.dirname(os.path.abspath(sys.executable if getattr(sys, 'frozen', False) else __file__))
     return os.path.join(base_path, relative_path)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -35,6 +65,3433 @@ TOML_CONFIG_FILE = 'xenia-canary.config.toml'
 DEFAULT_CONFIG_FILE = resource_path('defaultconfig.toml')
 IMAGES_DIR = resource_path('images')
 MAIN_MENU_IMAGE = "main_menu_background.jpg"
+SHARED_BUILD_DIR = os.path.join(CORE_DIR, 'Xenia')  # The one emulator build every thin game folder launches
+XENIA_EXE = 'xenia_canary.exe'
+PORTABLE_MARKER = 'portable.txt'
+BUILDS_DIR = resource_path('Builds')  # Builds/<channel>/<version>/, never modified once installed
+BUILD_RETENTION = 3  # Unpinned, inactive builds kept per channel
+PATCHES_DIR = resource_path('Patches')
+DOWNLOADS_DIR = os.path.join(BASE_DIR, 'Update', 'Downloads')
+GITHUB_API_URL = "https://api.github.com"
+CANARY_RELEASES_PATH = "/repos/xenia-canary/xenia-canary/releases/latest"
+NON_CANARY_RELEASES_PATH = "/repos/xenia-project/release-builds-windows/releases/latest"
+RELEASE_CACHE_FILE = os.path.join(BASE_DIR, 'Update', 'release_cache.json')
+UPDATE_CHECK_INTERVAL = 6 * 3600  # Seconds between background checks that actually hit the network
+PATCHES_ZIP_URL = "https://github.com/xenia-canary/game-patches/archive/refs/heads/main.zip"
+PATCH_INDEX_FILE = resource_path('patch_index.json')
+CACHE_INDEX_FILE = resource_path('cache_index.json')
+BACKUPS_DIR = resource_path('Backups')
+MANIFESTS_DIR = resource_path('Manifests')  # Hash manifests of SaveData, the backup and installed builds
+SESSIONS_DIR = resource_path('Sessions')
+SYNC_CHUNK_SIZE = 1024 * 1024  # SaveData sync transfers files in chunks of this size, identified by SHA-256
+SYNC_MAX_HEADER = 64 * 1024 * 1024  # Largest JSON header a sync peer may send, i.e. the manifest of a big SaveData
+SYNC_MAX_PAYLOAD = SYNC_CHUNK_SIZE  # Payloads are single chunks, only ever sent compressed when that is smaller
+SYNC_MAX_HELLO = 4096  # The hello arrives before authentication, so it gets a much tighter limit
+SYNC_TIMEOUT = 60  # Seconds a sync peer may go silent; a busy server sends keep-alive frames meanwhile
+SYNC_KEEPALIVE_INTERVAL = 10
+SYNC_PORT = 47810
+SYNC_CONFLICTS_DIR = resource_path('SyncConflicts')  # Local saves that lost a sync conflict are kept here
+SESSION_CONFLICTS_DIR = resource_path('SessionConflicts')  # Session saves that SaveData changed under are kept here
+SYNC_CHUNK_CACHE = os.path.join(MANIFESTS_DIR, 'sync-chunks.json')
+SYNC_STATE_FILE = os.path.join(MANIFESTS_DIR, 'sync-state.json')  # Per peer: title fingerprints as of the last sync
+STAGING_DIR = resource_path('Staging')  # Per-instance copies of SaveData while a game runs
+SAVE_DATA_FOLDERS = ('cache', 'content')  # What gets written back to SaveData after a session
+SESSIONS_KEPT_PER_GAME = 10  # Older session folders are rotated out
+WRITE_BACK_DEBOUNCE = 2.0  # A changed save is copied back once it has been left alone this many seconds
+WRITE_BACK_POLL_INTERVAL = 10.0  # How often the staged folder is rescanned when watchdog isn't installed
+WRITE_BACK_MAX_RATE = 32 * 1024 * 1024  # Bytes per second live write-back may copy while the game runs
+PRESTAGE_MAX_RATE = 64 * 1024 * 1024  # Bytes per second for speculative staging of a game not launched yet
+PRESTAGE_MAX_BYTES = 8 * 1024 * 1024 * 1024  # SaveData bigger than this isn't staged speculatively
+SIZE_INDEX_MAX_AGE = 24 * 60 * 60  # Seconds before a size index is rebuilt from scratch instead of trusting folder mtimes
+FREE_SPACE_MARGIN = 256 * 1024 * 1024  # Left free on the target disk by any planned copy
+DEFAULT_THROUGHPUT = 100 * 1024 * 1024  # Bytes per second assumed for ETAs until an operation has been timed
+THROUGHPUT_FILE = os.path.join(MANIFESTS_DIR, 'throughput.json')  # Measured bytes per second per operation
+THUMBNAIL_SIZE = QSize(64, 64)
+THUMBNAIL_CACHE_SIZE = 256  # Max cover thumbnail icons kept by the games list
+IMAGE_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Memory cap for decoded images and their scaled variants
+
+TRACE_ENV = 'XENIA_MANAGER_TRACE'  # Set to a file name to record a trace of this run
+
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+NULL_SPAN = NullSpan()
+
+class Span:
+    __slots__ = ('tracer', 'name', 'attrs', 'start')
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type:
+            self.attrs['error'] = repr(exc)
+        self.tracer.record(self.name, self.start, time.perf_counter(), self.attrs)
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+class Tracer:
+    """ Records nested, timed spans and writes them as Chrome trace-event JSON, which chrome://tracing and
+    ui.perfetto.dev open as a timeline. While disabled span() returns one shared no-op object. """
+    def __init__(self):
+        self.enabled = False
+        self.output = None
+        self.events = []
+        self.thread_names = {}
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+
+    def enable(self, output):
+        if not self.enabled:
+            atexit.register(self.export)
+        self.output = output
+        self.enabled = True
+
+    def span(self, name, **attrs):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, attrs)
+
+    def record(self, name, start, end, attrs):
+        thread = threading.current_thread()
+        event = {"name": name, "ph": "X", "pid": os.getpid(), "tid": thread.ident,
+                 "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6, "args": attrs}
+        with self.lock:
+            self.events.append(event)
+            self.thread_names.setdefault(thread.ident, thread.name)
+
+    def export(self, path=None):
+        """ Writes the trace to path (or the enabled output); returns the number of spans written """
+        path = path or self.output
+        with self.lock:
+            events = list(self.events)
+            names = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+                     for tid, name in self.thread_names.items()]
+        if not path or not events:
+            return 0
+        temp_file = path + '.tmp'
+        with open(temp_file, 'w') as file:
+            json.dump({"traceEvents": names + events, "displayTimeUnit": "ms"}, file, default=str)
+        os.replace(temp_file, path)
+        logging.info(f"Wrote {len(events)} trace spans to {path}")
+        return len(events)
+
+tracer = Tracer()
+if os.environ.get(TRACE_ENV):
+    tracer.enable(os.path.abspath(os.environ[TRACE_ENV]))
+
+class GameRegistry:
+    """ In-memory index over config['games'] keyed by stable id, folder path and title ID """
+    def __init__(self, games):
+        self.by_id = {}
+        self.by_path = {}
+        self.by_title_id = {}
+        for game in games:
+            self._index(game)
+
+    @staticmethod
+    def new_id():
+        return uuid.uuid4().hex
+
+    @staticmethod
+    def path_key(path):
+        return os.path.normcase(os.path.normpath(path))
+
+    @staticmethod
+    def migrate(config):
+        """ Gives every game a unique UUID id (old configs used len(games)+1) and moves entries without a folder,
+        which could never be launched, to config['unusable_games'] so they can still be fixed by hand.
+        Returns True if anything changed. """
+        changed = False
+        seen = set()
+        games = config.get('games', [])
+        usable = [game for game in games if isinstance(game, dict) and game.get('path')]
+        if len(usable) != len(games):
+            for index, game in enumerate(games):
+                if not (isinstance(game, dict) and game.get('path')):
+                    logging.warning(f"Games config entry #{index + 1} has no game folder, moved to 'unusable_games': {game!r}")
+                    config.setdefault('unusable_games', []).append(game)
+            config['games'] = games = usable
+            changed = True
+        for game in games:
+            if not game.get('name'):
+                game['name'] = game['path']
+                changed = True
+            game_id = str(game.get('id', ''))
+            if len(game_id) != 32 or game_id in seen:
+                game['id'] = GameRegistry.new_id()
+                changed = True
+            if 'title_id' not in game:
+                game['title_id'] = ""
+                changed = True
+            if 'game_file' not in game:
+                game['game_file'] = ""
+                changed = True
+            seen.add(game['id'])
+        return changed
+
+    def _index(self, game):
+        self.by_id[game['id']] = game
+        self.by_path[self.path_key(game['path'])] = game
+        if game.get('title_id'):
+            self.by_title_id.setdefault(game['title_id'].upper(), []).append(game)
+
+    def _unindex(self, game):
+        self.by_id.pop(game['id'], None)
+        self.by_path.pop(self.path_key(game['path']), None)
+        title_id = game.get('title_id', '').upper()
+        if title_id in self.by_title_id:
+            self.by_title_id[title_id] = [g for g in self.by_title_id[title_id] if g['id'] != game['id']]
+            if not self.by_title_id[title_id]:
+                del self.by_title_id[title_id]
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __iter__(self):
+        return iter(self.by_id.values())
+
+    def get(self, game_id):
+        return self.by_id.get(game_id)
+
+    def find_by_path(self, path):
+        return self.by_path.get(self.path_key(path))
+
+    def find_by_title_id(self, title_id):
+        return list(self.by_title_id.get(title_id.upper(), []))
+
+    def add(self, name, path, image_path, title_id="", game_file=""):
+        if self.find_by_path(path):
+            raise ValueError(f"A game already uses the folder '{path}'.")
+        game = {"id": self.new_id(), "name": name, "path": path, "image_path": image_path, "title_id": title_id,
+                "game_file": game_file}
+        self._index(game)
+        return game
+
+    def update(self, game_id, **fields):
+        game = self.by_id[game_id]
+        self._unindex(game)
+        game.update(fields)
+        self._index(game)
+        return game
+
+    def remove(self, game_id):
+        game = self.by_id.get(game_id)
+        if game is not None:
+            self._unindex(game)
+        return game
+
+    def to_list(self):
+        return list(self.by_id.values())
+
+def default_config():
+    return {
+        "prompt_shown": False,
+        "fullscreen": False,
+        "games": []
+    }
+
+def load_config():
+    if not os.path.isfile(CONFIG_FILE):
+        save_config(default_config())
+    with open(CONFIG_FILE, 'r') as file:
+        config = json.load(file)
+    if GameRegistry.migrate(config):
+        logging.info("Migrated games config to stable game ids")
+        save_config(config)
+    if migrate_launch_options(config):
+        logging.info("Replaced the auto launch/fullscreen keypress options with direct boot")
+        save_config(config)
+    return config
+
+def migrate_launch_options(config):
+    """ Drops the old keypress automation settings, keeping the user's fullscreen choice. Returns True if anything changed. """
+    old_keys = [key for key in config if key.startswith(("auto_launch", "auto_fullscreen"))]
+    if not old_keys:
+        return False
+    config.setdefault("fullscreen", bool(config.get("auto_fullscreen", False)))
+    for key in old_keys:
+        del config[key]
+    return True
+
+def save_config(config):
+    # Write to a temp file and swap it in, so a crash mid-write never leaves a truncated config
+    temp_file = CONFIG_FILE + '.tmp'
+    with open(temp_file, 'w') as file:
+        json.dump(config, file, indent=4)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_file, CONFIG_FILE)
+
+def provision_game_folder(path, config_src=DEFAULT_CONFIG_FILE):
+    """ Creates a thin Core/<path>: just the game's config and portable marker, cache/content are staged at launch.
+    Returns True if the folder was new. A new folder is removed again if filling it fails. """
+    game_path = os.path.join(CORE_DIR, path)
+    created = not os.path.exists(game_path)
+    os.makedirs(game_path, exist_ok=True)
+    try:
+        if os.path.isfile(config_src):
+            shutil.copy2(config_src, os.path.join(game_path, TOML_CONFIG_FILE))
+        open(os.path.join(game_path, PORTABLE_MARKER), 'a').close()
+    except Exception:
+        if created:
+            shutil.rmtree(game_path, ignore_errors=True)
+        raise
+    return created
+
+class BuildStore:
+    """ Every downloaded release lives in its own directory; active.json says which one each channel runs.
+    Upgrading and rolling back only rewrite active.json, nothing gets copied. """
+    CHANNELS = {"canary": "xenia_canary.exe", "non-canary": "xenia.exe"}
+
+    def __init__(self, root=BUILDS_DIR):
+        self.root = root
+        self.state_file = os.path.join(root, 'active.json')
+        self.lock = threading.Lock()
+
+    def build_dir(self, channel, version):
+        return os.path.join(self.root, channel, safe_name(version))
+
+    def has(self, channel, version):
+        return os.path.isfile(os.path.join(self.build_dir(channel, version), '.build.json'))
+
+    def builds(self, channel):
+        channel_dir = os.path.join(self.root, channel)
+        manifests = []
+        if os.path.isdir(channel_dir):
+            for entry in os.scandir(channel_dir):
+                manifest_file = os.path.join(entry.path, '.build.json')
+                if entry.is_dir() and os.path.isfile(manifest_file):
+                    with open(manifest_file) as file:
+                        manifests.append(json.load(file))
+        return sorted(manifests, key=lambda manifest: manifest['installed'])
+
+    def _state(self):
+        if not os.path.isfile(self.state_file):
+            return {}
+        with open(self.state_file) as file:
+            return json.load(file)
+
+    def _save_state(self, state):
+        os.makedirs(self.root, exist_ok=True)
+        temp_file = self.state_file + '.tmp'
+        with open(temp_file, 'w') as file:
+            json.dump(state, file, indent=4)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_file, self.state_file)
+
+    def active(self, channel):
+        return self._state().get(channel, {}).get('active')
+
+    def active_dir(self, channel):
+        version = self.active(channel)
+        return self.build_dir(channel, version) if version else None
+
+    def resolve(self, version, channel="canary"):
+        """ Directory of a pinned version, or None to use the active build """
+        if version and self.has(channel, version):
+            return self.build_dir(channel, version)
+        if version:
+            logging.error(f"Pinned {channel} build {version} is not installed, using the active build")
+        return None
+
+    def activate(self, channel, version):
+        if not self.has(channel, version):
+            raise FileNotFoundError(f"{channel} build {version} is not installed")
+        with self.lock:
+            state = self._state()
+            channel_state = state.setdefault(channel, {"active": None, "history": []})
+            if channel_state['active'] and channel_state['active'] != version:
+                channel_state['history'].append(channel_state['active'])
+            channel_state['active'] = version
+            channel_state['rolled_back'] = []  # A new build supersedes whatever was rolled away from
+            self._save_state(state)
+        logging.info(f"Active {channel} build is now {version}")
+
+    def rollback(self, channel):
+        """ Makes the previous build active again. The build rolled away from stays installed until a newer build
+        is activated, so the rollback can be undone. """
+        with self.lock:
+            state = self._state()
+            channel_state = state.get(channel, {"history": []})
+            while channel_state['history']:
+                version = channel_state['history'].pop()
+                if self.has(channel, version):
+                    if channel_state.get('active'):
+                        channel_state.setdefault('rolled_back', []).append(channel_state['active'])
+                    channel_state['active'] = version
+                    self._save_state(state)
+                    logging.info(f"Rolled {channel} back to {version}")
+                    return version
+        return None
+
+    def install_zip(self, channel, version, zip_source, asset_name=""):
+        """ Extracts a release zip (path or file object) into its own directory, atomically """
+        final_dir = self.build_dir(channel, version)
+        if self.has(channel, version):
+            return final_dir
+        temp_dir = f"{final_dir}.partial-{uuid.uuid4().hex[:6]}"
+        os.makedirs(temp_dir)
+        try:
+            with tracer.span("extract", channel=channel, version=version) as span, zipfile.ZipFile(zip_source) as z:
+                ensure_free_space(temp_dir, sum(info.file_size for info in z.infolist()), f"installing {channel} {version}")
+                z.extractall(temp_dir)
+                span.set(files=len(z.infolist()), bytes=sum(info.file_size for info in z.infolist()))
+            with open(os.path.join(temp_dir, '.build.json'), 'w') as file:
+                json.dump({"channel": channel, "version": version, "asset": asset_name, "installed": time.time()}, file, indent=4)
+            if os.path.isdir(final_dir):
+                shutil.rmtree(final_dir)  # Leftover without a manifest, i.e. never finished installing
+            os.replace(temp_dir, final_dir)
+        except Exception:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+        build_manifest(channel, version).update()
+        return final_dir
+
+    def gc(self, pinned=(), retention=BUILD_RETENTION, in_use=()):
+        """ Deletes builds that are not active, not pinned by a game, not just rolled back from, not among the
+        newest `retention` and not running: in_use holds the executables of running sessions. """
+        removed = []
+        in_use_dirs = {os.path.normcase(os.path.dirname(os.path.abspath(exe))) for exe in in_use}
+        for channel in self.CHANNELS:
+            channel_state = self._state().get(channel, {})
+            builds = [manifest['version'] for manifest in self.builds(channel)]
+            keep = set(builds[max(0, len(builds) - retention):]) | set(pinned) | {channel_state.get('active')} | \
+                set(channel_state.get('rolled_back', []))
+            for version in builds:
+                if version in keep:
+                    continue
+                if os.path.normcase(os.path.abspath(self.build_dir(channel, version))) in in_use_dirs:
+                    logging.info(f"Keeping {channel} build {version}, a running game uses it")
+                    continue
+                shutil.rmtree(self.build_dir(channel, version), ignore_errors=True)
+                try:
+                    os.remove(build_manifest(channel, version).manifest_file)
+                except FileNotFoundError:
+                    pass
+                removed.append((channel, version))
+        with self.lock:
+            state = self._state()
+            for channel, channel_state in state.items():
+                channel_state['history'] = [v for v in channel_state.get('history', []) if self.has(channel, v)]
+                channel_state['rolled_back'] = [v for v in channel_state.get('rolled_back', []) if self.has(channel, v)]
+            if state:
+                self._save_state(state)
+        return removed
+
+build_store = BuildStore()
+
+def shared_build_dir():
+    return build_store.active_dir("canary") or SHARED_BUILD_DIR
+
+# The value runs up to a '#' outside quotes; a '#' inside a quoted name is part of the name
+PATCH_KEY_PATTERN = re.compile(r'''^\s*(title_name|title_id|hash|name|is_enabled)\s*=\s*((?:"(?:[^"\\]|\\.)*"|'[^']*'|[^#"'])*?)\s*(#.*)?$''')
+PATCH_STRING_PATTERN = re.compile(r'"([^"]*)"|\'([^\']*)\'')
+
+def parse_patch_file(path):
+    """ Pulls title, module hashes and patch names/enabled flags out of a game-patches TOML file. A line scanner
+    rather than a TOML parser: it is all the index needs and it is several times faster over the whole repo. """
+    info = {"title_id": "", "title_name": "", "hashes": [], "patches": []}
+    pending_hash = None
+    in_patch = False
+    with open(path, 'r', encoding='utf-8', errors='replace') as file:
+        for line in file:
+            if pending_hash is not None:
+                pending_hash += line
+                if ']' in line:
+                    info["hashes"].extend(m[0] or m[1] for m in PATCH_STRING_PATTERN.findall(pending_hash))
+                    pending_hash = None
+                continue
+            stripped = line.strip()
+            if stripped.startswith('[['):
+                in_patch = stripped == '[[patch]]'
+                if in_patch:
+                    info["patches"].append({"name": "", "enabled": False})
+                continue
+            match = PATCH_KEY_PATTERN.match(line)
+            if not match:
+                continue
+            key, value = match.group(1), match.group(2)
+            strings = [m[0] or m[1] for m in PATCH_STRING_PATTERN.findall(value)]
+            if in_patch and key == 'name':
+                info["patches"][-1]["name"] = strings[0] if strings else value
+            elif in_patch and key == 'is_enabled':
+                info["patches"][-1]["enabled"] = value.lower() == 'true'
+            elif not in_patch and key in ('title_id', 'title_name'):
+                info[key] = strings[0] if strings else value
+            elif not in_patch and key == 'hash':
+                if value.startswith('[') and ']' not in value:
+                    pending_hash = value
+                else:
+                    info["hashes"].extend(strings)
+    info["title_id"] = info["title_id"].upper()
+    return info
+
+def set_patches_enabled(path, changes):
+    """ Rewrites is_enabled in place for the patches in changes, {(name, position): bool} where position counts
+    the file's [[patch]] blocks from 0, so patches sharing a name are told apart. The rest of the file is kept. """
+    with open(path, 'r', encoding='utf-8') as file:
+        lines = file.readlines()
+    output = []
+    block = None  # name, index of its name line and of its is_enabled line in output
+
+    def close_block():
+        if not block or (block['name'], block['position']) not in changes:
+            return
+        flag = 'true' if changes[block['name'], block['position']] else 'false'
+        if block['enabled_index'] is not None:
+            line = output[block['enabled_index']]
+            comment = f" {block['enabled_comment']}" if block['enabled_comment'] else ""
+            output[block['enabled_index']] = f"{line[:len(line) - len(line.lstrip())]}is_enabled = {flag}{comment}\n"
+        elif block['name_index'] is not None:
+            line = output[block['name_index']]
+            output.insert(block['name_index'] + 1, f"{line[:len(line) - len(line.lstrip())]}is_enabled = {flag}\n")
+
+    in_patch_keys = False
+    position = -1
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith('[['):
+            if stripped == '[[patch]]':
+                close_block()
+                position += 1
+                block = {"name": None, "position": position, "name_index": None, "enabled_index": None, "enabled_comment": None}
+                in_patch_keys = True
+            elif stripped.startswith('[[patch.'):
+                in_patch_keys = False  # Address/value tables inside the current patch
+            else:
+                close_block()
+                block = None
+                in_patch_keys = False
+        elif in_patch_keys:
+            match = PATCH_KEY_PATTERN.match(line)
+            if match and match.group(1) == 'name':
+                strings = PATCH_STRING_PATTERN.findall(match.group(2))
+                block['name'] = (strings[0][0] or strings[0][1]) if strings else match.group(2)
+                block['name_index'] = len(output)
+            elif match and match.group(1) == 'is_enabled':
+                block['enabled_index'] = len(output)
+                block['enabled_comment'] = match.group(3)
+        output.append(line)
+    close_block()
+    temp_file = path + '.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as file:
+        file.writelines(output)
+    os.replace(temp_file, path)
+
+class PatchIndex:
+    """ Title ID -> patch files lookup over the Patches folder. Each file is parsed once; refresh() only
+    re-reads files whose mtime or size changed, and the result is kept in patch_index.json between runs. """
+    VERSION = 1
+
+    def __init__(self, patches_dir=PATCHES_DIR, index_file=PATCH_INDEX_FILE):
+        self.patches_dir = patches_dir
+        self.index_file = index_file
+        self.files = {}
+        self.by_title_id = {}
+        try:
+            with open(index_file) as file:
+                data = json.load(file)
+            if data.get('version') == self.VERSION and data.get('patches_dir') == patches_dir:
+                self.files = data['files']
+        except (OSError, ValueError):
+            pass
+        self._rebuild_lookup()
+
+    def _rebuild_lookup(self):
+        self.by_title_id = {}
+        for file_name, entry in self.files.items():
+            self.by_title_id.setdefault(entry['title_id'], []).append(file_name)
+
+    def refresh(self):
+        """ Returns the number of files (re)parsed """
+        seen = set()
+        parsed = 0
+        if os.path.isdir(self.patches_dir):
+            for entry in os.scandir(self.patches_dir):
+                if not entry.name.endswith('.toml') or not entry.is_file():
+                    continue
+                seen.add(entry.name)
+                stat = entry.stat()
+                cached = self.files.get(entry.name)
+                if cached and cached['mtime_ns'] == stat.st_mtime_ns and cached['size'] == stat.st_size:
+                    continue
+                try:
+                    info = parse_patch_file(entry.path)
+                except OSError as e:
+                    logging.error(f"Could not read patch file {entry.name}: {e}")
+                    continue
+                info.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                self.files[entry.name] = info
+                parsed += 1
+        removed = set(self.files) - seen
+        for file_name in removed:
+            del self.files[file_name]
+        if parsed or removed:
+            self._rebuild_lookup()
+            self.save()
+        return parsed
+
+    def save(self):
+        temp_file = self.index_file + '.tmp'
+        with open(temp_file, 'w') as file:
+            json.dump({"version": self.VERSION, "patches_dir": self.patches_dir, "files": self.files},
+                      file, separators=(',', ':'))
+        os.replace(temp_file, self.index_file)
+
+    def for_title(self, title_id):
+        """ [(file name, entry)] for every patch file of a title ID """
+        return [(file_name, self.files[file_name]) for file_name in self.by_title_id.get(title_id.upper(), [])]
+
+    def set_enabled(self, title_id, enabled, names=None, file_name=None, positions=None):
+        """ Turns patches of a title on or off in bulk; names=None means all of them. positions picks patches by
+        their place in file_name, for files that use a name twice. Returns how many changed. """
+        changed = 0
+        for entry_file, entry in self.for_title(title_id):
+            if file_name and entry_file != file_name:
+                continue
+            changes = {(patch['name'], position): enabled for position, patch in enumerate(entry['patches'])
+                       if (names is None or patch['name'] in names) and (positions is None or position in positions)
+                       and patch['enabled'] != enabled}
+            if not changes:
+                continue
+            path = os.path.join(self.patches_dir, entry_file)
+            set_patches_enabled(path, changes)
+            stat = os.stat(path)
+            for position, patch in enumerate(entry['patches']):
+                if (patch['name'], position) in changes:
+                    patch['enabled'] = enabled
+            entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            changed += len(changes)
+        if changed:
+            self.save()
+        return changed
+
+TITLE_ID_PATTERN = re.compile(r'(?<![0-9A-Fa-f])([0-9A-Fa-f]{8})(?![0-9A-Fa-f])')
+
+def hash_file(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class IntegrityManifest:
+    """ Known-good sizes, mtimes and SHA-256 hashes for every file under a root. update() and verify() only hash
+    files whose size or mtime changed since the manifest last saw them (verify(full=True) hashes everything),
+    spreading the hashing over a thread pool. """
+    locks = {}
+    locks_lock = threading.Lock()
+
+    def __init__(self, name, root, folders=None, manifests_dir=MANIFESTS_DIR):
+        self.name = name
+        self.root = root
+        self.folders = folders  # Only these top level folders, e.g. SAVE_DATA_FOLDERS
+        self.manifest_file = os.path.join(manifests_dir, f"{safe_name(name)}.json")
+        with IntegrityManifest.locks_lock:
+            self.lock = IntegrityManifest.locks.setdefault(self.manifest_file, threading.Lock())
+
+    def exists(self):
+        return os.path.isfile(self.manifest_file)
+
+    def load(self):
+        try:
+            with open(self.manifest_file) as file:
+                return json.load(file)['files']
+        except (OSError, ValueError, KeyError):
+            return {}
+
+    def _save(self, files):
+        os.makedirs(os.path.dirname(self.manifest_file), exist_ok=True)
+        temp_file = self.manifest_file + '.tmp'
+        with open(temp_file, 'w') as file:
+            json.dump({"name": self.name, "root": self.root, "updated": time.time(), "files": files},
+                      file, separators=(',', ':'))
+        os.replace(temp_file, self.manifest_file)
+
+    def scan(self):
+        """ {relative path: (size, mtime_ns)} for the files currently on disk """
+        found = {}
+        roots = [os.path.join(self.root, folder) for folder in self.folders] if self.folders else [self.root]
+        for top in roots:
+            for root, dirs, files in os.walk(top):
+                for file in files:
+                    path = os.path.join(root, file)
+                    stat = os.stat(path)
+                    found[os.path.relpath(path, self.root).replace(os.sep, '/')] = (stat.st_size, stat.st_mtime_ns)
+        return found
+
+    def _hash_all(self, rel_paths, max_workers):
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return dict(zip(rel_paths, pool.map(lambda rel: hash_file(os.path.join(self.root, rel)), rel_paths)))
+
+    def update(self, rel_paths=None, max_workers=None):
+        """ Records the current state as known good, for all files or just rel_paths. Returns files hashed. """
+        max_workers = max_workers or min(8, os.cpu_count() or 4)
+        with self.lock:
+            files = self.load()
+            if rel_paths is None:
+                on_disk = self.scan()
+                files = {rel: entry for rel, entry in files.items() if rel in on_disk}
+            else:
+                on_disk = {}
+                for rel in rel_paths:
+                    rel = rel.replace(os.sep, '/')
+                    try:
+                        stat = os.stat(os.path.join(self.root, rel))
+                        on_disk[rel] = (stat.st_size, stat.st_mtime_ns)
+                    except FileNotFoundError:
+                        files.pop(rel, None)
+            changed = [rel for rel, (size, mtime_ns) in on_disk.items()
+                       if rel not in files or files[rel][0] != size or files[rel][1] != mtime_ns]
+            with tracer.span("manifest.hash", manifest=self.name, files=len(changed)):
+                for rel, digest in self._hash_all(changed, max_workers).items():
+                    files[rel] = [on_disk[rel][0], on_disk[rel][1], digest]
+            self._save(files)
+            return len(changed)
+
+    def verify(self, full=False, max_workers=None, rel_paths=None):
+        """ Returns {"ok", "missing", "corrupt", "modified", "untracked"}. corrupt means the content changed while
+        size and mtime stayed the same, which no normal write does; modified means the file was rewritten since
+        it was recorded (a save the manifest hasn't caught up with), which is not damage. rel_paths limits the
+        check to those files. """
+        max_workers = max_workers or min(8, os.cpu_count() or 4)
+        files = self.load()
+        on_disk = self.scan()
+        if rel_paths is not None:
+            wanted = set(rel_paths)
+            files = {rel: entry for rel, entry in files.items() if rel in wanted}
+            on_disk = {rel: entry for rel, entry in on_disk.items() if rel in wanted}
+        result = {"ok": 0, "missing": [], "corrupt": [], "modified": [], "untracked": sorted(set(on_disk) - set(files))}
+        to_hash = []
+        for rel, (size, mtime_ns, digest) in files.items():
+            if rel not in on_disk:
+                result["missing"].append(rel)
+            elif full or on_disk[rel] != (size, mtime_ns):
+                to_hash.append(rel)
+            else:
+                result["ok"] += 1
+        for rel, digest in self._hash_all(to_hash, max_workers).items():
+            if digest == files[rel][2]:
+                result["ok"] += 1
+            elif on_disk[rel] == tuple(files[rel][:2]):
+                result["corrupt"].append(rel)
+            else:
+                result["modified"].append(rel)
+        return result
+
+def save_data_manifest():
+    return IntegrityManifest("savedata", SAVE_DATA_DIR, SAVE_DATA_FOLDERS)
+
+def backup_manifest():
+    return IntegrityManifest("backup", BACKUPS_DIR, SAVE_DATA_FOLDERS)
+
+def build_manifest(channel, version):
+    return IntegrityManifest(f"build-{channel}-{version}", build_store.build_dir(channel, version))
+
+def repair_from_backup(result, dry_run=False):
+    """ Restores SaveData files that verify() found missing or corrupt from the backup. Modified files are newer
+    saves, never repaired. The backup copy is used
+    when it matches the expected hash, or failing that when it at least matches the backup's own manifest (an
+    older but intact save). Returns (restored, restored as older version, unrecoverable). """
+    expected = save_data_manifest().load()
+    backup = backup_manifest()
+    backup_files = backup.load()
+    restored, older, lost = [], [], []
+    for rel in result["missing"] + result["corrupt"]:
+        backup_path = os.path.join(BACKUPS_DIR, rel)
+        entry = backup_files.get(rel)
+        if entry is None or not os.path.isfile(backup_path) or hash_file(backup_path) != entry[2]:
+            lost.append(rel)
+            continue
+        (restored if entry[2] == expected.get(rel, [None] * 3)[2] else older).append(rel)
+        if not dry_run:
+            target = os.path.join(SAVE_DATA_DIR, rel)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            temp_file = f"{target}.{uuid.uuid4().hex[:8]}.tmp"
+            shutil.copy2(backup_path, temp_file)
+            os.replace(temp_file, target)
+    if not dry_run and (restored or older):
+        save_data_manifest().update(restored + older)
+    return restored, older, lost
+
+class SizeIndex:
+    """ Cached size and mtime of every file under a root, so estimating a copy doesn't stat the whole tree. A
+    refresh only lists folders whose mtime changed (files were added, removed or replaced in them); the others
+    keep their cached entries. Files rewritten in place don't touch their folder and are only picked up by the
+    full rescan every SIZE_INDEX_MAX_AGE seconds, so the index is for ETAs and display, never for deciding
+    what to copy. """
+    locks = {}
+    locks_lock = threading.Lock()
+
+    def __init__(self, name, root, manifests_dir=MANIFESTS_DIR):
+        self.name = name
+        self.root = root
+        self.index_file = os.path.join(manifests_dir, f"sizes-{safe_name(name)}.json")
+        with SizeIndex.locks_lock:
+            self.lock = SizeIndex.locks.setdefault(self.index_file, threading.Lock())
+
+    def _load(self):
+        try:
+            with open(self.index_file) as file:
+                index = json.load(file)
+            if index.get('root') == self.root:
+                return index
+        except (OSError, ValueError):
+            pass
+        return {"root": self.root, "refreshed": 0, "dirs": {}}
+
+    def _save(self, index):
+        os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+        temp_file = f"{self.index_file}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(temp_file, 'w') as file:
+            json.dump(index, file, separators=(',', ':'))
+        os.replace(temp_file, self.index_file)
+
+    def refresh(self, full=False):
+        """ {relative path: (size, mtime_ns)} for every file under root """
+        with self.lock, tracer.span("size_index", index=self.name) as span:
+            index = self._load()
+            full = full or time.time() - index['refreshed'] > SIZE_INDEX_MAX_AGE
+            cached, dirs, listed = index['dirs'], {}, 0
+            pending = ['']
+            while pending:
+                rel_dir = pending.pop()
+                try:
+                    mtime_ns = os.stat(os.path.join(self.root, rel_dir)).st_mtime_ns
+                except FileNotFoundError:
+                    continue
+                entry = cached.get(rel_dir)
+                if full or entry is None or entry[0] != mtime_ns:
+                    files, subdirs = {}, []
+                    with os.scandir(os.path.join(self.root, rel_dir)) as it:
+                        for item in it:
+                            if item.is_dir(follow_symlinks=False):
+                                subdirs.append(item.name)
+                            elif item.is_file():
+                                stat = item.stat()
+                                files[item.name] = [stat.st_size, stat.st_mtime_ns]
+                    entry = [mtime_ns, files, subdirs]
+                    listed += 1
+                dirs[rel_dir] = entry
+                pending.extend(f"{rel_dir}/{name}" if rel_dir else name for name in entry[2])
+            if listed or len(dirs) != len(cached):
+                index['dirs'] = dirs
+                if full:
+                    index['refreshed'] = time.time()
+                self._save(index)
+            span.set(folders=len(dirs), listed=listed, full=full)
+        return {f"{rel_dir}/{name}" if rel_dir else name: tuple(value)
+                for rel_dir, entry in dirs.items() for name, value in entry[1].items()}
+
+def save_data_sizes():
+    return SizeIndex("savedata", SAVE_DATA_DIR)
+
+def walk_sizes(root):
+    """ {relative path: (size, mtime_ns)} straight from disk, for folders without an index """
+    found = {}
+    for dirpath, dirs, files in os.walk(root):
+        for file in files:
+            stat = os.stat(os.path.join(dirpath, file))
+            found[os.path.relpath(os.path.join(dirpath, file), root).replace(os.sep, '/')] = (stat.st_size, stat.st_mtime_ns)
+    return found
+
+throughput_lock = threading.Lock()
+
+def load_throughput():
+    try:
+        with open(THROUGHPUT_FILE) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def record_throughput(operation, bytes_moved, seconds):
+    """ Folds a timed run into the operation's moving average, ignoring runs too small to say anything """
+    if bytes_moved < 1024 * 1024 or seconds <= 0:
+        return
+    with throughput_lock:
+        history = load_throughput()
+        entry = history.get(operation, {"bytes_per_second": bytes_moved / seconds, "runs": 0})
+        entry['bytes_per_second'] = 0.7 * entry['bytes_per_second'] + 0.3 * bytes_moved / seconds
+        entry['runs'] += 1
+        history[operation] = entry
+        os.makedirs(os.path.dirname(THROUGHPUT_FILE), exist_ok=True)
+        temp_file = f"{THROUGHPUT_FILE}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(temp_file, 'w') as file:
+            json.dump(history, file, indent=4)
+        os.replace(temp_file, THROUGHPUT_FILE)
+
+def free_space(path):
+    """ Free bytes on the disk path is (or would be created) on """
+    path = os.path.abspath(path)
+    while not os.path.exists(path) and os.path.dirname(path) != path:
+        path = os.path.dirname(path)
+    return shutil.disk_usage(path).free
+
+def ensure_free_space(path, needed, what):
+    if not needed:
+        return
+    free = free_space(path)
+    if needed + FREE_SPACE_MARGIN > free:
+        raise OSError(errno.ENOSPC, f"Not enough disk space for {what}: needs {needed / (1024 * 1024):.0f} MiB "
+                                    f"plus {FREE_SPACE_MARGIN // (1024 * 1024)} MiB spare, {free / (1024 * 1024):.0f} MiB free", path)
+
+def format_eta(seconds):
+    if seconds < 60:
+        return f"{max(1, round(seconds))}s"
+    return f"{int(seconds // 60)}m {round(seconds % 60):02d}s"
+
+class TransferPlan:
+    """ What copying src into dst is going to take, worked out before anything is copied. Each subtree (a title's
+    folder under cache/ or content/) gets the cheapest strategy: skip when dst already matches, delta when some
+    files changed, copy when dst has none of it. Every file is written as a temp file renamed into place, never
+    in place, so files hardlinked by the cache dedupe are replaced rather than written through. Sizes are statted fresh unless a SizeIndex is given for a side,
+    which is only good enough for estimates: plans that get executed must not use one. The ETA comes from past
+    runs of the same operation. """
+    def __init__(self, operation, src, dst, folders=None, src_index=None, dst_index=None, newer_only=False, dst_files=None):
+        self.operation = operation
+        self.src = src
+        self.dst = dst
+        self.estimated = bool(src_index or dst_index)
+        with tracer.span("plan", operation=operation) as span:
+            src_files = src_index.refresh() if src_index else walk_sizes(src)
+            if dst_files is None:
+                dst_files = dst_index.refresh() if dst_index else walk_sizes(dst)
+            if folders:
+                src_files = {rel: value for rel, value in src_files.items() if rel.split('/', 1)[0] in folders}
+            subtrees = {}
+            for rel, value in sorted(src_files.items()):
+                subtrees.setdefault('/'.join(rel.split('/')[:2]), []).append((rel, value))
+            self.steps = []
+            for subtree, files in subtrees.items():
+                changed = [(rel, size) for rel, (size, mtime_ns) in files
+                           if rel not in dst_files or (mtime_ns > dst_files[rel][1] if newer_only else dst_files[rel] != (size, mtime_ns))]
+                if not changed:
+                    strategy = "skip"
+                elif len(changed) < len(files) or any(rel in dst_files for rel, size in changed):
+                    strategy = "delta"
+                else:
+                    strategy = "copy"
+                self.steps.append({"subtree": subtree, "strategy": strategy, "files": [rel for rel, size in changed],
+                                   "bytes": sum(size for rel, size in changed)})
+            self.files = sum(len(step['files']) for step in self.steps)
+            self.bytes = sum(step['bytes'] for step in self.steps)
+            self.free = free_space(dst)
+            self.fits = not self.bytes or self.bytes + FREE_SPACE_MARGIN <= self.free
+            history = load_throughput().get(operation)
+            self.measured = history is not None
+            self.eta = self.bytes / (history['bytes_per_second'] if history else DEFAULT_THROUGHPUT)
+            span.set(files=self.files, bytes=self.bytes, fits=self.fits)
+
+    def counts(self):
+        counts = {}
+        for step in self.steps:
+            counts[step['strategy']] = counts.get(step['strategy'], 0) + 1
+        return counts
+
+    def summary(self):
+        counts = self.counts()
+        text = f"{self.files} files, {self.bytes / (1024 * 1024):.1f} MiB to copy"
+        if counts.get("skip"):
+            text += f" ({counts['skip']} unchanged)"
+        text += f", {self.free / (1024 ** 3):.1f} GiB free"
+        if self.bytes:
+            text += f", about {format_eta(self.eta)}" + ("" if self.measured else " (estimated)")
+        return text
+
+    def check(self):
+        """ Raises OSError(ENOSPC) before anything is copied if the plan doesn't fit on the target disk """
+        if not self.fits:
+            ensure_free_space(self.dst, self.bytes, f"{self.operation} into {self.dst}")
+
+    def execute(self, progress=None):
+        """ Carries the plan out. Every file lands via a temp file + rename, so a failure leaves whole files only.
+        Returns the relative paths written. """
+        if self.estimated:
+            raise ValueError("A plan built from a cached size index is an estimate and can't be executed")
+        self.check()
+        done, written = 0, []
+        start = time.perf_counter()
+        with tracer.span("copy", files=self.files, bytes=self.bytes):
+            for step in self.steps:
+                if step['strategy'] != "skip":
+                    for rel in step['files']:
+                        dst_file = os.path.join(self.dst, rel)
+                        os.makedirs(os.path.dirname(dst_file), exist_ok=True)
+                        temp_file = f"{dst_file}.{uuid.uuid4().hex[:8]}.tmp"
+                        shutil.copy2(os.path.join(self.src, rel), temp_file)
+                        os.replace(temp_file, dst_file)
+                        written.append(rel)
+                done += len(step['files'])
+                if progress and self.files:
+                    progress(done, self.files)
+        record_throughput(self.operation, self.bytes, time.perf_counter() - start)
+        return written
+
+def plan_save_data_copy(src_dir, dst_dir):
+    """ Plan for a backup (SaveData into Backups) or a restore (the other way). Both sides are statted file by
+    file: a save rewritten in place doesn't change its folder's mtime, so a cached index could miss it. """
+    return TransferPlan("backup" if src_dir == SAVE_DATA_DIR else "restore", src_dir, dst_dir, SAVE_DATA_FOLDERS)
+
+def run_xcopy(src, dst):
+    # xcopy: 0 copied, 1 nothing to copy, 2 and up means it failed
+    with tracer.span("xcopy", src=src, dst=dst) as span:
+        result = subprocess.run(["xcopy", src, dst, "/E", "/I", "/Y"], shell=True)
+        span.set(returncode=result.returncode)
+    if result.returncode > 1:
+        logging.error(f"xcopy {src} -> {dst} failed with code {result.returncode}")
+        raise subprocess.CalledProcessError(result.returncode, result.args)
+
+def copy_save_data(src_dir, dst_dir, plan=None):
+    """ Backs up or restores the SaveData folders, then checks the copy against the source's hashes before
+    recording it as known good. Only titles that changed are copied, and nothing is copied if it won't fit.
+    Returns the files that did not copy correctly. """
+    with tracer.span("backup" if src_dir == SAVE_DATA_DIR else "restore", src=src_dir, dst=dst_dir) as span:
+        source = save_data_manifest() if src_dir == SAVE_DATA_DIR else backup_manifest()
+        target = backup_manifest() if src_dir == SAVE_DATA_DIR else save_data_manifest()
+        plan = plan or plan_save_data_copy(src_dir, dst_dir)
+        # Never let a damaged file replace the good copy on the other side: every file about to be copied is
+        # hashed against what was recorded for it
+        if source.exists():
+            corrupt = source.verify(full=True, rel_paths=[rel for step in plan.steps for rel in step['files']])["corrupt"]
+            if corrupt:
+                raise ValueError(f"{len(corrupt)} files in {src_dir} are damaged, e.g. {corrupt[0]}. "
+                                 f"Nothing was copied; check them with verify first.")
+        plan.execute()
+        source.update()
+        with tracer.span("verify_copy") as verify_span:
+            files = source.load()
+            problems = [rel for rel, entry in files.items()
+                        if not os.path.isfile(os.path.join(dst_dir, rel)) or hash_file(os.path.join(dst_dir, rel)) != entry[2]]
+            verify_span.set(files=len(files))
+        target.update()
+        span.set(problems=len(problems))
+        return problems
+
+SETUP_PARTS = (os.path.basename(CONFIG_FILE), os.path.basename(DEFAULT_CONFIG_FILE), 'Core', 'SaveData', 'Patches', 'images', 'Builds', 'Resources')
+STORED_EXTENSIONS = ('.zip', '.7z', '.jpg', '.jpeg', '.png', '.webp', '.iso', '.xex', '.god')  # Already compressed
+EXPORT_SPOOL_MEMORY = 4 * 1024 * 1024  # Spooled copies larger than this go to a temporary file
+
+def spool_file(path, chunk_size=1024 * 1024):
+    """ Reads path once into a spooled temporary copy, hashing it on the way, so what ends up in an archive is
+    exactly what was hashed. Returns (sha256, size, mtime_ns, mode, spool) with the spool rewound. """
+    digest = hashlib.sha256()
+    spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MEMORY)
+    try:
+        with open(path, 'rb') as source:
+            stat = os.fstat(source.fileno())
+            for chunk in iter(lambda: source.read(chunk_size), b''):
+                digest.update(chunk)
+                spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    size = spool.tell()
+    spool.seek(0)
+    return digest.hexdigest(), size, stat.st_mtime_ns, stat.st_mode & 0o777, spool
+
+def export_setup(output, include_backups=False, max_workers=None, progress=None):
+    """ Streams the whole setup (config, game folders, SaveData, patches, covers and builds) into one zip in a
+    single pass. Every distinct file content is stored once as blobs/<sha256>, with manifest.json mapping each
+    path to its blob, so the emulator copies in old full game folders cost nothing extra. Each file is read once:
+    a small window of files is spooled and hashed ahead on a thread pool while blobs are written one at a time
+    from the spools. output may be a path or a binary
+    stream, including an unseekable one such as stdout. Returns a summary dict. """
+    parts = SETUP_PARTS + (('Backups',) if include_backups else ())
+    paths = []
+    for part in parts:
+        full_path = os.path.join(BASE_DIR, part)
+        if os.path.isfile(full_path):
+            paths.append(full_path)
+        for root, dirs, files in os.walk(full_path):
+            dirs.sort()
+            paths.extend(os.path.join(root, file) for file in sorted(files) if not file.endswith('.tmp'))
+    layout = {}
+    written = set()
+    summary = {"files": len(paths), "blobs": 0, "bytes": 0, "stored_bytes": 0}
+    workers = max_workers or min(8, os.cpu_count() or 4)
+    pending = []
+    with ThreadPoolExecutor(max_workers=workers) as pool, \
+            zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        try:
+            queued = iter(paths)
+            # Only a couple of spools per worker are held at a time, however many files there are
+            for path in queued:
+                pending.append((path, pool.submit(spool_file, path)))
+                if len(pending) >= workers * 2:
+                    break
+            for done in range(1, len(paths) + 1):
+                path, future = pending.pop(0)
+                next_path = next(queued, None)
+                if next_path is not None:
+                    pending.append((next_path, pool.submit(spool_file, next_path)))
+                digest, size, mtime_ns, mode, spool = future.result()
+                with spool:
+                    rel = os.path.relpath(path, BASE_DIR).replace(os.sep, '/')
+                    layout[rel] = [digest, size, mtime_ns, mode]
+                    summary["bytes"] += size
+                    if digest not in written:
+                        info = zipfile.ZipInfo(f"blobs/{digest}", time.localtime(mtime_ns / 1e9)[:6])
+                        info.compress_type = zipfile.ZIP_STORED if path.lower().endswith(STORED_EXTENSIONS) else zipfile.ZIP_DEFLATED
+                        with archive.open(info, 'w', force_zip64=size >= 2 ** 31) as target:
+                            shutil.copyfileobj(spool, target, 1024 * 1024)
+                        written.add(digest)
+                        summary["blobs"] += 1
+                        summary["stored_bytes"] += size
+                if progress:
+                    progress(done, len(paths))
+        finally:
+            for path, future in pending:
+                future.cancel()
+                if not future.cancelled() and not future.exception():
+                    future.result()[-1].close()
+        archive.writestr('manifest.json', json.dumps({"version": 1, "created": time.time(), "files": layout}))
+    return summary
+
+def safe_join(root, rel):
+    """ root/rel for a relative path that came from outside (an archive, a sync peer). Raises ValueError for
+    absolute paths, '..' components or anything else that would land outside root. """
+    parts = rel.replace('\\', '/').split('/')
+    root = os.path.abspath(root)
+    path = os.path.normpath(os.path.join(root, *parts))
+    if not rel or os.path.isabs(rel) or os.path.splitdrive(rel)[0] or '..' in parts or \
+            os.path.commonpath([path, root]) != root or path == root:
+        raise ValueError(f"Refusing to write outside {root}: {rel!r}")
+    return path
+
+def import_setup(archive_path, target_dir=BASE_DIR, max_workers=None, overwrite=False, progress=None):
+    """ Rebuilds a setup written by export_setup under target_dir. Blobs are extracted in parallel, each worker
+    reading through its own handle on the archive, then every other path with the same content is copied
+    from the first. Returns a summary dict. """
+    with zipfile.ZipFile(archive_path) as archive:
+        manifest = json.loads(archive.read('manifest.json'))
+    if manifest.get("version") != 1:
+        raise ValueError(f"Unsupported setup archive version {manifest.get('version')}")
+    by_blob = {}
+    for rel, (digest, size, mtime_ns, mode) in manifest["files"].items():
+        path = safe_join(target_dir, rel)
+        if os.path.exists(path) and not overwrite:
+            raise FileExistsError(f"{path} already exists (use overwrite to replace existing files)")
+        by_blob.setdefault(digest, []).append((path, mtime_ns, mode))
+
+    handles = threading.local()
+    opened = []
+    opened_lock = threading.Lock()
+
+    def restore(item):
+        digest, targets = item
+        if not hasattr(handles, 'archive'):
+            handles.archive = zipfile.ZipFile(archive_path)
+            with opened_lock:
+                opened.append(handles.archive)
+        first = targets[0][0]
+        os.makedirs(os.path.dirname(first), exist_ok=True)
+        temp_file = f"{first}.{uuid.uuid4().hex[:8]}.tmp"
+        hasher = hashlib.sha256()
+        with handles.archive.open(f"blobs/{digest}") as source, open(temp_file, 'wb') as target:
+            for chunk in iter(lambda: source.read(1024 * 1024), b''):
+                hasher.update(chunk)
+                target.write(chunk)
+        if hasher.hexdigest() != digest:
+            os.remove(temp_file)
+            raise ValueError(f"Blob {digest[:12]} for {first} is corrupt")
+        os.replace(temp_file, first)
+        for path, mtime_ns, mode in targets:
+            if path != first:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                shutil.copyfile(first, path)
+            os.chmod(path, mode)
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        return len(targets)
+
+    restored = 0
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers or min(8, os.cpu_count() or 4)) as pool:
+            for count in pool.map(restore, by_blob.items()):
+                restored += count
+                if progress:
+                    progress(restored, len(manifest["files"]))
+    finally:
+        for archive in opened:
+            archive.close()
+    return {"files": restored, "blobs": len(by_blob)}
+
+def sync_title_key(rel):
+    """ Saves are synced and conflict-resolved per title: the first two path levels, e.g. content/4D5307E6 """
+    parts = rel.split('/')
+    return '/'.join(parts[:2]) if len(parts) > 2 else parts[0]
+
+def title_fingerprint(entries):
+    return hashlib.sha256(json.dumps(sorted((rel, entry['chunks']) for rel, entry in entries.items())).encode()).hexdigest()
+
+SYNC_DIGEST_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+def check_sync_files(files, title=None):
+    """ Rejects a peer's file list unless every path stays inside one of the SaveData folders (and inside title,
+    when given) and every chunk hash is a plain SHA-256, since both end up in local paths """
+    for rel, entry in files.items():
+        safe_join(SAVE_DATA_DIR, rel)
+        if rel.split('/', 1)[0] not in SAVE_DATA_FOLDERS or (title is not None and sync_title_key(rel) != title):
+            raise ValueError(f"Sync peer sent a path outside its title: {rel!r}")
+        if not all(isinstance(digest, str) and SYNC_DIGEST_PATTERN.fullmatch(digest) for digest in entry['chunks']):
+            raise ValueError(f"Sync peer sent a malformed chunk hash for {rel!r}")
+
+def chunk_hashes(path, chunk_size=SYNC_CHUNK_SIZE):
+    hashes = []
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            hashes.append(hashlib.sha256(chunk).hexdigest())
+    return hashes
+
+class SaveDataIndex:
+    """ Chunk hashes of every file in SaveData. Cached by size and mtime, so only changed files are re-read. """
+    def __init__(self, root=SAVE_DATA_DIR, cache_file=SYNC_CHUNK_CACHE):
+        self.root = root
+        self.cache_file = cache_file
+        self.files = {}
+        self.chunk_locations = {}
+
+    def build(self):
+        try:
+            with open(self.cache_file) as file:
+                cached = json.load(file)
+        except (OSError, ValueError):
+            cached = {}
+        on_disk = IntegrityManifest("sync", self.root, SAVE_DATA_FOLDERS).scan()
+        self.files = {}
+        for rel, (size, mtime_ns) in on_disk.items():
+            entry = cached.get(rel)
+            if not entry or entry['size'] != size or entry['mtime_ns'] != mtime_ns:
+                entry = {"size": size, "mtime_ns": mtime_ns, "chunks": chunk_hashes(os.path.join(self.root, rel))}
+            self.files[rel] = entry
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        with open(self.cache_file + '.tmp', 'w') as file:
+            json.dump(self.files, file, separators=(',', ':'))
+        os.replace(self.cache_file + '.tmp', self.cache_file)
+        self.chunk_locations = {digest: (rel, index) for rel, entry in self.files.items()
+                                for index, digest in enumerate(entry['chunks'])}
+        return self.files
+
+    def titles(self):
+        titles = {}
+        for rel, entry in self.files.items():
+            titles.setdefault(sync_title_key(rel), {})[rel] = entry
+        return titles
+
+    def read_chunk(self, digest):
+        """ The chunk with this hash from a local file, or None if no file has it (any more) """
+        rel, index = self.chunk_locations.get(digest, (None, 0))
+        if rel is None:
+            return None
+        try:
+            with open(os.path.join(self.root, rel), 'rb') as file:
+                file.seek(index * SYNC_CHUNK_SIZE)
+                data = file.read(SYNC_CHUNK_SIZE)
+        except OSError:
+            return None
+        return data if hashlib.sha256(data).hexdigest() == digest else None
+
+    def apply_titles(self, targets, spool_dir, conflict_dir=None, conflicts=()):
+        """ Makes each title's files match its target ({title: {rel: entry}}), assembling files from local chunks
+        and chunks received into spool_dir. Every file of every title is assembled into a temp file before any
+        is swapped in, so local chunks are always read from files this run hasn't replaced yet, and a missing
+        chunk fails the sync with SaveData untouched. The local versions of conflicting titles being replaced or
+        deleted are kept under conflict_dir. Returns the relative paths changed. """
+        changed, removed, temp_files = [], [], []
+        try:
+            for title, target in targets.items():
+                check_sync_files(target, title)
+                local = {rel for rel in self.files if sync_title_key(rel) == title}
+                removed += [rel for rel in local if rel not in target]
+                for rel, entry in target.items():
+                    if self.files.get(rel, {}).get('chunks') == entry['chunks']:
+                        continue
+                    path = safe_join(self.root, rel)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    temp_file = f"{path}.sync-{uuid.uuid4().hex[:8]}.tmp"
+                    temp_files.append((temp_file, path))
+                    with open(temp_file, 'wb') as file:
+                        for digest in entry['chunks']:
+                            data = self.read_chunk(digest)
+                            if data is None:
+                                try:
+                                    with open(os.path.join(spool_dir, digest), 'rb') as chunk_file:
+                                        data = chunk_file.read()
+                                except FileNotFoundError:
+                                    raise LookupError(f"Chunk {digest[:12]} of {rel} is no longer available locally "
+                                                      f"and was not received") from None
+                            file.write(data)
+                    os.utime(temp_file, ns=(entry['mtime_ns'], entry['mtime_ns']))
+                    changed.append(rel)
+            if conflict_dir:
+                for rel in changed + removed:
+                    if rel in self.files and sync_title_key(rel) in conflicts:
+                        kept = os.path.join(conflict_dir, rel)
+                        os.makedirs(os.path.dirname(kept), exist_ok=True)
+                        shutil.copy2(os.path.join(self.root, rel), kept)
+            for temp_file, path in temp_files:
+                os.replace(temp_file, path)
+            temp_files = []
+        finally:
+            for temp_file, path in temp_files:
+                try:
+                    os.remove(temp_file)
+                except FileNotFoundError:
+                    pass
+        for rel in removed:
+            os.remove(safe_join(self.root, rel))
+        return changed + removed
+
+def send_frame(sock, header, payload=b''):
+    data = json.dumps(header).encode()
+    sock.sendall(struct.pack('>II', len(data), len(payload)) + data + payload)
+
+def recv_frame(stream, max_header=SYNC_MAX_HEADER, max_payload=SYNC_MAX_PAYLOAD):
+    """ The next frame from a sync peer, skipping keep-alives. Sizes over the limits are refused before anything
+    is read into memory. """
+    while True:
+        prefix = stream.read(8)
+        if len(prefix) < 8:
+            raise ConnectionError("Sync peer closed the connection")
+        header_size, payload_size = struct.unpack('>II', prefix)
+        if header_size > max_header or payload_size > max_payload:
+            raise ValueError(f"Sync frame too large ({header_size} + {payload_size} bytes)")
+        header = json.loads(stream.read(header_size))
+        payload = stream.read(payload_size) if payload_size else b''
+        if not isinstance(header, dict):
+            raise ValueError("Malformed sync frame")
+        if header.get('op') == 'error':
+            raise RuntimeError(f"Sync peer reported: {header.get('message')}")
+        if header.get('op') != 'working':
+            return header, payload
+
+class SyncKeepAlive:
+    """ Sends 'working' frames while the server is busy (hashing SaveData, applying titles) so the peer's
+    socket timeout only fires when the server has really gone away """
+    def __init__(self, sock, interval=SYNC_KEEPALIVE_INTERVAL):
+        self.sock = sock
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="sync-keepalive", daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                send_frame(self.sock, {"op": "working"})
+            except OSError:
+                return
+
+def send_chunks(sock, index, hashes):
+    """ Streams chunks back to back, zlib-compressed where that helps, then an end marker. Returns bytes sent. """
+    sent = 0
+    for digest in hashes:
+        data = index.read_chunk(digest)
+        if data is None:
+            raise LookupError(f"Chunk {digest[:12]} is no longer available")
+        packed = zlib.compress(data, 1)
+        compressed = len(packed) < len(data)
+        send_frame(sock, {"op": "chunk", "hash": digest, "z": compressed}, packed if compressed else data)
+        sent += len(packed) if compressed else len(data)
+    send_frame(sock, {"op": "end"})
+    return sent
+
+def receive_chunks(stream, spool_dir):
+    received = 0
+    while True:
+        header, payload = recv_frame(stream)
+        if header['op'] == 'end':
+            return received
+        data = zlib.decompress(payload) if header['z'] else payload
+        if hashlib.sha256(data).hexdigest() != header['hash']:
+            raise ValueError(f"Chunk {header['hash'][:12]} arrived corrupted")
+        with open(os.path.join(spool_dir, header['hash']), 'wb') as file:
+            file.write(data)
+        received += len(payload)
+
+def machine_id():
+    path = os.path.join(MANIFESTS_DIR, 'machine-id')
+    try:
+        with open(path) as file:
+            return file.read().strip()
+    except FileNotFoundError:
+        os.makedirs(MANIFESTS_DIR, exist_ok=True)
+        with open(path, 'w') as file:
+            file.write(uuid.uuid4().hex)
+        return machine_id()
+
+def load_sync_state(peer_id):
+    try:
+        with open(SYNC_STATE_FILE) as file:
+            return json.load(file).get(peer_id, {})
+    except (OSError, ValueError):
+        return {}
+
+def save_sync_state(peer_id, titles):
+    try:
+        with open(SYNC_STATE_FILE) as file:
+            state = json.load(file)
+    except (OSError, ValueError):
+        state = {}
+    state[peer_id] = titles
+    with open(SYNC_STATE_FILE + '.tmp', 'w') as file:
+        json.dump(state, file, indent=4)
+    os.replace(SYNC_STATE_FILE + '.tmp', SYNC_STATE_FILE)
+
+def sync_auth(secret, nonce):
+    return hmac.new((secret or "").encode(), nonce.encode(), hashlib.sha256).hexdigest()
+
+class SyncRequestHandler(socketserver.StreamRequestHandler):
+    """ Server side of a sync session: answers manifest and chunk requests and applies titles pushed to it """
+    def handle(self):
+        try:
+            self._handle()
+        except (ConnectionError, OSError, ValueError, LookupError, TypeError) as e:
+            logging.error(f"Sync with {self.client_address[0]} failed: {e}")
+            try:
+                send_frame(self.connection, {"op": "error", "message": str(e)})
+            except OSError:
+                pass
+
+    def _handle(self):
+        nonce = secrets.token_hex(16)
+        send_frame(self.connection, {"op": "hello", "id": machine_id(), "nonce": nonce})
+        hello, _ = recv_frame(self.rfile, SYNC_MAX_HELLO, 0)
+        if not hmac.compare_digest(str(hello.get('auth', '')), sync_auth(self.server.secret, nonce)):
+            raise ValueError("wrong sync secret")
+        peer_id = hello['id']
+        index = SaveDataIndex()
+        spool_dir = os.path.join(STAGING_DIR, f"sync-{uuid.uuid4().hex[:8]}")
+        os.makedirs(spool_dir)
+        try:
+            with self.server.lock:  # One sync session at a time may change this SaveData
+                manifest_sent = False
+                while True:
+                    request, _ = recv_frame(self.rfile)
+                    if request.get('op') in ('get', 'offer') and not manifest_sent:
+                        raise ValueError(f"Sync request {request['op']!r} before 'manifest'")
+                    if request.get('op') == 'manifest':
+                        with SyncKeepAlive(self.connection):
+                            files = index.build()
+                        send_frame(self.connection, {"op": "manifest", "files": files})
+                        manifest_sent = True
+                    elif request['op'] == 'get':
+                        send_chunks(self.connection, index, request['hashes'])
+                    elif request['op'] == 'offer':
+                        for title, entries in request['titles'].items():
+                            check_sync_files(entries, title)
+                        need = sorted({digest for entries in request['titles'].values() for entry in entries.values()
+                                       for digest in entry['chunks'] if digest not in index.chunk_locations})
+                        send_frame(self.connection, {"op": "need", "hashes": need})
+                        receive_chunks(self.rfile, spool_dir)
+                        conflict_root = os.path.join(SYNC_CONFLICTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{peer_id[:8]}")
+                        with SyncKeepAlive(self.connection):
+                            changed = index.apply_titles(request['titles'], spool_dir, conflict_root, request['conflicts'])
+                            if changed:
+                                save_data_manifest().update(changed)
+                            index.build()
+                        send_frame(self.connection, {"op": "applied", "files": len(changed)})
+                    elif request['op'] == 'done':
+                        save_sync_state(peer_id, request['fingerprints'])
+                        send_frame(self.connection, {"op": "bye"})
+                        return
+                    else:
+                        raise ValueError(f"Unknown sync request {request.get('op')!r}")
+        finally:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+
+class SyncServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, secret=None):
+        # Even on loopback: any local process could otherwise rewrite SaveData through the server
+        if not secret:
+            raise ValueError("A sync secret is required (--secret or sync_secret in the config)")
+        super().__init__(address, SyncRequestHandler)
+        self.secret = secret
+        self.lock = threading.Lock()
+
+def sync_with_peer(host, port=SYNC_PORT, secret=None, dry_run=False):
+    """ Two-way SaveData sync with a peer running sync-serve. Titles changed on one side since the last sync
+    with that peer are copied to the other; titles changed on both are a conflict, which the side with the
+    newest file wins, and the loser's replaced files are kept under SyncConflicts. Only chunks the receiving
+    side doesn't already have are transferred. Returns a report dict. """
+    if not secret:
+        raise ValueError("A sync secret is required (--secret or sync_secret in the config)")
+    start = time.perf_counter()
+    index = SaveDataIndex()
+    local_titles = {}
+    report = {"pulled": [], "pushed": [], "conflicts": [], "bytes_received": 0, "bytes_sent": 0}
+    with socket.create_connection((host, port), timeout=SYNC_TIMEOUT) as sock:
+        stream = sock.makefile('rb')
+        hello, _ = recv_frame(stream)
+        peer_id = hello['id']
+        send_frame(sock, {"op": "hello", "id": machine_id(), "auth": sync_auth(secret, hello['nonce'])})
+        send_frame(sock, {"op": "manifest"})
+        index.build()
+        local_titles = index.titles()
+        remote_files, _ = recv_frame(stream)
+        check_sync_files(remote_files['files'])
+        remote_titles = {}
+        for rel, entry in remote_files['files'].items():
+            remote_titles.setdefault(sync_title_key(rel), {})[rel] = entry
+        state = load_sync_state(peer_id)
+        fingerprints, pulls, pushes = {}, {}, {}
+        for title in sorted(set(local_titles) | set(remote_titles)):
+            local, remote = local_titles.get(title, {}), remote_titles.get(title, {})
+            local_print, remote_print = title_fingerprint(local), title_fingerprint(remote)
+            if local_print == remote_print:
+                fingerprints[title] = local_print
+                continue
+            if title in state:
+                local_changed, remote_changed = local_print != state[title], remote_print != state[title]
+            else:  # Never synced: only a side that has the title changed it
+                local_changed, remote_changed = bool(local), bool(remote)
+            conflict = local_changed and remote_changed
+            newest_local = max((entry['mtime_ns'] for entry in local.values()), default=0)
+            newest_remote = max((entry['mtime_ns'] for entry in remote.values()), default=0)
+            pull = remote_changed and (not conflict or newest_remote > newest_local)
+            if conflict:
+                report["conflicts"].append(title)
+            (pulls if pull else pushes)[title] = remote if pull else local
+            (report["pulled"] if pull else report["pushed"]).append(title)
+            fingerprints[title] = remote_print if pull else local_print
+        if dry_run:
+            send_frame(sock, {"op": "done", "fingerprints": state})
+            recv_frame(stream)
+            return report
+
+        spool_dir = os.path.join(STAGING_DIR, f"sync-{uuid.uuid4().hex[:8]}")
+        os.makedirs(spool_dir)
+        try:
+            if pulls:
+                need = sorted({digest for entries in pulls.values() for entry in entries.values()
+                               for digest in entry['chunks'] if digest not in index.chunk_locations})
+                send_frame(sock, {"op": "get", "hashes": need})
+                report["bytes_received"] = receive_chunks(stream, spool_dir)
+                conflict_root = os.path.join(SYNC_CONFLICTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{peer_id[:8]}")
+                changed = index.apply_titles(pulls, spool_dir, conflict_root, report["conflicts"])
+                if changed:
+                    save_data_manifest().update(changed)
+                index.build()  # Chunks to push may have lived in files that were just replaced
+            if pushes:
+                send_frame(sock, {"op": "offer", "titles": pushes, "conflicts": report["conflicts"]})
+                need, _ = recv_frame(stream)
+                report["bytes_sent"] = send_chunks(sock, index, need['hashes'])
+                recv_frame(stream)
+        finally:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+        send_frame(sock, {"op": "done", "fingerprints": fingerprints})
+        recv_frame(stream)
+    save_sync_state(peer_id, fingerprints)
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+class CacheManager:
+    """ Size accounting, pruning and dedupe for the SaveData cache tree. cache_index.json remembers every file's
+    size, mtime, title, the build that was active when it was last seen changing and (once needed) its hash, so
+    only new or changed files cost anything on later runs. """
+    def __init__(self, cache_dir=os.path.join(SAVE_DATA_DIR, 'cache'), index_file=CACHE_INDEX_FILE):
+        self.cache_dir = cache_dir
+        self.index_file = index_file
+        self.files = {}  # relative path -> {size, mtime_ns, atime, title, build, sha256}
+        try:
+            with open(index_file) as file:
+                data = json.load(file)
+            if data.get('cache_dir') == cache_dir:
+                self.files = data['files']
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        temp_file = self.index_file + '.tmp'
+        with open(temp_file, 'w') as file:
+            json.dump({"cache_dir": self.cache_dir, "files": self.files}, file, separators=(',', ':'))
+        os.replace(temp_file, self.index_file)
+
+    @staticmethod
+    def title_of(rel_path):
+        for part in rel_path.replace('\\', '/').split('/'):
+            match = TITLE_ID_PATTERN.search(part)
+            if match:
+                return match.group(1).upper()
+        return "shared"
+
+    def refresh(self):
+        """ Brings the index up to date with the cache folder, returns the number of new or changed files """
+        build = build_store.active("canary") or "unknown"
+        seen = set()
+        changed = 0
+        stack = [self.cache_dir] if os.path.isdir(self.cache_dir) else []
+        while stack:
+            for entry in os.scandir(stack.pop()):
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
+                rel_path = os.path.relpath(entry.path, self.cache_dir)
+                stat = entry.stat(follow_symlinks=False)
+                seen.add(rel_path)
+                cached = self.files.get(rel_path)
+                if cached and cached['mtime_ns'] == stat.st_mtime_ns and cached['size'] == stat.st_size:
+                    cached['atime'] = stat.st_atime
+                    continue
+                self.files[rel_path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "atime": stat.st_atime,
+                                        "title": self.title_of(rel_path), "build": build, "sha256": None}
+                changed += 1
+        for rel_path in set(self.files) - seen:
+            del self.files[rel_path]
+        self.save()
+        return changed
+
+    def report(self):
+        """ Per title: bytes, file count, newest write and the builds its files were written under """
+        titles = {}
+        for entry in self.files.values():
+            title = titles.setdefault(entry['title'], {"bytes": 0, "files": 0, "newest": 0, "builds": set()})
+            title['bytes'] += entry['size']
+            title['files'] += 1
+            title['newest'] = max(title['newest'], entry['mtime_ns'] / 1e9)
+            title['builds'].add(entry['build'])
+        # Stale means last written under builds that have all been uninstalled since, i.e. not played across
+        # several updates, not merely "not played since the last update"
+        installed = {manifest['version'] for manifest in build_store.builds("canary")}
+        current = build_store.active("canary")
+        for title in titles.values():
+            title['stale'] = bool(current) and "unknown" not in title['builds'] and not (title['builds'] & installed)
+            title['builds'] = sorted(title['builds'])
+        return dict(sorted(titles.items(), key=lambda item: item[1]['bytes'], reverse=True))
+
+    def _record(self, rel_paths):
+        """ Tells the SaveData manifest about removed or relinked files, so verify doesn't flag them and repair
+        doesn't bring pruned files back """
+        if rel_paths and os.path.normcase(os.path.abspath(self.cache_dir)) == \
+                os.path.normcase(os.path.abspath(os.path.join(SAVE_DATA_DIR, 'cache'))):
+            save_data_manifest().update([f"cache/{rel.replace(os.sep, '/')}" for rel in rel_paths])
+
+    def _delete(self, rel_paths, dry_run):
+        freed = 0
+        for rel_path in rel_paths:
+            freed += self.files[rel_path]['size']
+            if not dry_run:
+                try:
+                    os.remove(os.path.join(self.cache_dir, rel_path))
+                except FileNotFoundError:
+                    pass
+                del self.files[rel_path]
+        if not dry_run:
+            self.save()
+            self._record(rel_paths)
+        return len(rel_paths), freed
+
+    def prune(self, older_than_days=None, max_bytes=None, stale=False, dry_run=False):
+        """ Deletes files older than the given age, whole titles whose cache predates the active build, then the
+        least recently used files until the cache fits in max_bytes. Returns (files, bytes) removed. """
+        doomed = set()
+        if older_than_days is not None:
+            cutoff = (time.time() - older_than_days * 86400) * 1e9
+            doomed.update(path for path, entry in self.files.items() if entry['mtime_ns'] < cutoff)
+        if stale:
+            stale_titles = {title for title, info in self.report().items() if info['stale'] and title != "shared"}
+            doomed.update(path for path, entry in self.files.items() if entry['title'] in stale_titles)
+        if max_bytes is not None:
+            remaining = sum(entry['size'] for path, entry in self.files.items() if path not in doomed)
+            for path, entry in sorted(self.files.items(), key=lambda item: item[1]['atime']):
+                if remaining <= max_bytes:
+                    break
+                if path not in doomed:
+                    doomed.add(path)
+                    remaining -= entry['size']
+        return self._delete(sorted(doomed), dry_run)
+
+    def dedupe(self, dry_run=False, max_workers=4):
+        """ Hardlinks files with identical content together. Only files sharing a size with another file are
+        hashed, and hashes are kept in the index. Safe because nothing in the manager writes into SaveData in
+        place: every copy lands as a temp file renamed over the target, which replaces the link instead of
+        writing through it. Returns (files linked, bytes saved). """
+        by_size = {}
+        for path, entry in self.files.items():
+            if entry['size'] > 0:
+                by_size.setdefault(entry['size'], []).append(path)
+        candidates = [path for paths in by_size.values() if len(paths) > 1 for path in paths]
+        to_hash = [path for path in candidates if not self.files[path]['sha256']]
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for path, digest in zip(to_hash, pool.map(lambda p: hash_file(os.path.join(self.cache_dir, p)), to_hash)):
+                self.files[path]['sha256'] = digest
+
+        linked = saved = 0
+        relinked = []
+        groups = {}
+        for path in candidates:
+            groups.setdefault(self.files[path]['sha256'], []).append(path)
+        for paths in groups.values():
+            keep = os.path.join(self.cache_dir, paths[0])
+            keep_stat = os.stat(keep)
+            for path in paths[1:]:
+                full_path = os.path.join(self.cache_dir, path)
+                stat = os.stat(full_path)
+                if stat.st_ino == keep_stat.st_ino and stat.st_dev == keep_stat.st_dev:
+                    continue  # Already linked
+                linked += 1
+                saved += stat.st_size
+                if not dry_run:
+                    temp_path = f"{full_path}.{uuid.uuid4().hex[:8]}.link"
+                    os.link(keep, temp_path)
+                    os.replace(temp_path, full_path)
+                    self.files[path]['mtime_ns'] = keep_stat.st_mtime_ns  # Linked files share the kept one's stat
+                    relinked.append(path)
+        self.save()
+        self._record(relinked)
+        return linked, saved
+
+def create_http_session(pool_size=8):
+    """ One pooled session shared by concurrent update jobs, so connections to GitHub get reused """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def download_file(session, url, progress=None, chunk_size=1024 * 1024):
+    """ Streams url into a temp file under Update/Downloads and returns its path """
+    os.makedirs(DOWNLOADS_DIR, exist_ok=True)
+    path = os.path.join(DOWNLOADS_DIR, f"{uuid.uuid4().hex}.download")
+    with tracer.span("download", url=url) as span, session.get(url, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        total = int(response.headers.get('Content-Length') or 0)
+        ensure_free_space(DOWNLOADS_DIR, total, f"downloading {url}")
+        received = 0
+        try:
+            with open(path, 'wb') as file:
+                for chunk in response.iter_content(chunk_size):
+                    file.write(chunk)
+                    received += len(chunk)
+                    if progress:
+                        progress(received * 100 // total if total else 0, f"Downloading {received / (1024 * 1024):.1f} MiB")
+        except Exception:
+            os.remove(path)
+            raise
+        span.set(bytes=received)
+    return path
+
+class GitHubSource:
+    """ Update source backed by the GitHub releases API """
+    RELEASES = {
+        "canary": (CANARY_RELEASES_PATH, lambda name: name.endswith('.zip')),
+        "non-canary": (NON_CANARY_RELEASES_PATH, lambda name: name == 'xenia_master.zip'),
+    }
+
+    def __init__(self, api_url=GITHUB_API_URL, patches_url=PATCHES_ZIP_URL):
+        self.api_url = api_url.rstrip('/')
+        self.patches_url = patches_url
+
+    def __str__(self):
+        return "github"
+
+    def release_url(self, channel):
+        return self.api_url + self.RELEASES[channel][0]
+
+    def latest(self, session, channel):
+        url, asset_match = self.release_url(channel), self.RELEASES[channel][1]
+        response = session.get(url, timeout=30)
+        response.raise_for_status()
+        return self.release_from_json(response.json(), asset_match, url)
+
+    @staticmethod
+    def release_from_json(release_info, asset_match, url=""):
+        asset = next((asset for asset in release_info['assets'] if asset_match(asset['name'])), None)
+        if not asset:
+            raise LookupError(f"No matching zip file found in the latest release assets of {url}.")
+        return {"version": release_info.get('tag_name') or asset['name'], "asset": asset['name'],
+                "size": asset.get('size', 0), "changelog": release_info.get('body') or "",
+                "url": asset['browser_download_url']}
+
+    def fetch_build(self, session, channel, release, progress):
+        """ Returns (zip path, whether the caller should delete it) """
+        return download_file(session, release['url'], progress), True
+
+    def fetch_patches(self, session, progress):
+        return download_file(session, self.patches_url, progress), True
+
+class MirrorSource:
+    """ Update source reading a local folder (or file:// URL) laid out by export_update_source: manifest.json
+    next to the build and patch zips. Zips are installed straight from the mirror, at disk speed. """
+    def __init__(self, root):
+        self.root = root
+
+    def __str__(self):
+        return self.root
+
+    def manifest(self):
+        with open(os.path.join(self.root, 'manifest.json')) as file:
+            return json.load(file)
+
+    def latest(self, session, channel):
+        entry = self.manifest().get(channel)
+        if not entry:
+            raise LookupError(f"The mirror at {self.root} has no {channel} build.")
+        return dict(entry, url=os.path.join(self.root, entry['file']))
+
+    def fetch_build(self, session, channel, release, progress):
+        return release['url'], False
+
+    def fetch_patches(self, session, progress):
+        entry = self.manifest().get('patches')
+        if not entry:
+            raise LookupError(f"The mirror at {self.root} has no patches.")
+        return os.path.join(self.root, entry['file']), False
+
+class BundleSource(MirrorSource):
+    """ Update source reading a single bundle zip holding manifest.json plus the build and patch zips """
+    def manifest(self):
+        with zipfile.ZipFile(self.root) as bundle:
+            return json.loads(bundle.read('manifest.json'))
+
+    def latest(self, session, channel):
+        entry = self.manifest().get(channel)
+        if not entry:
+            raise LookupError(f"The bundle {self.root} has no {channel} build.")
+        return dict(entry, url=entry['file'])
+
+    def _extract(self, member, progress):
+        os.makedirs(DOWNLOADS_DIR, exist_ok=True)
+        path = os.path.join(DOWNLOADS_DIR, f"{uuid.uuid4().hex}.download")
+        progress(0, f"Unpacking {member} from bundle...")
+        with zipfile.ZipFile(self.root) as bundle, bundle.open(member) as src, open(path, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        return path
+
+    def fetch_build(self, session, channel, release, progress):
+        return self._extract(release['file'], progress), True
+
+    def fetch_patches(self, session, progress):
+        entry = self.manifest().get('patches')
+        if not entry:
+            raise LookupError(f"The bundle {self.root} has no patches.")
+        return self._extract(entry['file'], progress), True
+
+def update_source_from_config(value, github_api_url=None):
+    """ "github" (default), a mirror folder or file:// URL, or a bundle .zip """
+    if not value or value == "github":
+        return GitHubSource(github_api_url or GITHUB_API_URL)
+    if value.startswith("file://"):
+        value = requests.utils.unquote(value[len("file://"):])
+        if os.name == 'nt' and value.startswith('/'):
+            value = value[1:]
+    return BundleSource(value) if zipfile.is_zipfile(value) else MirrorSource(value)
+
+def zip_directory(src_dir, zip_file, prefix=""):
+    with zipfile.ZipFile(zip_file, 'w', zipfile.ZIP_DEFLATED) as z:
+        for root, dirs, files in os.walk(src_dir):
+            for file in files:
+                path = os.path.join(root, file)
+                rel_path = os.path.relpath(path, src_dir)
+                if rel_path != '.build.json':
+                    z.write(path, prefix + rel_path.replace(os.sep, '/'))
+
+def export_update_source(output):
+    """ Packs the active builds and Patches into a mirror folder, or a single bundle if output ends in .zip, so
+    offline machines can update from it """
+    is_bundle = output.lower().endswith('.zip')
+    stage_dir = f"{output}.staging-{uuid.uuid4().hex[:6]}" if is_bundle else output
+    os.makedirs(stage_dir, exist_ok=True)
+    manifest = {}
+    try:
+        for channel in BuildStore.CHANNELS:
+            version = build_store.active(channel)
+            if version:
+                file_name = f"{channel}-{safe_name(version)}.zip"
+                zip_directory(build_store.build_dir(channel, version), os.path.join(stage_dir, file_name))
+                manifest[channel] = {"version": version, "asset": file_name, "file": file_name, "changelog": "",
+                                     "size": os.path.getsize(os.path.join(stage_dir, file_name))}
+        if os.path.isdir(PATCHES_DIR):
+            # Same layout as the GitHub archive so PatchesUpdateJob installs it unchanged
+            zip_directory(PATCHES_DIR, os.path.join(stage_dir, 'patches.zip'), "game-patches-main/patches/")
+            manifest['patches'] = {"file": 'patches.zip', "created": time.time()}
+        with open(os.path.join(stage_dir, 'manifest.json'), 'w') as file:
+            json.dump(manifest, file, indent=4)
+        if is_bundle:
+            # Stored, not deflated: the members are zips already
+            with zipfile.ZipFile(output, 'w', zipfile.ZIP_STORED) as bundle:
+                for name in os.listdir(stage_dir):
+                    bundle.write(os.path.join(stage_dir, name), name)
+    finally:
+        if is_bundle:
+            shutil.rmtree(stage_dir, ignore_errors=True)
+    return manifest
+
+class BuildUpdateJob:
+    """ Gets the latest release of a channel from the update source and installs it into the build store """
+    def __init__(self, channel, source):
+        self.channel = channel
+        self.source = source
+        self.target = os.path.join(BUILDS_DIR, channel)
+
+    def fetch(self, session, progress):
+        progress(0, "Checking latest release...")
+        release = self.source.latest(session, self.channel)
+        if build_store.has(self.channel, release['version']):
+            return release, None, False
+        zip_path, is_temp = self.source.fetch_build(session, self.channel, release, progress)
+        return release, zip_path, is_temp
+
+    def install(self, payload, progress):
+        release, zip_path, is_temp = payload
+        if zip_path:
+            progress(100, "Extracting...")
+            try:
+                build_store.install_zip(self.channel, release['version'], zip_path, release['asset'])
+            finally:
+                if is_temp:
+                    os.remove(zip_path)
+        build_store.activate(self.channel, release['version'])
+        return f"{self.channel} {release['version']} is now active"
+
+class PatchesUpdateJob:
+    """ Replaces the Patches folder with the patches from the update source """
+    channel = "patches"
+    target = PATCHES_DIR
+
+    def __init__(self, source):
+        self.source = source
+
+    def fetch(self, session, progress):
+        return self.source.fetch_patches(session, progress)
+
+    def install(self, payload, progress):
+        zip_path, is_temp = payload
+        progress(100, "Extracting...")
+        temp_extract_dir = resource_path('TempPatches')
+        shutil.rmtree(temp_extract_dir, ignore_errors=True)
+        try:
+            with tracer.span("extract", channel="patches") as span, zipfile.ZipFile(zip_path) as z:
+                ensure_free_space(temp_extract_dir, sum(info.file_size for info in z.infolist()), "extracting patches")
+                z.extractall(temp_extract_dir)
+                span.set(files=len(z.infolist()), bytes=sum(info.file_size for info in z.infolist()))
+            extracted_patches_dir = os.path.join(temp_extract_dir, "game-patches-main", "patches")
+            if not os.path.isdir(extracted_patches_dir):
+                raise zipfile.BadZipFile("The patches archive has no game-patches-main/patches folder")
+            shutil.rmtree(PATCHES_DIR, ignore_errors=True)
+            shutil.move(extracted_patches_dir, PATCHES_DIR)
+        finally:
+            shutil.rmtree(temp_extract_dir, ignore_errors=True)
+            if is_temp:
+                os.remove(zip_path)
+        return "Patches updated successfully"
+
+UPDATE_JOBS = {
+    "canary": lambda source: BuildUpdateJob("canary", source),
+    "non-canary": lambda source: BuildUpdateJob("non-canary", source),
+    "patches": lambda source: PatchesUpdateJob(source),
+}
+
+class UpdateChecker:
+    """ Finds out whether newer builds exist without downloading them. GitHub is asked with the cached ETag
+    (a 304 doesn't count against the rate limit), at most every min_interval seconds, and not at all while
+    rate limited or backing off after errors. """
+    def __init__(self, source, cache_file=RELEASE_CACHE_FILE, min_interval=UPDATE_CHECK_INTERVAL, session=None):
+        self.source = source
+        self.cache_file = cache_file
+        self.min_interval = min_interval
+        self.session = session or create_http_session(2)
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_file) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self, cache):
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        temp_file = self.cache_file + '.tmp'
+        with open(temp_file, 'w') as file:
+            json.dump(cache, file, indent=4)
+        os.replace(temp_file, self.cache_file)
+
+    def check(self, channels=("canary", "non-canary"), force=False):
+        cache = self._load_cache()
+        results = {}
+        for channel in channels:
+            entry = cache.setdefault(str(self.source), {}).setdefault(channel, {})
+            try:
+                if isinstance(self.source, GitHubSource):
+                    self._check_github(channel, entry, force)
+                else:
+                    entry['release'] = self.source.latest(self.session, channel)
+                    entry['checked'] = time.time()
+            except Exception as e:
+                logging.error(f"Update check for {channel} failed: {e}")
+            release = entry.get('release')
+            if release:
+                current = build_store.active(channel)
+                results[channel] = dict(release, current=current, update_available=release['version'] != current)
+        self._save_cache(cache)
+        return results
+
+    def _check_github(self, channel, entry, force):
+        now = time.time()
+        if not force and now < entry.get('retry_after', 0):
+            return
+        if not force and entry.get('release') and now - entry.get('checked', 0) < self.min_interval:
+            return
+        headers = {"Accept": "application/vnd.github+json"}
+        if entry.get('etag') and entry.get('release'):
+            headers["If-None-Match"] = entry['etag']
+        try:
+            response = self.session.get(self.source.release_url(channel), headers=headers, timeout=10)
+        except requests.RequestException:
+            self._back_off(entry, now)
+            raise
+        if response.headers.get('X-RateLimit-Remaining') == '0' or response.status_code in (403, 429):
+            reset = response.headers.get('X-RateLimit-Reset')
+            retry_after = response.headers.get('Retry-After')
+            if reset:
+                entry['retry_after'] = float(reset)
+            elif retry_after:
+                entry['retry_after'] = now + float(retry_after)
+            if response.status_code in (403, 429):
+                if not reset and not retry_after:
+                    self._back_off(entry, now)
+                raise RuntimeError(f"GitHub rate limit reached, next check after "
+                                   f"{time.strftime('%H:%M', time.localtime(entry.get('retry_after', now)))}")
+        if response.status_code == 304:
+            entry['checked'] = now
+            entry['failures'] = 0
+            return
+        if not response.ok:
+            self._back_off(entry, now)
+            response.raise_for_status()
+        entry['release'] = GitHubSource.release_from_json(response.json(), GitHubSource.RELEASES[channel][1])
+        entry['etag'] = response.headers.get('ETag')
+        entry['checked'] = now
+        entry['failures'] = 0
+
+    def _back_off(self, entry, now):
+        entry['failures'] = entry.get('failures', 0) + 1
+        entry['retry_after'] = now + min(60 * 2 ** entry['failures'], self.min_interval)
+
+    def cached(self, channel):
+        """ Last known release for a channel, without any network access """
+        return self._load_cache().get(str(self.source), {}).get(channel, {}).get('release')
+
+UPDATE_TARGET_LOCKS = {}  # Install target -> lock, shared by every orchestrator in the process
+UPDATE_TARGET_LOCKS_GUARD = threading.Lock()
+
+def update_target_lock(target):
+    with UPDATE_TARGET_LOCKS_GUARD:
+        return UPDATE_TARGET_LOCKS.setdefault(os.path.normcase(os.path.abspath(target)), threading.Lock())
+
+class UpdateOrchestrator:
+    """ Fetches several updates at once over one pooled HTTP session. Installs only wait on each other when
+    they write to the same target, also across orchestrators, e.g. two update tasks in the manager service. """
+    def __init__(self, job_names, max_workers=None, session=None, source=None):
+        if source is None:
+            config = load_config()
+            source = update_source_from_config(config.get("update_source"), config.get("github_api_url"))
+        self.source = source
+        self.jobs = [UPDATE_JOBS[name](self.source) for name in job_names]
+        self.max_workers = max_workers or len(self.jobs)
+        self.session = session or create_http_session(max(4, len(self.jobs) * 2))
+
+    def run(self, progress=None):
+        """ Returns (results, wall seconds); results map job name to ok/message/seconds """
+        progress = progress or (lambda name, percent, message: None)
+
+        def run_job(job):
+            start = time.perf_counter()
+            report = lambda percent, message: progress(job.channel, percent, message)
+            try:
+                with tracer.span(f"update.{job.channel}", source=str(self.source)):
+                    with tracer.span("fetch"):
+                        payload = job.fetch(self.session, report)
+                    # Time spent waiting on another job installing to the same target shows as a gap before install
+                    with update_target_lock(job.target), tracer.span("install"):
+                        message = job.install(payload, report)
+                result = {"ok": True, "message": message}
+            except Exception as e:
+                logging.error(f"Error updating {job.channel}: {e}")
+                result = {"ok": False, "message": str(e)}
+            result["seconds"] = time.perf_counter() - start
+            report(100, result["message"])
+            return job.channel, result
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="update") as pool:
+            results = dict(pool.map(run_job, self.jobs))
+        wall = time.perf_counter() - start
+        sequential = sum(result["seconds"] for result in results.values())
+        logging.info(f"Updates finished in {wall:.1f}s, {sequential:.1f}s of work "
+                     f"({sequential / wall if wall else 1:.1f}x versus running them one after another)")
+        return results, wall
+
+def build_launch_command(game_folder, data_root=None, build_dir=None, config_file=None, game_file=None, fullscreen=False):
+    """ Returns (command, cwd) for a Core folder, or (None, exe path looked for) if there is no emulator to run.
+    Legacy folders with their own xenia_canary.exe run it; thin folders run the shared build pointed at their own
+    config. Content, cache and log go to data_root, the game folder itself by default. build_dir and config_file
+    override the build and config used, e.g. to compare builds or presets. game_file (a default.xex or disc
+    image) is booted directly instead of whatever the emulator opened last. """
+    game_path = os.path.join(CORE_DIR, game_folder)
+    data_root = data_root or game_path
+    root_args = [f"--storage_root={data_root}",
+                 f"--content_root={os.path.join(data_root, 'content')}",
+                 f"--cache_root={os.path.join(data_root, 'cache')}",
+                 f"--log_file={os.path.join(data_root, 'xenia.log')}"]
+    boot_args = (["--fullscreen=true"] if fullscreen else []) + ([game_file] if game_file else [])
+    own_exe = os.path.join(game_path, XENIA_EXE)
+    is_shared_profile = os.path.normcase(game_path) == os.path.normcase(SHARED_BUILD_DIR)
+    # Core/Xenia runs its own copy only until a build from the store is active
+    if build_dir is None and config_file is None and os.path.isfile(own_exe) and not (is_shared_profile and build_store.active("canary")):
+        return [own_exe] + (root_args if data_root != game_path else []) + boot_args, game_path
+    shared_exe = os.path.join(build_dir or shared_build_dir(), XENIA_EXE)
+    if not os.path.isfile(shared_exe):
+        return None, shared_exe
+    config_file = config_file or os.path.join(game_path, TOML_CONFIG_FILE)
+    return [shared_exe, f"--config={config_file}"] + root_args + boot_args, game_path
+
+def thin_game_folder(path, dry_run=False, originals=None):
+    """ Deletes the emulator files a game folder got from the old full Resources copy, leaving config and data.
+    A file only goes when its size and SHA-256 match the Resources original, so user files that happen to share
+    a name are kept. originals caches the Resources hashes across folders. Returns [(relative path, bytes)]
+    of what was (or with dry_run would be) deleted. """
+    game_path = os.path.join(CORE_DIR, path)
+    if os.path.normcase(os.path.abspath(game_path)) == os.path.normcase(os.path.abspath(SHARED_BUILD_DIR)):
+        return []
+    originals = {} if originals is None else originals
+    removed = []
+    for root, dirs, files in os.walk(EXAMPLE_FOLDER):
+        rel_root = os.path.relpath(root, EXAMPLE_FOLDER)
+        for file in files:
+            rel_file = os.path.normpath(os.path.join(rel_root, file))
+            if rel_file in (TOML_CONFIG_FILE, PORTABLE_MARKER):
+                continue
+            target = os.path.join(game_path, rel_file)
+            if not os.path.isfile(target):
+                continue
+            source = os.path.join(root, file)
+            size = os.path.getsize(target)
+            if size != os.path.getsize(source):
+                continue
+            if rel_file not in originals:
+                originals[rel_file] = hash_file(source)
+            if hash_file(target) != originals[rel_file]:
+                logging.info(f"Keeping {target}: it differs from the Resources copy")
+                continue
+            if not dry_run:
+                os.remove(target)
+            removed.append((rel_file, size))
+    if not dry_run:
+        for root, dirs, files in os.walk(EXAMPLE_FOLDER, topdown=False):
+            target_dir = os.path.join(game_path, os.path.relpath(root, EXAMPLE_FOLDER))
+            if target_dir != os.path.join(game_path, '.') and os.path.isdir(target_dir) and not os.listdir(target_dir):
+                os.rmdir(target_dir)
+    return removed
+
+def thin_legacy_game_folders(paths=None, dry_run=False):
+    """ Thins the legacy 4K profile and every game folder so none keeps running its own stale xenia_canary.exe.
+    Only run on request (thin-games). Returns {folder: [(relative path, bytes)]} for folders with anything to delete. """
+    if not os.path.isfile(os.path.join(shared_build_dir(), XENIA_EXE)):
+        raise FileNotFoundError(f"Shared Xenia build not found in {shared_build_dir()}")
+    if paths is None:
+        paths = ['4k\\Xenia'] + [game['path'] for game in load_config().get('games', [])]
+    originals = {}
+    results = {}
+    for path in paths:
+        if not os.path.isdir(os.path.join(CORE_DIR, path)):
+            continue
+        try:
+            removed = thin_game_folder(path, dry_run, originals)
+        except OSError as e:
+            logging.warning(f"Could not thin {path}: {e}")
+            continue
+        if removed:
+            results[path] = removed
+    return results
+
+def read_game_list(file_path):
+    """ Reads games to import from a CSV (name,path,image_path,title_id,game_file header) or a JSON list """
+    if file_path.lower().endswith('.json'):
+        with open(file_path, 'r') as file:
+            return json.load(file)
+    with open(file_path, 'r', newline='') as file:
+        return list(csv.DictReader(file))
+
+def find_game_file(folder):
+    """ Returns the default.xex or first .iso directly inside folder, or None """
+    files = sorted(os.listdir(folder), key=str.lower)
+    for file in files:
+        if file.lower() == 'default.xex':
+            return os.path.join(folder, file)
+    for file in files:
+        if file.lower().endswith('.iso'):
+            return os.path.join(folder, file)
+    return None
+
+def scan_games(directory):
+    """ Treats every sub folder holding a default.xex or an .iso as a game """
+    entries = []
+    for entry in sorted(os.scandir(directory), key=lambda e: e.name.lower()):
+        if not entry.is_dir():
+            continue
+        game_file = find_game_file(entry.path)
+        if game_file:
+            entries.append({"name": entry.name, "path": entry.name, "image_path": "none",
+                            "game_file": os.path.abspath(game_file)})
+    return entries
+
+def import_games(entries, max_workers=8):
+    """ Adds many games at once: folders are provisioned in parallel and games_config.json is written
+    once at the end. If anything fails, folders created by this import are removed and the config is untouched. """
+    config = load_config()
+    registry = GameRegistry(config.get('games', []))
+    games = []
+    for entry in entries:
+        name = (entry.get('name') or '').strip()
+        path = (entry.get('path') or '').strip()
+        if not name or not path:
+            raise ValueError(f"Invalid game entry: {entry}")
+        image_path = (entry.get('image_path') or 'none').strip()
+        games.append(registry.add(name, path, image_path, (entry.get('title_id') or '').strip(),
+                                  (entry.get('game_file') or '').strip()))
+
+    created = []
+    created_lock = threading.Lock()
+
+    def provision(game):
+        if provision_game_folder(game['path']):
+            with created_lock:
+                created.append(game['path'])
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for future in [pool.submit(provision, game) for game in games]:
+                future.result()
+        config['games'] = registry.to_list()
+        save_config(config)
+    except Exception:
+        logging.error(f"Import failed, rolling back {len(created)} new game folders")
+        for path in created:
+            shutil.rmtree(os.path.join(CORE_DIR, path), ignore_errors=True)
+        raise
+    logging.info(f"Imported {len(games)} games")
+    return games
+
+def safe_name(name):
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', name).strip('_') or 'game'
+
+class EmulatorSession:
+    """ One supervised emulator process: output goes to files in its session folder, resource usage is sampled
+    from /proc while it runs and stats.json is written when it exits. """
+    def __init__(self, name, command, cwd, session_dir, sample_interval, log_file=None):
+        self.id = uuid.uuid4().hex[:8]
+        self.name = name
+        self.command = command
+        self.cwd = cwd
+        self.session_dir = session_dir
+        self.sample_interval = sample_interval
+        self.log_file = log_file
+        self.process = None
+        self.returncode = None
+        self.timed_out = False
+        self.started = None
+        self.ended = None
+        self.samples = 0
+        self.totals = {"cpu_percent": 0.0, "rss_bytes": 0, "threads": 0}
+        self.peaks = {"cpu_percent": 0.0, "rss_bytes": 0, "threads": 0}
+        self.io = {"read_bytes": 0, "write_bytes": 0}
+        self.staging = None  # How the instance folder was prepared and how long it took, set by InstanceLauncher
+        self.save_conflicts = []  # Saves that changed in SaveData while this session ran, set by InstanceLauncher
+        self.log_tail = LogTail(log_file) if log_file else None
+        self.log_stats = None
+        self.done = threading.Event()
+        self.on_exit = []
+
+    def start(self):
+        os.makedirs(self.session_dir, exist_ok=True)
+        self.stdout = open(os.path.join(self.session_dir, 'stdout.log'), 'wb')
+        self.stderr = open(os.path.join(self.session_dir, 'stderr.log'), 'wb')
+        self.started = time.time()
+        try:
+            self.process = subprocess.Popen(self.command, cwd=self.cwd, stdout=self.stdout, stderr=self.stderr)
+        except Exception:
+            self.stdout.close()
+            self.stderr.close()
+            raise
+        threading.Thread(target=self._monitor, name=f"session-{self.id}", daemon=True).start()
+        return self
+
+    @property
+    def pid(self):
+        return self.process.pid if self.process else None
+
+    def running(self):
+        return self.process is not None and not self.done.is_set()
+
+    def wait(self, timeout=None):
+        self.done.wait(timeout)
+        return self.returncode
+
+    def terminate(self):
+        if self.running():
+            self.process.terminate()
+
+    def _monitor(self):
+        proc_dir = f"/proc/{self.process.pid}"
+        can_sample = os.path.isdir(proc_dir)
+        clock_ticks = os.sysconf('SC_CLK_TCK') if can_sample else 100
+        last_cpu = None
+        while True:
+            try:
+                self.returncode = self.process.wait(timeout=self.sample_interval)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+            if can_sample:
+                last_cpu = self._sample(proc_dir, clock_ticks, last_cpu)
+            if self.log_tail:
+                self.log_tail.poll()
+        self.ended = time.time()
+        self.stdout.close()
+        self.stderr.close()
+        self._finish()
+
+    def _sample(self, proc_dir, clock_ticks, last_cpu):
+        try:
+            with open(f"{proc_dir}/stat") as file:
+                # Fields after the ")" closing the command name: utime/stime are 12/13, num_threads is 18
+                fields = file.read().rsplit(')', 1)[1].split()
+            cpu_seconds = (int(fields[11]) + int(fields[12])) / clock_ticks
+            threads = int(fields[17])
+            rss = 0
+            with open(f"{proc_dir}/status") as file:
+                for line in file:
+                    if line.startswith('VmRSS:'):
+                        rss = int(line.split()[1]) * 1024
+                        break
+            try:
+                with open(f"{proc_dir}/io") as file:
+                    for line in file:
+                        key, value = line.split(':')
+                        if key in self.io:
+                            self.io[key] = int(value)
+            except OSError:
+                pass  # /proc/<pid>/io needs ptrace access on some systems
+        except (OSError, IndexError, ValueError):
+            return last_cpu  # Process exited between samples
+        now = time.monotonic()
+        cpu_percent = 0.0
+        if last_cpu is not None:
+            elapsed = now - last_cpu[0]
+            if elapsed > 0:
+                cpu_percent = (cpu_seconds - last_cpu[1]) / elapsed * 100
+        for key, value in (("cpu_percent", cpu_percent), ("rss_bytes", rss), ("threads", threads)):
+            self.totals[key] += value
+            self.peaks[key] = max(self.peaks[key], value)
+        self.samples += 1
+        return now, cpu_seconds
+
+    def stats(self):
+        averages = {key: (value / self.samples if self.samples else 0) for key, value in self.totals.items()}
+        return {
+            "session": self.id,
+            "name": self.name,
+            "command": self.command,
+            "started": self.started,
+            "ended": self.ended,
+            "duration": (self.ended or time.time()) - self.started if self.started else 0,
+            "returncode": self.returncode,
+            "timed_out": self.timed_out,
+            "samples": self.samples,
+            "peak": self.peaks,
+            "average": averages,
+            "io": self.io,
+            "staging": self.staging,
+            "log": self.log_stats,
+        }
+
+    def _finish(self):
+        if self.log_tail:
+            self.log_stats = self.log_tail.close().to_dict()
+        if self.log_file and os.path.isfile(self.log_file):
+            try:
+                shutil.copy2(self.log_file, os.path.join(self.session_dir, 'xenia.log'))
+            except OSError as e:
+                logging.error(f"Could not capture {self.log_file}: {e}")
+        with open(os.path.join(self.session_dir, 'stats.json'), 'w') as file:
+            json.dump(self.stats(), file, indent=4)
+        logging.info(f"Session {self.id} ({self.name}) exited with {self.returncode} after "
+                     f"{self.ended - self.started:.1f}s, peak RSS {self.peaks['rss_bytes'] / (1024 * 1024):.0f} MiB")
+        self.done.set()
+        for callback in self.on_exit:
+            callback(self)
+
+class ProcessSupervisor:
+    """ Owns every emulator process the manager spawns """
+    def __init__(self, sessions_dir=SESSIONS_DIR, sample_interval=1.0, sessions_kept=SESSIONS_KEPT_PER_GAME):
+        self.sessions_dir = sessions_dir
+        self.sample_interval = sample_interval
+        self.sessions_kept = sessions_kept
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def start(self, name, command, cwd, log_file=None):
+        game_dir = os.path.join(self.sessions_dir, safe_name(name))
+        session_dir = os.path.join(game_dir, time.strftime('%Y%m%d-%H%M%S') + f"-{uuid.uuid4().hex[:6]}")
+        session = EmulatorSession(name, command, cwd, session_dir, self.sample_interval, log_file)
+        # Registered before the process starts, so one that exits straight away is still forgotten
+        session.on_exit.append(self._forget)
+        with self.lock:
+            self.sessions[session.id] = session
+        try:
+            session.start()
+        except Exception:
+            self._forget(session)
+            raise
+        self._rotate(game_dir)
+        return session
+
+    def _forget(self, session):
+        with self.lock:
+            self.sessions.pop(session.id, None)
+
+    def _rotate(self, game_dir):
+        session_dirs = sorted(d for d in os.listdir(game_dir) if os.path.isdir(os.path.join(game_dir, d)))
+        for old_dir in session_dirs[:-self.sessions_kept]:
+            shutil.rmtree(os.path.join(game_dir, old_dir), ignore_errors=True)
+
+    def running(self):
+        with self.lock:
+            return [session for session in self.sessions.values() if session.running()]
+
+    def terminate_all(self):
+        for session in self.running():
+            session.terminate()
+
+class InstanceLauncher:
+    """ Runs emulator instances side by side, at most max_instances at once. Each instance gets its own copy of
+    SaveData under Staging/, and write-back into SaveData is serialized across instances and only takes newer files. """
+    def __init__(self, supervisor, max_instances=1, staging_dir=STAGING_DIR, save_data_dir=SAVE_DATA_DIR,
+                 live_write_back=True):
+        self.supervisor = supervisor
+        self.live_write_back = live_write_back
+        self.staging_dir = staging_dir
+        self.save_data_dir = save_data_dir
+        self.pool = ThreadPoolExecutor(max_workers=max_instances, thread_name_prefix="instance")
+        # Every title writes into the same SaveData/cache and SaveData/content trees, so write-back is
+        # serialized across all instances rather than per title
+        self.save_data_lock = threading.Lock()
+        self.prestaged = {}  # game folder -> PrestageJob
+        self.prestage_lock = threading.Lock()
+        # Speculative folders left behind by a previous run are never reused, their SaveData may have moved on
+        if os.path.isdir(staging_dir):
+            for entry in os.scandir(staging_dir):
+                if '-pre-' in entry.name:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+
+    def prestage(self, game_folder):
+        """ Starts copying SaveData into a staging folder for game_folder before it is launched. Every game stages
+        the same SaveData, so a copy already under way for another game is handed over to this one instead of
+        being thrown away. """
+        with self.prestage_lock:
+            for other, job in list(self.prestaged.items()):
+                if not job.cancelled.is_set() and not job.error:
+                    if other != game_folder:
+                        del self.prestaged[other]
+                        job.game_folder = game_folder
+                        self.prestaged[game_folder] = job
+                    return job
+                self.prestaged.pop(other).cancel()
+            job = PrestageJob(game_folder, self.save_data_dir, self.staging_dir).start()
+            self.prestaged[game_folder] = job
+            return job
+
+    def cancel_prestage(self):
+        with self.prestage_lock:
+            for game_folder in list(self.prestaged):
+                self.prestaged.pop(game_folder).cancel()
+
+    def _claim_prestaged(self, game_folder):
+        """ Takes over game_folder's pre-staged folder, finished or not. Returns (folder or None, mode). """
+        with self.prestage_lock:
+            job = self.prestaged.pop(game_folder, None)
+        if job is None:
+            return None, "cold"
+        finished = job.done.is_set() and not job.cancelled.is_set()
+        job.cancel(discard=False)
+        job.thread.join()
+        if job.error or not os.path.isdir(job.instance_dir):
+            shutil.rmtree(job.instance_dir, ignore_errors=True)
+            return None, "cold"
+        return job.instance_dir, "prestaged" if finished else "partial"
+
+    def submit(self, game_folder, title_key=None, progress=None, on_launch=None, **options):
+        return self.pool.submit(self.run_instance, game_folder, title_key, progress, on_launch, **options)
+
+    def run_instance(self, game_folder, title_key=None, progress=None, on_launch=None,
+                     build_dir=None, config_file=None, time_budget=None, write_back=True, game_file=None, fullscreen=False):
+        """ Stages, runs and writes back one instance. With time_budget the emulator is stopped after that
+        many seconds; write_back=False throws the session's save data away (used for compatibility runs).
+        game_file is booted directly; without it the emulator starts at its own UI. """
+        progress = progress or (lambda message, percent: None)
+        title_key = title_key or game_folder
+        if game_file and not os.path.isfile(game_file):
+            raise FileNotFoundError(f"Game file not found: {game_file}")
+        instance_dir = os.path.join(self.staging_dir, f"{safe_name(game_folder)}-{uuid.uuid4().hex[:8]}")
+        command, launch_dir = build_launch_command(game_folder, instance_dir, build_dir, config_file, game_file, fullscreen)
+        if command is None:
+            raise FileNotFoundError(f"Xenia executable not found: {launch_dir}")
+
+        watcher = None
+        keep_instance_dir = False
+        sizes = save_data_sizes() if self.save_data_dir == SAVE_DATA_DIR else None
+        with tracer.span("launch", game=game_folder, title=title_key, exe=command[0]):
+            try:
+                progress("Copying save data to game folder...", 0)
+                stage_start = time.perf_counter()
+                prestaged_dir, staging_mode = self._claim_prestaged(game_folder)
+                with tracer.span("stage", mode=staging_mode) as span:
+                    if prestaged_dir:
+                        # Most of it is already there, only reconcile what changed in SaveData since
+                        os.replace(prestaged_dir, instance_dir)
+                        copied, removed, staged_bytes = sync_tree(
+                            self.save_data_dir, instance_dir,
+                            lambda needed: ensure_free_space(instance_dir, needed, f"staging {game_folder}"))
+                        span.set(files=len(copied), removed=len(removed))
+                    else:
+                        plan = TransferPlan("stage", self.save_data_dir, instance_dir, src_index=sizes, dst_files={})
+                        plan.check()
+                        progress(f"Copying save data: {plan.summary()}", 0)
+                        copied = copy_tree(self.save_data_dir, instance_dir,
+                                           lambda done, total: progress(f"Save Data Transfer Complete: {done}/{total} files.", done * 100 // total))
+                        staged_bytes = plan.bytes
+                stage_seconds = time.perf_counter() - stage_start
+                record_throughput("stage", staged_bytes, stage_seconds)
+                staging = {"mode": staging_mode, "seconds": stage_seconds, "files_copied": len(copied), "bytes": staged_bytes}
+
+                base = WriteBackBase(instance_dir, self.save_data_dir) if write_back else None
+                if write_back and self.live_write_back:
+                    watcher = SaveDataWatcher(instance_dir, self.save_data_dir, self.save_data_lock, base).start()
+
+                progress("Launching Xenia...", 100)
+                with tracer.span("emulator") as span:
+                    session = self.supervisor.start(game_folder, command, launch_dir, os.path.join(instance_dir, 'xenia.log'))
+                    session.staging = staging
+                    if on_launch:
+                        on_launch(session)
+                    if time_budget is not None and session.wait(time_budget) is None and session.running():
+                        session.timed_out = True
+                        session.terminate()
+                    returncode = session.wait()
+                    span.set(pid=session.pid, returncode=returncode, timed_out=session.timed_out)
+                if returncode and not session.timed_out:
+                    logging.error(f"Xenia exited with code {returncode}, see {session.session_dir}")
+                if not write_back:
+                    return session
+
+                written = []
+                if watcher:
+                    watcher.stop()
+                    written.extend(sorted(watcher.written))
+                    logging.info(f"Copied {len(watcher.written)} files ({watcher.bytes_written / (1024 * 1024):.1f} MiB) "
+                                 f"back to SaveData during the session")
+
+                progress("Waiting to copy save data back...", 0)
+                with tracer.span("write_back") as span:
+                    with tracer.span("wait_for_save_data_lock"):
+                        self.save_data_lock.acquire()
+                    try:
+                        # Running out of disk half way would leave SaveData with half a session's saves
+                        plan = TransferPlan("write_back", instance_dir, self.save_data_dir, SAVE_DATA_FOLDERS,
+                                            dst_index=sizes, newer_only=True)
+                        plan.check()
+                        write_back_start = time.perf_counter()
+                        flushed = []
+                        changed = base.changed()
+                        for done, rel in enumerate(changed, start=1):
+                            if base.write_back(rel):
+                                flushed.append(rel)
+                            progress(f"Copying save data back: {done}/{len(changed)} files.", done * 100 // len(changed))
+                        record_throughput("write_back", plan.bytes, time.perf_counter() - write_back_start)
+                    except Exception as e:
+                        # The staged folder may hold the only copy of this session's saves
+                        keep_instance_dir = True
+                        logging.error(f"Copying saves back failed ({e}), this session's save data is kept in {instance_dir}")
+                        progress(f"Copying saves back failed, they are kept in {instance_dir}", 0)
+                        raise
+                    finally:
+                        self.save_data_lock.release()
+                    written.extend(flushed)
+                    span.set(files=len(flushed), conflicts=len(base.conflicts))
+                    session.save_conflicts = sorted(base.conflicts)
+                if written and self.save_data_dir == SAVE_DATA_DIR:
+                    progress("Recording save data checksums...", 100)
+                    save_data_manifest().update(written)
+                if base.conflicts:
+                    progress(f"{len(base.conflicts)} saves changed in SaveData while the game ran, "
+                             f"this session's copies are kept in {base.conflict_dir}", 100)
+                else:
+                    progress("Done.", 100)
+                return session
+            finally:
+                if watcher:
+                    watcher.stop()
+                if not keep_instance_dir:
+                    with tracer.span("cleanup_staging"):
+                        shutil.rmtree(instance_dir, ignore_errors=True)
+
+CRASH_PATTERNS = re.compile(r'(unhandled exception|access violation|fatal|assert(ion)? fail|segmentation fault|'
+                            r'abort|guest crashed|^!>)', re.IGNORECASE)
+
+def crash_signature(log_path):
+    """ Returns a normalized signature for the last crash-looking line of a xenia.log, or None """
+    last_match = None
+    try:
+        with open(log_path, 'r', errors='replace') as file:
+            for line in file:
+                if CRASH_PATTERNS.search(line):
+                    last_match = line
+    except OSError:
+        return None
+    return normalize_crash_line(last_match) if last_match is not None else None
+
+LOG_FPS_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*fps\b', re.IGNORECASE)
+LOG_FRAME_TIME_PATTERN = re.compile(r'frame\s*time\D{0,3}(\d+(?:\.\d+)?)\s*ms', re.IGNORECASE)
+LOG_SHADER_PATTERN = re.compile(r'shader.*(compil|translat)|(compil|translat).*shader', re.IGNORECASE)
+LOG_PIPELINE_PATTERN = re.compile(r'pipeline.*(creat|compil)|(creat|compil).*pipeline', re.IGNORECASE)
+LOG_MISSING_IMPORT_PATTERN = re.compile(r'unimplemented|not implemented|unresolved import|missing import', re.IGNORECASE)
+LOG_IDENTIFIER_PATTERN = re.compile(r'[A-Za-z_][A-Za-z0-9_:]{3,}')
+FRAME_TIME_BIN_MS = 0.5  # Frame time histogram resolution; frame times over 250 ms share the last bin
+FRAME_TIME_BINS = 500
+MAX_MISSING_IMPORTS = 100  # Distinct names tracked per session, the rest are counted under "(other)"
+
+def normalize_crash_line(line):
+    """ Drops thread ids, addresses and numbers so the same crash matches across runs and builds """
+    signature = re.sub(r'^[a-z!]>\s*[0-9A-Fa-f]{8}\s*', '', line.strip())
+    signature = re.sub(r'0x[0-9A-Fa-f]+|\b[0-9A-Fa-f]{8,}\b|\d+', '#', signature)
+    return signature[:200]
+
+def frame_time_percentile(histogram, fraction):
+    """ Frame time in ms below which `fraction` of the frames in a {bin: count} histogram fall """
+    total = sum(histogram.values())
+    if not total:
+        return None
+    seen = 0
+    for index in sorted(histogram, key=int):
+        seen += histogram[index]
+        if seen >= fraction * total:
+            return (int(index) + 1) * FRAME_TIME_BIN_MS
+    return FRAME_TIME_BINS * FRAME_TIME_BIN_MS
+
+class LogStats:
+    """ Performance facts pulled out of a xenia.log one line at a time. Memory stays constant however long the
+    log gets: frame times go into a fixed histogram and only a bounded number of missing import names are kept.
+    Periodic FPS lines are averages over many frames, so they are counted apart from per-frame timings. """
+    def __init__(self):
+        self.lines = 0
+        self.levels = {"warning": 0, "error": 0}
+        self.fps_samples = 0
+        self.fps_total = 0.0
+        self.fps_min = None
+        self.fps_max = None
+        self.frame_times = {}  # histogram bin -> frames
+        self.frames = 0
+        self.frame_ms_total = 0.0
+        self.shader_compiles = 0
+        self.pipeline_compiles = 0
+        self.missing_imports = {}
+        self.crash_signature = None
+
+    def feed(self, line):
+        self.lines += 1
+        if line.startswith('w>'):
+            self.levels["warning"] += 1
+        elif line.startswith(('e>', '!>')):
+            self.levels["error"] += 1
+        lower = line.lower()
+        # Cheap substring checks first; most lines match none of the patterns
+        match = 'frame' in lower and LOG_FRAME_TIME_PATTERN.search(line)
+        if match:
+            self._frame(float(match.group(1)))
+        elif 'fps' in lower:
+            match = LOG_FPS_PATTERN.search(line)
+            if match and float(match.group(1)) > 0:
+                fps = float(match.group(1))
+                self.fps_samples += 1
+                self.fps_total += fps
+                self.fps_min = fps if self.fps_min is None else min(self.fps_min, fps)
+                self.fps_max = fps if self.fps_max is None else max(self.fps_max, fps)
+        if 'shader' in lower:
+            if LOG_SHADER_PATTERN.search(line):
+                self.shader_compiles += 1
+        elif 'pipeline' in lower and LOG_PIPELINE_PATTERN.search(line):
+            self.pipeline_compiles += 1
+        if ('implemented' in lower or 'import' in lower) and LOG_MISSING_IMPORT_PATTERN.search(line):
+            names = LOG_IDENTIFIER_PATTERN.findall(line)
+            name = names[-1] if names else "(unknown)"
+            if name not in self.missing_imports and len(self.missing_imports) >= MAX_MISSING_IMPORTS:
+                name = "(other)"
+            self.missing_imports[name] = self.missing_imports.get(name, 0) + 1
+        if CRASH_PATTERNS.search(line):
+            self.crash_signature = normalize_crash_line(line)
+
+    def _frame(self, milliseconds):
+        self.frames += 1
+        self.frame_ms_total += milliseconds
+        index = str(min(int(milliseconds / FRAME_TIME_BIN_MS), FRAME_TIME_BINS - 1))
+        self.frame_times[index] = self.frame_times.get(index, 0) + 1
+
+    def to_dict(self):
+        return {
+            "lines": self.lines,
+            "levels": self.levels,
+            "fps": {"samples": self.fps_samples, "mean": self.fps_total / self.fps_samples if self.fps_samples else None,
+                    "min": self.fps_min, "max": self.fps_max},
+            "frames": self.frames,
+            "frame_ms_total": self.frame_ms_total,
+            "frame_time_ms": {"p50": frame_time_percentile(self.frame_times, 0.5),
+                              "p99": frame_time_percentile(self.frame_times, 0.99)},
+            "frame_time_histogram": self.frame_times,
+            "shader_compiles": self.shader_compiles,
+            "pipeline_compiles": self.pipeline_compiles,
+            "missing_imports": self.missing_imports,
+            "crash_signature": self.crash_signature,
+        }
+
+class LogTail:
+    """ Follows a log file that is still being written, feeding complete lines to a LogStats. Call poll()
+    periodically; it reads whatever was appended since the last call. """
+    MAX_PARTIAL_LINE = 64 * 1024
+
+    def __init__(self, path, stats=None):
+        self.path = path
+        self.stats = stats or LogStats()
+        self.file = None
+        self.partial = b''
+
+    def poll(self):
+        if self.file is None:
+            try:
+                self.file = open(self.path, 'rb')
+            except OSError:
+                return  # Not created yet
+        if os.fstat(self.file.fileno()).st_size < self.file.tell():
+            self.file.seek(0)  # Truncated, i.e. a new log
+            self.partial = b''
+        while True:
+            chunk = self.file.read(1024 * 1024)
+            if not chunk:
+                break
+            lines = (self.partial + chunk).split(b'\n')
+            self.partial = lines.pop()[-self.MAX_PARTIAL_LINE:]
+            for line in lines:
+                self.stats.feed(line.decode('utf-8', 'replace').rstrip('\r'))
+
+    def close(self):
+        self.poll()
+        if self.partial:
+            self.stats.feed(self.partial.decode('utf-8', 'replace'))
+            self.partial = b''
+        if self.file:
+            self.file.close()
+            self.file = None
+        return self.stats
+
+def build_label(command):
+    """ Which build and config preset a session ran with, for grouping performance by them """
+    exe_dir = os.path.dirname(os.path.abspath(command[0]))
+    if os.path.commonpath([exe_dir, os.path.abspath(BUILDS_DIR)]) == os.path.abspath(BUILDS_DIR):
+        build = os.path.relpath(exe_dir, BUILDS_DIR).replace(os.sep, '/')
+    elif os.path.normcase(exe_dir) == os.path.normcase(os.path.abspath(SHARED_BUILD_DIR)):
+        build = "Core/Xenia"
+    else:
+        build = exe_dir
+    config = next((arg.split('=', 1)[1] for arg in command[1:] if arg.startswith('--config=')), None)
+    return build, os.path.basename(config) if config else "default"
+
+def perf_summary(sessions_dir=SESSIONS_DIR, game=None):
+    """ Per game, build and preset: sessions, crashes, FPS and frame time percentiles over every session's
+    log stats. Returns {game: [row, ...]} with rows ordered by when that build/preset was last played. """
+    groups = {}
+    for stats_file in glob_session_stats(sessions_dir):
+        with open(stats_file) as file:
+            stats = json.load(file)
+        log = stats.get("log")
+        if not log or (game and stats.get("name") != game):
+            continue
+        build, preset = build_label(stats.get("command") or ["?"])
+        row = groups.setdefault((stats["name"], build, preset), {
+            "build": build, "preset": preset, "sessions": 0, "crashes": 0, "seconds": 0.0, "last_played": 0,
+            "fps_samples": 0, "fps_total": 0.0, "frames": 0, "frame_ms_total": 0.0, "histogram": {},
+            "shader_compiles": 0, "pipeline_compiles": 0, "missing_imports": set()})
+        row["sessions"] += 1
+        row["crashes"] += 1 if log.get("crash_signature") else 0
+        row["seconds"] += stats.get("duration") or 0
+        row["last_played"] = max(row["last_played"], stats.get("started") or 0)
+        fps = log.get("fps") or {}
+        if fps.get("samples"):
+            row["fps_samples"] += fps["samples"]
+            row["fps_total"] += fps["mean"] * fps["samples"]
+        row["frames"] += log["frames"]
+        row["frame_ms_total"] += log["frame_ms_total"]
+        for index, count in log["frame_time_histogram"].items():
+            row["histogram"][index] = row["histogram"].get(index, 0) + count
+        row["shader_compiles"] += log["shader_compiles"]
+        row["pipeline_compiles"] += log["pipeline_compiles"]
+        row["missing_imports"].update(log["missing_imports"])
+    summary = {}
+    for (name, build, preset), row in sorted(groups.items(), key=lambda item: item[1]["last_played"]):
+        # The emulator's own FPS lines when it printed any, otherwise the average over per-frame timings
+        if row["fps_samples"]:
+            fps = row["fps_total"] / row["fps_samples"]
+        else:
+            fps = row["frames"] * 1000 / row["frame_ms_total"] if row["frame_ms_total"] else None
+        row.update(fps=fps,
+                   p50_ms=frame_time_percentile(row["histogram"], 0.5), p99_ms=frame_time_percentile(row["histogram"], 0.99),
+                   missing_imports=sorted(row["missing_imports"]))
+        summary.setdefault(name, []).append(row)
+    return summary
+
+def run_compatibility(games, build_dir=None, preset=None, time_budget=60, concurrency=4, supervisor=None):
+    """ Launches each game for time_budget seconds with the given build and config preset, without touching
+    SaveData, and returns a report of how each one went """
+    if build_dir and not os.path.isdir(build_dir):
+        build_dir = build_store.resolve(build_dir) or build_dir  # Also accept an installed version
+    build_dir = os.path.abspath(build_dir) if build_dir else None
+    preset = os.path.abspath(preset) if preset else None
+    supervisor = supervisor or ProcessSupervisor(os.path.join(SESSIONS_DIR, 'compat'))
+    launcher = InstanceLauncher(supervisor, concurrency)
+    futures = {game['id']: launcher.submit(game['path'], game.get('title_id'), build_dir=build_dir, config_file=preset,
+                                           time_budget=time_budget, write_back=False, game_file=game.get('game_file') or None)
+               for game in games}
+    results = {}
+    for game in games:
+        future = futures[game['id']]
+        result = {"name": game['name'], "path": game['path']}
+        try:
+            session = future.result()
+        except Exception as e:
+            result.update(outcome="failed", error=str(e))
+        else:
+            signature = crash_signature(os.path.join(session.session_dir, 'xenia.log'))
+            if session.timed_out and not signature:
+                outcome = "ran"  # Still running when the budget ran out
+            elif session.returncode == 0 and not signature:
+                outcome = "exited"
+            else:
+                outcome = "crashed"
+            result.update(outcome=outcome, returncode=session.returncode, crash_signature=signature,
+                          session_dir=session.session_dir, stats=session.stats())
+        results[game['id']] = result
+        logging.info(f"{game['name']}: {result['outcome']}")
+    launcher.pool.shutdown()
+    return {"build": build_dir or SHARED_BUILD_DIR, "preset": preset, "time_budget": time_budget,
+            "created": time.time(), "results": results}
+
+def compare_compatibility(old_report, new_report):
+    """ Diffs two compatibility reports game by game """
+    rank = {"failed": 0, "crashed": 1, "exited": 2, "ran": 3}
+    games = {}
+    summary = {"regressed": 0, "improved": 0, "unchanged": 0, "missing": 0}
+    for game_id in sorted(set(old_report['results']) | set(new_report['results'])):
+        old = old_report['results'].get(game_id)
+        new = new_report['results'].get(game_id)
+        if old is None or new is None:
+            games[game_id] = {"name": (old or new)['name'], "change": "missing"}
+            summary["missing"] += 1
+            continue
+        delta = rank[new['outcome']] - rank[old['outcome']]
+        change = "improved" if delta > 0 else "regressed" if delta < 0 else "unchanged"
+        summary[change] += 1
+        entry = {"name": new['name'], "change": change, "old": old['outcome'], "new": new['outcome'],
+                 "old_crash_signature": old.get('crash_signature'), "new_crash_signature": new.get('crash_signature')}
+        if 'stats' in old and 'stats' in new:
+            entry["peak_rss_delta"] = new['stats']['peak']['rss_bytes'] - old['stats']['peak']['rss_bytes']
+            entry["average_cpu_delta"] = new['stats']['average']['cpu_percent'] - old['stats']['average']['cpu_percent']
+        games[game_id] = entry
+    return {"old_build": old_report['build'], "new_build": new_report['build'], "summary": summary, "games": games}
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    """ JSON over localhost HTTP for ManagerDaemon; every request must carry the token from daemon.json """
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method):
+        received = time.perf_counter()
+        manager = self.server.manager
+        if not hmac.compare_digest(self.headers.get("X-Manager-Token", ""), manager.token):
+            return self._reply(403, {"error": "bad token"})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b'{}') if length else {}
+            result = manager.handle(method, self.path, body)
+        except LookupError as e:
+            return self._reply(404, {"error": str(e)})
+        except (ValueError, TypeError) as e:
+            return self._reply(400, {"error": str(e)})
+        except Exception as e:
+            logging.exception(f"Daemon request {method} {self.path} failed")
+            return self._reply(500, {"error": str(e)})
+        if isinstance(result, dict):
+            result = dict(result, handled_ms=(time.perf_counter() - received) * 1000)
+        self._reply(200, result)
+
+    def _reply(self, code, payload):
+        data = json.dumps(payload, default=str).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logging.debug(f"daemon: {format % args}")
+
+def restrict_to_owner(path):
+    """ Makes path readable only by the current user. The 0600 mode passed to os.open covers POSIX; Windows
+    ignores it, so there the inherited ACL is replaced by a single full-control entry for the user. """
+    if os.name != 'nt':
+        os.chmod(path, 0o600)
+        return
+    user = os.environ.get("USERNAME") or os.getlogin()
+    subprocess.run(["icacls", path, "/inheritance:r", "/grant:r", f"{user}:F"],
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+class ManagerDaemon:
+    """ Resident service that keeps the games config, library index and build state loaded and serves launch,
+    status, update and backup requests on 127.0.0.1. The port and a random access token are written to
+    daemon.json (readable only by the user) for xenia_client.py and the GUI to find it. """
+    MAX_TASKS = 100
+
+    def __init__(self, port=0, build_dir=None):
+        config = load_config()
+        self.build_dir = build_dir
+        self.started = time.time()
+        self.supervisor = ProcessSupervisor(sample_interval=config.get("monitor_interval", 1.0))
+        self.launcher = InstanceLauncher(self.supervisor, config.get("max_instances", 2),
+                                         live_write_back=config.get("live_write_back", True))
+        self.jobs = ThreadPoolExecutor(max_workers=2, thread_name_prefix="daemon-job")  # Updates and backups
+        self.tasks = OrderedDict()
+        self.tasks_lock = threading.Lock()
+        self.config_mtime = None
+        self.registry = None
+        self._refresh()
+        self.token = secrets.token_hex(16)
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), DaemonRequestHandler)
+        self.server.manager = self
+        self.daemon_file = resource_path(DAEMON_FILE)
+
+    def _refresh(self):
+        """ Re-reads games_config.json only when it changed on disk, e.g. after the GUI added a game """
+        mtime = os.stat(CONFIG_FILE).st_mtime_ns if os.path.isfile(CONFIG_FILE) else None
+        if self.registry is None or mtime != self.config_mtime:
+            self.config = load_config()
+            self.registry = GameRegistry(self.config.get('games', []))
+            self.names = {game['name'].casefold(): game for game in self.registry}
+            self.config_mtime = os.stat(CONFIG_FILE).st_mtime_ns
+        return self.registry
+
+    def find_game(self, key):
+        registry = self._refresh()
+        game = registry.get(key) or registry.find_by_path(key) or self.names.get(key.casefold())
+        if game is None:
+            raise LookupError(f"No game with id, folder or name {key!r}")
+        return game
+
+    def _add_task(self, kind, **fields):
+        task = dict(id=uuid.uuid4().hex[:8], kind=kind, state="running", created=time.time(), message="", **fields)
+        with self.tasks_lock:
+            self.tasks[task['id']] = task
+            while len(self.tasks) > self.MAX_TASKS:
+                self.tasks.popitem(last=False)
+        return task
+
+    def _track(self, task, future):
+        def finished(future):
+            error = future.exception()
+            task.update(state="failed" if error else "done", finished=time.time(),
+                        message=str(error) if error else task['message'])
+            if not error and isinstance(future.result(), EmulatorSession):
+                task['returncode'] = future.result().returncode
+        future.add_done_callback(finished)
+        return task
+
+    def handle(self, method, path, body):
+        route = (method, path.split('?')[0].rstrip('/') or '/')
+        if route == ("GET", "/ping"):
+            return {"ok": True}
+        if route == ("GET", "/status"):
+            return self.status()
+        if method == "GET" and route[1].startswith("/tasks/"):
+            with self.tasks_lock:
+                task = self.tasks.get(route[1][len("/tasks/"):])
+            if task is None:
+                raise LookupError("No such task")
+            return dict(task)
+        if route == ("POST", "/launch"):
+            return self.launch(body)
+        if route == ("POST", "/update"):
+            jobs = body.get("jobs") or list(UPDATE_JOBS)
+            unknown = set(jobs) - set(UPDATE_JOBS)
+            if unknown:
+                raise ValueError(f"Unknown update jobs: {', '.join(sorted(unknown))}")
+            task = self._add_task("update", jobs=jobs)
+            return self._track(task, self.jobs.submit(self._update, task, jobs))
+        if route == ("POST", "/backup"):
+            task = self._add_task("backup")
+            return self._track(task, self.jobs.submit(self._backup, task))
+        if route == ("POST", "/shutdown"):
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return {"id": None, "state": "done", "message": "Shutting down"}
+        raise LookupError(f"No route for {method} {path}")
+
+    def launch(self, body):
+        if body.get("game"):
+            game = self.find_game(body["game"])
+            folder, title_key, game_file = game['path'], game.get('title_id') or None, game.get('game_file') or None
+            build_dir = build_store.resolve(game.get('build'))
+        elif body.get("folder"):
+            folder, title_key, build_dir = body["folder"], body.get("title_key"), body.get("build_dir")
+            game_file = body.get("game_file")
+        else:
+            raise ValueError("launch needs a game or a folder")
+        task = self._add_task("launch", game=folder)
+
+        def progress(message, percent):
+            task.update(message=message, percent=percent)
+
+        def on_launch(session):
+            task.update(session=session.id, pid=session.pid)
+        fullscreen = body.get("fullscreen", load_config().get("fullscreen", False))
+        future = self.launcher.submit(folder, title_key, progress, on_launch, build_dir=build_dir or self.build_dir,
+                                      game_file=game_file, fullscreen=fullscreen)
+        return dict(self._track(task, future))
+
+    def _update(self, task, jobs):
+        results, wall = UpdateOrchestrator(jobs).run(lambda name, percent, message: task.update(message=f"{name}: {message}"))
+        task['results'] = results
+        failed = [name for name, result in results.items() if not result['ok']]
+        if failed:
+            raise RuntimeError(f"Updating {', '.join(failed)} failed")
+
+    def _backup(self, task):
+        problems = copy_save_data(SAVE_DATA_DIR, BACKUPS_DIR)
+        if problems:
+            raise RuntimeError(f"{len(problems)} files did not copy correctly, e.g. {problems[0]}")
+        task['message'] = "Backup completed"
+
+    def status(self):
+        with self.tasks_lock:
+            tasks = [dict(task) for task in self.tasks.values()]
+        return {"pid": os.getpid(), "uptime": time.time() - self.started, "games": len(self._refresh()),
+                "builds": {channel: build_store.active(channel) for channel in BuildStore.CHANNELS},
+                "sessions": [{"id": session.id, "game": session.name, "pid": session.pid, "started": session.started,
+                              "exe": session.command[0]}
+                             for session in self.supervisor.running()],
+                "prestaged": list(self.launcher.prestaged), "tasks": tasks}
+
+    def serve_forever(self):
+        temp_file = self.daemon_file + '.tmp'
+        with open(os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as file:
+            restrict_to_owner(temp_file)  # Before the token is written
+            json.dump({"pid": os.getpid(), "port": self.server.server_address[1], "token": self.token}, file)
+        os.replace(temp_file, self.daemon_file)
+        logging.info(f"Manager service listening on 127.0.0.1:{self.server.server_address[1]}")
+        if self.config.get("prestage", True):
+            game = predict_next_game(self.config.get('games', []))
+            if game:
+                self.launcher.prestage(game['path'])
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            try:
+                os.remove(self.daemon_file)
+            except FileNotFoundError:
+                pass
+            self.launcher.cancel_prestage()
+            # Let running games finish and write their saves back before exiting
+            self.launcher.pool.shutdown(wait=True)
+            self.jobs.shutdown(wait=True)
+
+def copy_tree(src, dst, progress=None, newer_only=False):
+    """ Copies the files under src into dst, calling progress(done, total) per file. With newer_only, a file is
+    only copied if it is missing or newer in dst, and lands via a temp file + rename so a concurrent reader never
+    sees it half written. Returns the paths copied, relative to dst. """
+    with tracer.span("copy_tree", src=src, dst=dst, newer_only=newer_only) as span:
+        copied = _copy_tree(src, dst, progress, newer_only)
+        if tracer.enabled:
+            span.set(files=len(copied), bytes=sum(os.path.getsize(os.path.join(dst, rel)) for rel in copied))
+        return copied
+
+def _copy_tree(src, dst, progress, newer_only):
+    files = []
+    for root, dirs, names in os.walk(src):
+        files.extend(os.path.join(root, name) for name in names)
+    copied = []
+    for done, src_file in enumerate(files, start=1):
+        dst_file = os.path.join(dst, os.path.relpath(src_file, src))
+        os.makedirs(os.path.dirname(dst_file), exist_ok=True)
+        if newer_only:
+            if copy_file_if_newer(src_file, dst_file):
+                copied.append(os.path.relpath(src_file, src))
+        else:
+            shutil.copy2(src_file, dst_file)
+            copied.append(os.path.relpath(src_file, src))
+        if progress:
+            progress(done, len(files))
+    return copied
+
+def copy_file_if_newer(src_file, dst_file):
+    """ Copies src_file over dst_file if it is missing or older, via a temp file + rename. Returns whether it did. """
+    try:
+        if os.stat(src_file).st_mtime_ns <= os.stat(dst_file).st_mtime_ns:
+            return False
+    except FileNotFoundError:
+        if not os.path.isfile(src_file):
+            return False
+    os.makedirs(os.path.dirname(dst_file), exist_ok=True)
+    temp_file = f"{dst_file}.{uuid.uuid4().hex[:8]}.tmp"
+    shutil.copy2(src_file, temp_file)
+    os.replace(temp_file, dst_file)
+    return True
+
+def sync_tree(src, dst, check_space=None):
+    """ Makes dst match src: copies files whose size or mtime differ and deletes files src doesn't have.
+    check_space(bytes) is called with the total to copy before anything is copied. Returns (copied, removed)
+    relative paths and the bytes copied. """
+    wanted = {}
+    for root, dirs, files in os.walk(src):
+        for file in files:
+            path = os.path.join(root, file)
+            wanted[os.path.relpath(path, src)] = os.stat(path)
+    copied, removed = [], []
+    for root, dirs, files in os.walk(dst):
+        for file in files:
+            path = os.path.join(root, file)
+            if os.path.relpath(path, dst) not in wanted:
+                os.remove(path)
+                removed.append(os.path.relpath(path, dst))
+    to_copy = []
+    for rel, stat in wanted.items():
+        try:
+            dst_stat = os.stat(os.path.join(dst, rel))
+            if dst_stat.st_size == stat.st_size and dst_stat.st_mtime_ns == stat.st_mtime_ns:
+                continue
+        except FileNotFoundError:
+            pass
+        to_copy.append((rel, stat.st_size))
+    bytes_copied = sum(size for rel, size in to_copy)
+    if check_space:
+        check_space(bytes_copied)
+    for rel, size in to_copy:
+        dst_file = os.path.join(dst, rel)
+        os.makedirs(os.path.dirname(dst_file), exist_ok=True)
+        shutil.copy2(os.path.join(src, rel), dst_file)
+        copied.append(rel)
+    return copied, removed, bytes_copied
+
+class PrestageJob:
+    """ Copies SaveData into a staging folder in the background ahead of a launch, which also pulls it into the
+    page cache. Copies at most max_rate bytes per second, gives up past max_bytes or when the disk would be left
+    with less than FREE_SPACE_MARGIN, and stops as soon as it is cancelled. Whatever it managed to copy is reconciled with sync_tree at launch. The copy is the same for
+    every game, so game_folder only says who it is meant for and can be changed while it runs. """
+    def __init__(self, game_folder, save_data_dir, staging_dir, max_rate=PRESTAGE_MAX_RATE, max_bytes=PRESTAGE_MAX_BYTES):
+        self.game_folder = game_folder
+        self.save_data_dir = save_data_dir
+        self.instance_dir = os.path.join(staging_dir, f"SaveData-pre-{uuid.uuid4().hex[:8]}")
+        self.max_rate = max_rate
+        self.max_bytes = max_bytes
+        self.bytes_copied = 0
+        self.error = None
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="prestage", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def cancel(self, discard=True):
+        """ Stops the copy without waiting for it. With discard the folder is deleted on a background thread
+        once the copy has stopped, so this is safe to call from the GUI thread. """
+        self.cancelled.set()
+        if discard:
+            threading.Thread(target=self._discard, name="prestage-cleanup", daemon=True).start()
+
+    def _discard(self):
+        self.thread.join()
+        shutil.rmtree(self.instance_dir, ignore_errors=True)
+
+    def _skip(self, reason, message):
+        logging.info(f"Not pre-staging {self.game_folder}: {message}")
+        self.error = reason
+        shutil.rmtree(self.instance_dir, ignore_errors=True)
+
+    def _run(self):
+        with tracer.span("prestage", game=self.game_folder) as span:
+            start = time.monotonic()
+            try:
+                # Speculative, so it must never be what fills the disk up: check the whole copy before starting
+                sizes = save_data_sizes() if self.save_data_dir == SAVE_DATA_DIR else None
+                plan = TransferPlan("prestage", self.save_data_dir, self.instance_dir, src_index=sizes, dst_files={})
+                span.set(planned=plan.bytes)
+                if plan.bytes > self.max_bytes:
+                    return self._skip("too large", "SaveData is over the size limit")
+                if not plan.fits:
+                    return self._skip("no space", f"{plan.bytes / (1024 * 1024):.0f} MiB needed, "
+                                                  f"{plan.free / (1024 * 1024):.0f} MiB free")
+                for root, dirs, files in os.walk(self.save_data_dir):
+                    for file in files:
+                        if self.cancelled.is_set():
+                            return
+                        src_file = os.path.join(root, file)
+                        dst_file = os.path.join(self.instance_dir, os.path.relpath(src_file, self.save_data_dir))
+                        # The index is only an estimate and other writers share the disk, so keep checking
+                        if os.path.getsize(src_file) + FREE_SPACE_MARGIN > free_space(self.instance_dir):
+                            return self._skip("no space", "the disk is filling up")
+                        os.makedirs(os.path.dirname(dst_file), exist_ok=True)
+                        shutil.copy2(src_file, dst_file)
+                        self.bytes_copied += os.path.getsize(dst_file)
+                        if self.bytes_copied > self.max_bytes:
+                            return self._skip("too large", "SaveData is over the size limit")
+                        delay = self.bytes_copied / self.max_rate - (time.monotonic() - start)
+                        if delay > 0 and self.cancelled.wait(delay):
+                            return
+            except OSError as e:
+                logging.warning(f"Pre-staging {self.game_folder} failed: {e}")
+                self.error = e
+            finally:
+                span.set(bytes=self.bytes_copied, cancelled=self.cancelled.is_set())
+                self.done.set()
+
+def predict_next_game(games, sessions_dir=SESSIONS_DIR):
+    """ The game most likely to be launched next, going by launch history: the one played most recently """
+    latest = None
+    for game in games:
+        game_dir = os.path.join(sessions_dir, safe_name(game['path']))
+        if not os.path.isdir(game_dir):
+            continue
+        last_played = max((entry.name for entry in os.scandir(game_dir) if entry.is_dir()), default=None)
+        if last_played and (latest is None or last_played > latest[0]):
+            latest = (last_played, game)
+    return latest[1] if latest else None
+
+def file_stamp(path):
+    """ Returns (size, mtime_ns) of a file, or None if it doesn't exist """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+class WriteBackBase:
+    """ What a staged instance folder and SaveData held right after staging. Writing back is three-way against it:
+    a save this session didn't touch is left alone, and one that another instance of the title wrote back since
+    staging is never overwritten, the session's copy is set aside under SESSION_CONFLICTS_DIR instead.
+    Callers hold the SaveData lock around write_back. """
+    def __init__(self, instance_dir, save_data_dir):
+        self.instance_dir = instance_dir
+        self.save_data_dir = save_data_dir
+        self.conflict_dir = os.path.join(SESSION_CONFLICTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.path.basename(instance_dir)}")
+        self.conflicts = set()
+        self.stamps = {}  # relative path -> (instance stamp, SaveData stamp)
+        for folder in SAVE_DATA_FOLDERS:
+            for root, dirs, files in os.walk(os.path.join(instance_dir, folder)):
+                for file in files:
+                    rel = os.path.relpath(os.path.join(root, file), instance_dir)
+                    self.stamps[rel] = (file_stamp(os.path.join(instance_dir, rel)), file_stamp(os.path.join(save_data_dir, rel)))
+
+    def changed(self):
+        """ Returns the relative paths under SAVE_DATA_FOLDERS the session has written since staging """
+        changed = []
+        for folder in SAVE_DATA_FOLDERS:
+            for root, dirs, files in os.walk(os.path.join(self.instance_dir, folder)):
+                for file in files:
+                    rel = os.path.relpath(os.path.join(root, file), self.instance_dir)
+                    base = self.stamps.get(rel)
+                    if not file.endswith('.tmp') and (base is None or file_stamp(os.path.join(root, file)) != base[0]):
+                        changed.append(rel)
+        return changed
+
+    def write_back(self, rel):
+        """ Copies one save back into SaveData via a temp file + rename. Returns whether it did. """
+        src_file = os.path.join(self.instance_dir, rel)
+        dst_file = os.path.join(self.save_data_dir, rel)
+        src_stamp = file_stamp(src_file)
+        base = self.stamps.get(rel, (None, None))
+        if src_stamp is None or src_stamp == base[0]:
+            return False
+        dst_stamp = file_stamp(dst_file)
+        if dst_stamp != base[1] and dst_stamp != src_stamp:
+            # Another instance wrote this save back after we staged; overwriting it would lose that session
+            conflict_file = os.path.join(self.conflict_dir, rel)
+            os.makedirs(os.path.dirname(conflict_file), exist_ok=True)
+            shutil.copy2(src_file, conflict_file)
+            if rel not in self.conflicts:
+                logging.warning(f"{rel} changed in SaveData while this session ran, kept this session's copy in {self.conflict_dir}")
+            self.conflicts.add(rel)
+            self.stamps[rel] = (src_stamp, base[1])
+            return False
+        if dst_stamp != src_stamp:
+            os.makedirs(os.path.dirname(dst_file), exist_ok=True)
+            temp_file = f"{dst_file}.{uuid.uuid4().hex[:8]}.tmp"
+            shutil.copy2(src_file, temp_file)
+            os.replace(temp_file, dst_file)
+        self.stamps[rel] = (src_stamp, file_stamp(dst_file))
+        return dst_stamp != src_stamp
+
+class SaveDataWatcher(FileSystemEventHandler):
+    """ Copies saves back from a staged instance folder into SaveData while the game is still running, so only
+    a small flush is left at exit and a crash of the manager loses at most the last few seconds. Changes come
+    from watchdog when it is installed, otherwise from rescanning every poll_interval. A file is copied once it
+    has been quiet for debounce seconds, at no more than max_rate bytes per second. """
+    def __init__(self, instance_dir, save_data_dir, save_data_lock, base, debounce=WRITE_BACK_DEBOUNCE,
+                 poll_interval=WRITE_BACK_POLL_INTERVAL, max_rate=WRITE_BACK_MAX_RATE):
+        super().__init__()
+        self.instance_dir = instance_dir
+        self.save_data_dir = save_data_dir
+        self.save_data_lock = save_data_lock
+        self.base = base
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.max_rate = max_rate
+        self.dirty = {}  # relative path -> time of the last change seen
+        self.written = set()
+        self.bytes_written = 0
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.observer = None
+        self.threads = []
+
+    def start(self):
+        self.snapshot = self._scan()
+        if Observer is not None:
+            self.observer = Observer()
+            for folder in SAVE_DATA_FOLDERS:
+                folder_path = os.path.join(self.instance_dir, folder)
+                os.makedirs(folder_path, exist_ok=True)
+                self.observer.schedule(self, folder_path, recursive=True)
+            self.observer.start()
+        else:
+            self.threads.append(threading.Thread(target=self._poll, name="write-back-poll", daemon=True))
+        self.threads.append(threading.Thread(target=self._run, name="write-back", daemon=True))
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        """ Stops watching; whatever hasn't been copied yet is left to the final write-back """
+        self.stopped.set()
+        if self.observer:
+            self.observer.stop()
+            self.observer.join()
+        for thread in self.threads:
+            thread.join()
+
+    def _mark(self, path):
+        rel = os.path.relpath(path, self.instance_dir)
+        if not rel.startswith('..') and not path.endswith('.tmp'):
+            with self.lock:
+                self.dirty[rel] = time.monotonic()
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._mark(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._mark(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self._mark(event.dest_path)
+
+    def _scan(self):
+        found = {}
+        for folder in SAVE_DATA_FOLDERS:
+            for root, dirs, files in os.walk(os.path.join(self.instance_dir, folder)):
+                for file in files:
+                    path = os.path.join(root, file)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    found[path] = (stat.st_size, stat.st_mtime_ns)
+        return found
+
+    def _poll(self):
+        while not self.stopped.wait(self.poll_interval):
+            current = self._scan()
+            for path, stat in current.items():
+                if self.snapshot.get(path) != stat:
+                    self._mark(path)
+            self.snapshot = current
+
+    def _run(self):
+        while not self.stopped.wait(min(0.5, self.debounce)):
+            now = time.monotonic()
+            with self.lock:
+                ready = [rel for rel, changed in self.dirty.items() if now - changed >= self.debounce]
+                for rel in ready:
+                    del self.dirty[rel]
+            if ready:
+                self._flush(ready)
+
+    def _flush(self, rel_paths):
+        with tracer.span("live_write_back", files=len(rel_paths)) as span:
+            copied = 0
+            flushed = []
+            for rel in rel_paths:
+                if self.stopped.is_set():
+                    break
+                src_file = os.path.join(self.instance_dir, rel)
+                start = time.monotonic()
+                with self.save_data_lock:
+                    try:
+                        if not self.base.write_back(rel):
+                            continue
+                    except OSError as e:  # Still being written, or gone again; the final write-back catches up
+                        logging.warning(f"Live write-back of {rel} failed: {e}")
+                        continue
+                size = os.path.getsize(src_file)
+                flushed.append(rel)
+                self.written.add(rel)
+                self.bytes_written += size
+                copied += size
+                # Throttle so the copy never competes with the emulator's own disk access
+                delay = size / self.max_rate - (time.monotonic() - start)
+                if delay > 0:
+                    self.stopped.wait(delay)
+            # Recorded right away: if the manager dies mid-session these saves must not look corrupt later
+            if flushed and self.save_data_dir == SAVE_DATA_DIR:
+                save_data_manifest().update(flushed)
+            span.set(bytes=copied)
 
 class CopyThread(QThread):
     progress = pyqtSignal(int)
@@ -46,42 +3503,330 @@ class CopyThread(QThread):
         self.dst = dst  # Properly assign self.dst
 
     def run(self):
-        total_files = sum([len(files) for r, d, files in os.walk(self.src)])
-        copied_files = 0
+        copy_tree(self.src, self.dst, self.report)
 
-        for root, dirs, files in os.walk(self.src):
-            for file in files:
-                src_file = os.path.join(root, file)
-                dst_file = os.path.join(self.dst, os.path.relpath(src_file, self.src))
-                dst_dir = os.path.dirname(dst_file)
-                if not os.path.exists(dst_dir):
-                    os.makedirs(dst_dir)
-                shutil.copy2(src_file, dst_file)
-                copied_files += 1
-                progress_percent = int((copied_files / total_files) * 100)
-                self.progress.emit(progress_percent)
-                self.update_text.emit(f"Save Data Transfer Complete: {copied_files}/{total_files} files.")
+    def report(self, copied_files, total_files):
+        self.progress.emit(int((copied_files / total_files) * 100))
+        self.update_text.emit(f"Save Data Transfer Complete: {copied_files}/{total_files} files.")
+
+class UpdateThread(QThread):
+    progress = pyqtSignal(str, int, str)
+    completed = pyqtSignal(dict)
+
+    def __init__(self, job_names, parent=None):
+        super().__init__(parent)
+        self.job_names = job_names
+
+    def run(self):
+        results, _ = UpdateOrchestrator(self.job_names).run(self.progress.emit)
+        self.completed.emit(results)
+
+class UpdateCheckThread(QThread):
+    checked = pyqtSignal(dict)
+
+    def __init__(self, checker, parent=None):
+        super().__init__(parent)
+        self.checker = checker
+
+    def run(self):
+        try:
+            self.checked.emit(self.checker.check())
+        except Exception as e:
+            logging.error(f"Update check failed: {e}")
+
+class UpdateProgressDialog(QDialog):
+    """ One progress bar per update job """
+    def __init__(self, job_names, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Updating")
+        self.setMinimumWidth(450)
+        layout = QVBoxLayout()
+        self.bars = {}
+        self.labels = {}
+        for name in job_names:
+            label = QLabel(f"{name}: waiting...", self)
+            bar = QProgressBar(self)
+            bar.setMaximum(100)
+            layout.addWidget(label)
+            layout.addWidget(bar)
+            self.labels[name] = label
+            self.bars[name] = bar
+        self.setLayout(layout)
+
+    def update_job(self, name, percent, message):
+        self.bars[name].setValue(percent)
+        self.labels[name].setText(f"{name}: {message}")
+
+class PatchesDialog(QDialog):
+    """ Checkbox list of every patch the index knows for a title ID """
+    def __init__(self, patch_index, title_id, parent=None):
+        super().__init__(parent)
+        self.patch_index = patch_index
+        self.title_id = title_id
+        self.setWindowTitle(f"Patches for {title_id}")
+        self.setMinimumSize(500, 400)
+        layout = QVBoxLayout()
+        self.patch_list = QListWidget(self)
+        for file_name, entry in patch_index.for_title(title_id):
+            for position, patch in enumerate(entry['patches']):
+                item = QListWidgetItem(f"{patch['name']}  ({file_name})", self.patch_list)
+                item.setData(Qt.UserRole, (file_name, position))
+                item.setCheckState(Qt.Checked if patch['enabled'] else Qt.Unchecked)
+        layout.addWidget(self.patch_list)
+
+        buttons = QHBoxLayout()
+        for text, icon, func in [("Enable All", "fa.check-square-o", lambda: self.set_all(Qt.Checked)),
+                                 ("Disable All", "fa.square-o", lambda: self.set_all(Qt.Unchecked)),
+                                 ("Save", "fa.save", self.save)]:
+            button = QPushButton(text, self)
+            button.setIcon(qta.icon(icon))
+            button.clicked.connect(func)
+            buttons.addWidget(button)
+        layout.addLayout(buttons)
+        self.setLayout(layout)
+
+    def set_all(self, state):
+        for row in range(self.patch_list.count()):
+            self.patch_list.item(row).setCheckState(state)
+
+    def save(self):
+        wanted = {True: {}, False: {}}
+        for row in range(self.patch_list.count()):
+            item = self.patch_list.item(row)
+            file_name, position = item.data(Qt.UserRole)
+            wanted[item.checkState() == Qt.Checked].setdefault(file_name, set()).add(position)
+        for enabled, files in wanted.items():
+            for file_name, positions in files.items():
+                self.patch_index.set_enabled(self.title_id, enabled, file_name=file_name, positions=positions)
+        self.accept()
+
+class LaunchSignals(QObject):
+    progress = pyqtSignal(int)
+    update_text = pyqtSignal(str)
+    finished = pyqtSignal()
+
+class ImageCache:
+    """ Decodes each image file once and keeps scaled variants, LRU evicted under a byte cap.
+    Holds QImages so it can be used from worker threads as well as the GUI thread. """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # (path, width, height, aspect mode, transform) -> QImage
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def _get(self, key):
+        with self.lock:
+            image = self.entries.get(key)
+            if image is not None:
+                self.entries.move_to_end(key)
+            return image
+
+    def _put(self, key, image):
+        with self.lock:
+            if key in self.entries:
+                return self.entries[key]
+            self.entries[key] = image
+            self.total_bytes += image.sizeInBytes()
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= evicted.sizeInBytes()
+            return image
+
+    def source(self, path):
+        key = (path, None, None, None, None)
+        image = self._get(key)
+        if image is None:
+            reader = QImageReader(path)
+            reader.setAutoTransform(True)
+            # A failed decode is cached as a null image so missing files don't hit the disk again
+            image = self._put(key, reader.read())
+        return image
+
+    def scaled(self, path, size, aspect_mode=Qt.KeepAspectRatio, transform=Qt.SmoothTransformation):
+        key = (path, size.width(), size.height(), aspect_mode, transform)
+        image = self._get(key)
+        if image is None:
+            source = self.source(path)
+            image = source if source.isNull() else source.scaled(size, aspect_mode, transform)
+            if transform == Qt.SmoothTransformation:  # Fast scales are throwaway resize frames
+                image = self._put(key, image)
+        return image
+
+    def thumbnail(self, path, size):
+        """ path decoded straight down to fit size. Only the small result is cached, never the full-size source. """
+        key = (path, size.width(), size.height(), 'thumbnail', None)
+        image = self._get(key)
+        if image is None:
+            reader = QImageReader(path)
+            reader.setAutoTransform(True)
+            source_size = reader.size()
+            rotated = bool(reader.transformation() & QImageIOHandler.TransformationRotate90)
+            if source_size.isValid():
+                # The scaled size applies before the orientation transform, so fit the transposed box for rotations
+                fit = source_size.scaled(size.transposed() if rotated else size, Qt.KeepAspectRatio)
+                if fit.width() < source_size.width():
+                    reader.setScaledSize(fit)
+            image = reader.read()
+            if not image.isNull() and image.width() < size.width() and image.height() < size.height():
+                image = image.scaled(size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            image = self._put(key, image)
+        return image
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+image_cache = ImageCache(IMAGE_CACHE_MAX_BYTES)
 
 class HeaderWidget(QWidget):
     def __init__(self, image_path, parent=None):
         super().__init__(parent)
         self.image_path = image_path
+        self.smooth_timer = QTimer(self)
+        self.smooth_timer.setSingleShot(True)
+        self.smooth_timer.setInterval(150)
+        self.smooth_timer.timeout.connect(self.update_palette)
         self.initUI()
 
     def initUI(self):
         self.setFixedHeight(200)  # Set the height of the header
         self.update_palette()
 
-    def update_palette(self):
+    def update_palette(self, transform=Qt.SmoothTransformation):
+        if self.width() <= 0 or self.height() <= 0:
+            return
+        image = image_cache.scaled(self.image_path, self.size(), Qt.KeepAspectRatioByExpanding, transform)
         palette = QPalette()
-        pixmap = QPixmap(self.image_path)
-        scaled_pixmap = pixmap.scaled(self.width(), self.height(), Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
-        palette.setBrush(QPalette.Window, QBrush(scaled_pixmap))
+        palette.setBrush(QPalette.Window, QBrush(QPixmap.fromImage(image)))
         self.setPalette(palette)
         self.setAutoFillBackground(True)
 
     def resizeEvent(self, event):
-        self.update_palette()
+        # Cheap scale while the window is being dragged, smooth one once it settles
+        self.update_palette(Qt.FastTransformation)
+        self.smooth_timer.start()
+
+def game_image_path(game):
+    image_name = game.get('image_path', '')
+    if not image_name or image_name.lower() == 'none':
+        return None
+    return os.path.join(IMAGES_DIR, image_name)
+
+class ThumbnailSignals(QObject):
+    loaded = pyqtSignal(str, QImage)
+
+class ThumbnailLoader(QRunnable):
+    """ Decodes a cover image off the GUI thread, scaled down while reading """
+    def __init__(self, image_path, size, signals):
+        super().__init__()
+        self.image_path = image_path
+        self.size = size
+        self.signals = signals
+
+    def run(self):
+        self.signals.loaded.emit(self.image_path, image_cache.thumbnail(self.image_path, self.size))
+
+class SaveDataCopySignals(QObject):
+    finished = pyqtSignal(list)
+    failed = pyqtSignal(str)
+
+class SaveDataCopyJob(QRunnable):
+    """ Runs a backup or restore off the GUI thread: hashing every file on both sides can take minutes """
+    def __init__(self, src_dir, dst_dir, plan, signals):
+        super().__init__()
+        self.src_dir = src_dir
+        self.dst_dir = dst_dir
+        self.plan = plan
+        self.signals = signals
+
+    def run(self):
+        try:
+            problems = copy_save_data(self.src_dir, self.dst_dir, self.plan)
+        except subprocess.CalledProcessError as e:
+            self.signals.failed.emit(f"Copying save data failed (xcopy exit code {e.returncode}). "
+                                     "Nothing has been marked as verified.")
+        except (OSError, ValueError) as e:
+            self.signals.failed.emit(f"Copying save data failed: {e}")
+        else:
+            self.signals.finished.emit(problems)
+
+class GameListModel(QAbstractListModel):
+    GameRole = Qt.UserRole + 1
+
+    def __init__(self, games, parent=None):
+        super().__init__(parent)
+        self.placeholder_icon = qta.icon("fa.gamepad")
+        self.thumbnails = OrderedDict()  # image path -> QIcon (None if it failed to load), LRU ordered
+        # Decoded pixels live in image_cache; this only avoids rebuilding QIcons on repaint
+        self.pending = set()
+        self.signals = ThumbnailSignals(self)
+        self.signals.loaded.connect(self.on_thumbnail_loaded)
+        self.set_games(games)
+
+    def set_games(self, games):
+        self.beginResetModel()
+        self.games = list(games)
+        self.rows_by_image = {}
+        for row, game in enumerate(self.games):
+            image_path = game_image_path(game)
+            if image_path:
+                self.rows_by_image.setdefault(image_path, []).append(row)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.games)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        game = self.games[index.row()]
+        if role == Qt.DisplayRole:
+            return game['name']
+        if role == Qt.ToolTipRole:
+            return os.path.join(CORE_DIR, game['path'])
+        if role == Qt.DecorationRole:
+            return self.thumbnail(game)
+        if role == self.GameRole:
+            return game
+        return None
+
+    def thumbnail(self, game):
+        image_path = game_image_path(game)
+        if image_path is None:
+            return self.placeholder_icon
+        if image_path in self.thumbnails:
+            self.thumbnails.move_to_end(image_path)
+            return self.thumbnails[image_path] or self.placeholder_icon
+        # Only rows the view actually paints get here, so covers load lazily as you scroll
+        if image_path not in self.pending:
+            self.pending.add(image_path)
+            QThreadPool.globalInstance().start(ThumbnailLoader(image_path, THUMBNAIL_SIZE, self.signals))
+        return self.placeholder_icon
+
+    def on_thumbnail_loaded(self, image_path, image):
+        self.pending.discard(image_path)
+        self.thumbnails[image_path] = None if image.isNull() else QIcon(QPixmap.fromImage(image))
+        while len(self.thumbnails) > THUMBNAIL_CACHE_SIZE:
+            self.thumbnails.popitem(last=False)
+        for row in self.rows_by_image.get(image_path, []):
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+class GameFilterProxyModel(QSortFilterProxyModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.search_text = ""
+
+    def set_search_text(self, text):
+        self.search_text = text.strip().lower()
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if not self.search_text:
+            return True
+        game = self.sourceModel().games[source_row]
+        return self.search_text in game['name'].lower() or self.search_text in game['path'].lower()
 
 class GameItemWidget(QWidget):
     def __init__(self, game, parent=None):
@@ -105,23 +3850,42 @@ class GameItemWidget(QWidget):
         self.setLayout(layout)
 
     def launch_game(self):
-        self.parent().launch_game(self.game['path'])
+        self.parent().launch_game_by_id(self.game['id'])
 
     def edit_config(self):
-        self.parent().edit_config(self.game['path'])
+        self.parent().edit_game_config(self.game['id'])
 
     def remove_game(self):
-        self.parent().remove_game(self.game)
+        self.parent().remove_game(self.game['id'])
 
     def open_folder(self):
-        self.parent().open_folder(self.game['path'])
+        self.parent().open_game_folder(self.game['id'])
 
 class XeniaManager(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Xenia Manager V2")
         self.setGeometry(300, 300, 800, 600)  # Increase the window size for better readability
+        self.config = self.registry = self.config_mtime = None
+        self.games_model = GameListModel([], self)
+        self.games_proxy = GameFilterProxyModel(self)
+        self.games_proxy.setSourceModel(self.games_model)
+        config = self.load_config()
+        self.supervisor = ProcessSupervisor(sample_interval=config.get("monitor_interval", 1.0))
+        self.launcher = InstanceLauncher(self.supervisor, config.get("max_instances", 2),
+                                         live_write_back=config.get("live_write_back", True))
+        self.available_updates = {}
+        self.update_checker = UpdateChecker(update_source_from_config(config.get("update_source"), config.get("github_api_url")),
+                                            min_interval=config.get("update_check_interval", UPDATE_CHECK_INTERVAL))
         self.initUI()
+        if config.get("check_updates", True):
+            # Started from the event loop once the window is up, and re-run on a timer; never blocks startup
+            self.update_check_timer = QTimer(self)
+            self.update_check_timer.timeout.connect(self.check_for_updates)
+            self.update_check_timer.start(int(self.update_checker.min_interval * 1000))
+            QTimer.singleShot(0, self.check_for_updates)
+        if config.get("prestage", True):
+            QTimer.singleShot(0, self.prestage_predicted_game)
 
     def initUI(self):
         self.show_initial_prompt()
@@ -252,17 +4016,17 @@ class XeniaManager(QMainWindow):
             message = ("Would you like to update Xenia and download patches?\n\n"
                        "Details:\n"
                        "- Update Xenia to the latest version from https://github.com/xenia-canary/xenia-canary.\n"
+                       "- Update Non Canary Xenia from https://github.com/xenia-project/release-builds-windows.\n"
                        "- Download new game patches from https://github.com/xenia-canary/game-patches.\n"
-                       "- This process might take a few minutes depending on your internet connection.")
+                       "- These are downloaded at the same time and might take a few minutes depending on your internet connection.")
             reply = QMessageBox.question(self, "Initial Setup", message, QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
             if reply == QMessageBox.Yes:
-                self.update_xenia()
-                self.update_patches()
+                self.run_updates(["canary", "non-canary", "patches"])
             config["prompt_shown"] = True
             self.save_config(config)
 
-    def toggle_auto_launch(self):
-        self._toggle_config_option("auto_launch", "Auto Launch")
+    def toggle_fullscreen(self):
+        self._toggle_config_option("fullscreen", "Fullscreen")
 
     def _toggle_config_option(self, key, option_name):
         config = self.load_config()
@@ -270,12 +4034,6 @@ class XeniaManager(QMainWindow):
         self.save_config(config)
         QMessageBox.information(self, "Info", f"{option_name} is now {'enabled' if config[key] else 'disabled'}.")
 
-    def set_auto_launch_delay(self):
-        self._set_config_value("auto_launch_delay", "Enter the auto-launch delay in seconds:", 5)
-
-    def set_auto_launch_key(self):
-        self._set_config_value("auto_launch_key", "Enter the key for auto-launch:", "f9")
-
     def _set_config_value(self, key, message, default_value):
         config = self.load_config()
         value, ok = QInputDialog.getText(self, "Input", message, text=str(config.get(key, default_value)))
@@ -285,44 +4043,44 @@ class XeniaManager(QMainWindow):
             QMessageBox.information(self, "Info", f"{key.replace('_', ' ').title()} set to '{value}'.")
 
     def load_config(self):
-        if not os.path.isfile(CONFIG_FILE):
-            config = {
-                "prompt_shown": False,
-                "auto_launch": False,
-                "auto_launch_delay": 2,
-                "auto_launch_key": "f9",
-                "auto_fullscreen": False,
-                "auto_fullscreen_delay": 2,
-                "auto_fullscreen_key": "f11",
-                "games": []
-            }
-            self.save_config(config)
-        with open(CONFIG_FILE, 'r') as file:
-            return json.load(file)
+        return load_config()
+
+    def load_registry(self):
+        """ The games config and its registry, parsed once and kept until the config is saved here or changes on
+        disk, e.g. after a CLI import """
+        mtime = os.stat(CONFIG_FILE).st_mtime_ns if os.path.isfile(CONFIG_FILE) else None
+        if self.registry is None or mtime != self.config_mtime:
+            self.config = self.load_config()
+            self.registry = GameRegistry(self.config.get('games', []))
+            self.config_mtime = os.stat(CONFIG_FILE).st_mtime_ns if os.path.isfile(CONFIG_FILE) else None
+        return self.config, self.registry
+
+    def save_registry(self, config, registry):
+        config['games'] = registry.to_list()
+        self.save_config(config)
 
     def save_config(self, config):
-        with open(CONFIG_FILE, 'w') as file:
-            json.dump(config, file, indent=4)
+        save_config(config)
+        self.registry = None
 
     def run_xcopy(self, src, dst):
-        subprocess.run(["xcopy", src, dst, "/E", "/I", "/Y"], shell=True)
+        run_xcopy(src, dst)
 
     def clear_directory(self, directory):
         subprocess.run(["rmdir", "/s", "/q", directory], shell=True)
 
-    def launch_xenia(self, game_folder, progress_label):
+    def launch_xenia(self, game_folder, progress_label, title_key=None, build_dir=None, game_file=None):
         def update_progress(message):
-            progress_label.setText(message)
-            progress_label.repaint()
+            try:
+                progress_label.setText(message)
+            except RuntimeError:
+                pass  # The user moved to another menu while the game was running
 
-        def auto_press_key():
-            config = self.load_config()
-            if config.get("auto_launch", True):
-                time.sleep(config.get("auto_launch_delay", 10))
-                pyautogui.press(config.get("auto_launch_key", "f9"))
-            if config.get("auto_fullscreen", True):
-                time.sleep(config.get("auto_fullscreen_delay", 10))
-                pyautogui.press(config.get("auto_fullscreen_key", "f11"))
+        def update_bar(value):
+            try:
+                progress_bar.setValue(value)
+            except RuntimeError:
+                pass
 
         progress_bar = QProgressBar(self)
         progress_bar.setMaximum(100)
@@ -331,61 +4089,52 @@ class XeniaManager(QMainWindow):
         layout.addWidget(progress_bar)
         layout.addWidget(progress_label)
 
-        update_progress("Copying save data to game folder...")
-        game_path = resource_path(os.path.join('Core', game_folder))
-        xenia_exe = resource_path(os.path.join('Core', game_folder, 'xenia_canary.exe'))
-
-        if not os.path.isfile(xenia_exe):
-            logging.error(f"Xenia executable not found: {xenia_exe}")
-            update_progress(f"Error: Xenia executable not found: {xenia_exe}")
+        fullscreen = self.load_config().get("fullscreen", False)
+        command, launch_dir = build_launch_command(game_folder, build_dir=build_dir)
+        if command is None:
+            logging.error(f"Xenia executable not found: {launch_dir}")
+            update_progress(f"Error: Xenia executable not found: {launch_dir}")
             return
-
-        copy_thread = CopyThread(SAVE_DATA_DIR, game_path)
-        copy_thread.progress.connect(progress_bar.setValue)
-        copy_thread.update_text.connect(update_progress)
-        copy_thread.start()
-        copy_thread.wait()  # Wait for the thread to finish
-
-        update_progress("Launching Xenia...")
-        threading.Thread(target=auto_press_key).start()
-
-        try:
-            subprocess.run([xenia_exe], cwd=game_path, check=True)
-        except FileNotFoundError as e:
-            logging.error(f"Error launching Xenia: {e}")
-            update_progress(f"Error launching Xenia: {e}")
-
-        update_progress("Copying save data back...")
-        copy_thread = CopyThread(os.path.join(game_path, 'cache'), os.path.join(SAVE_DATA_DIR, 'cache'))
-        copy_thread.progress.connect(progress_bar.setValue)
-        copy_thread.update_text.connect(update_progress)
-        copy_thread.start()
-        copy_thread.wait()
-
-        copy_thread = CopyThread(os.path.join(game_path, 'content'), os.path.join(SAVE_DATA_DIR, 'content'))
-        copy_thread.progress.connect(progress_bar.setValue)
-        copy_thread.update_text.connect(update_progress)
-        copy_thread.start()
-        copy_thread.wait()
-
-        self.clear_directory(os.path.join(game_path, 'cache'))
-        self.clear_directory(os.path.join(game_path, 'content'))
-        update_progress("Done.")
+        if not game_file:
+            logging.info(f"No game file set for {game_folder}, Xenia will open without booting a game")
+
+        # Runs on the launcher's pool; the signals bring progress back to the GUI thread
+        signals = LaunchSignals(self)
+        signals.update_text.connect(update_progress)
+        signals.progress.connect(update_bar)
+        signals.finished.connect(signals.deleteLater)
+
+        def report(message, percent):
+            signals.update_text.emit(message)
+            signals.progress.emit(percent)
+
+        def launch():
+            # With the manager service running it owns staging and write-back, so two launchers never race on SaveData
+            client = DaemonClient.connect(timeout=2)
+            if client:
+                try:
+                    task = client.request("POST", "/launch", {"folder": game_folder, "title_key": title_key, "build_dir": build_dir,
+                                                              "game_file": game_file, "fullscreen": fullscreen})
+                    signals.update_text.emit(f"Launched by the manager service (task {task['id']}).")
+                    return
+                except (OSError, RuntimeError) as e:
+                    logging.warning(f"Manager service launch failed, launching here instead: {e}")
+            self.launcher.run_instance(game_folder, title_key, report, build_dir=build_dir,
+                                       game_file=game_file, fullscreen=fullscreen)
+
+        def done(future):
+            if future.exception():
+                logging.error(f"Error launching Xenia: {future.exception()}")
+                signals.update_text.emit(f"Error launching Xenia: {future.exception()}")
+            signals.finished.emit()
+
+        self.launcher.pool.submit(launch).add_done_callback(done)
 
     def launch_normal_xenia(self, game_folder):
         def update_progress(message):
             progress_label.setText(message)
             progress_label.repaint()
 
-        def auto_press_key():
-            config = self.load_config()
-            if config.get("auto_launch", True):
-                time.sleep(config.get("auto_launch_delay", 10))
-                pyautogui.press(config.get("auto_launch_key", "f9"))
-            if config.get("auto_fullscreen", True):
-                time.sleep(config.get("auto_fullscreen_delay", 10))
-                pyautogui.press(config.get("auto_fullscreen_key", "f11"))
-
         progress_label = QLabel("", self)
         progress_label.setAlignment(Qt.AlignCenter)
         progress_bar = QProgressBar(self)
@@ -398,6 +4147,16 @@ class XeniaManager(QMainWindow):
         update_progress("Preparing to launch Xenia...")
         game_path = resource_path(os.path.join('Core', game_folder))
         xenia_exe = resource_path(os.path.join('Core', game_folder, 'xenia.exe'))
+        command = [xenia_exe]
+        active_dir = build_store.active_dir("non-canary")
+        if active_dir:
+            # Store builds stay untouched: config and data live in the Core folder via --config and storage_root
+            os.makedirs(game_path, exist_ok=True)
+            xenia_exe = os.path.join(active_dir, 'xenia.exe')
+            command = [xenia_exe, f"--config={os.path.join(game_path, 'xenia.config.toml')}", f"--storage_root={game_path}", f"--content_root={os.path.join(game_path, 'content')}",
+                       f"--cache_root={os.path.join(game_path, 'cache')}", f"--log_file={os.path.join(game_path, 'xenia.log')}"]
+        if self.load_config().get("fullscreen", False):
+            command.append("--fullscreen=true")
 
         if not os.path.isfile(xenia_exe):
             logging.error(f"Xenia executable not found: {xenia_exe}")
@@ -406,8 +4165,7 @@ class XeniaManager(QMainWindow):
             return
 
         try:
-            subprocess.Popen([xenia_exe], cwd=game_path)
-            threading.Thread(target=auto_press_key).start()
+            self.supervisor.start(game_folder, command, game_path, os.path.join(game_path, 'xenia.log'))
             update_progress("Xenia launched successfully.")
         except FileNotFoundError as e:
             logging.error(f"Error launching Xenia: {e}")
@@ -448,7 +4206,13 @@ class XeniaManager(QMainWindow):
         add_game_button.clicked.connect(self.add_new_game)
         layout.addWidget(add_game_button, 0, 0)
 
-        config = self.load_config()
+        import_games_button = QPushButton("Import Games", self)
+        import_games_button.setFont(font)
+        import_games_button.setIcon(qta.icon("fa.upload"))
+        import_games_button.clicked.connect(self.import_games_from_file)
+        layout.addWidget(import_games_button, 0, 2)
+
+        config, _ = self.load_registry()
         games = config.get('games', [])
 
         if not games:
@@ -456,18 +4220,32 @@ class XeniaManager(QMainWindow):
             no_games_label.setFont(font)
             layout.addWidget(no_games_label, 1, 0, 1, 3)
         else:
-            for i, game in enumerate(games, start=1):
-                game_button = QPushButton(game['name'], self)
-                game_button.setFont(font)
-                game_button.setIcon(qta.icon("fa.gamepad"))
-                game_button.clicked.connect(lambda _, g=game: self.show_game_options(g))
-                layout.addWidget(game_button, i + 1, 0, 1, 3)  # Adjust the row index
+            search_box = QLineEdit(self)
+            search_box.setFont(font)
+            search_box.setPlaceholderText("Search games...")
+            search_box.setClearButtonEnabled(True)
+            layout.addWidget(search_box, 1, 0, 1, 3)
+
+            # Model/view list: only visible rows are rendered, however large the library gets. The models live as
+            # long as the window and are only reset here, so reopening the menu allocates nothing new
+            self.games_model.set_games(games)
+            self.games_proxy.set_search_text("")
+            search_box.textChanged.connect(self.games_proxy.set_search_text)
+
+            games_view = QListView(self)
+            games_view.setFont(font)
+            games_view.setModel(self.games_proxy)
+            games_view.setUniformItemSizes(True)
+            games_view.setIconSize(THUMBNAIL_SIZE)
+            games_view.setEditTriggers(QListView.NoEditTriggers)
+            games_view.clicked.connect(lambda index: self.show_game_options(index.data(GameListModel.GameRole)))
+            layout.addWidget(games_view, 2, 0, 1, 3)
 
         back_button = QPushButton("Back", self)
         back_button.setFont(font)
         back_button.setIcon(qta.icon("fa.arrow-left"))
         back_button.clicked.connect(self.initUI)
-        layout.addWidget(back_button, len(games) + 2, 0, 1, 3)  # Adjust the row index
+        layout.addWidget(back_button, 3, 0, 1, 3)
 
         container = QWidget()
         container.setLayout(layout)
@@ -481,19 +4259,29 @@ class XeniaManager(QMainWindow):
         layout.setSpacing(15)
         font = QFont("Arial", 12)
 
+        image_path = game_image_path(game)
+        if image_path and os.path.isfile(image_path):
+            layout.addWidget(HeaderWidget(image_path, self), 0, 0, 1, 2)
+
         self.label = QLabel(game['name'], self)
         self.label.setFont(font)
-        layout.addWidget(self.label, 0, 0, 1, 2)
+        layout.addWidget(self.label, 1, 0, 1, 2)
+
+        # Likely to be launched next; get its save data staged while the user looks at the options
+        if self.load_config().get("prestage", True):
+            self.launcher.prestage(game['path'])
 
         buttons = [
-            ("Launch", "fa.play", lambda: self.launch_game(game['path'])),
-            ("Edit Config", "fa.edit", lambda: self.edit_config(game['path'])),
-            ("Remove", "fa.trash", lambda: self.remove_game(game)),
-            ("Open Folder", "fa.folder-open-o", lambda: self.open_folder(game['path'])),
+            ("Launch", "fa.play", lambda: self.launch_game_by_id(game['id'])),
+            ("Edit Config", "fa.edit", lambda: self.edit_game_config(game['id'])),
+            ("Set Game File", "fa.file-o", lambda: self.set_game_file(game['id'])),
+            ("Remove", "fa.trash", lambda: self.remove_game(game['id'])),
+            ("Open Folder", "fa.folder-open-o", lambda: self.open_game_folder(game['id'])),
+            ("Patches", "fa.medkit", lambda: self.manage_patches(game['id'])),
             ("Back", "fa.arrow-left", self.games_menu)
         ]
 
-        for i, (text, icon, func) in enumerate(buttons, start=1):
+        for i, (text, icon, func) in enumerate(buttons, start=2):
             button = QPushButton(text, self)
             button.setFont(font)
             button.setIcon(qta.icon(icon))
@@ -504,6 +4292,16 @@ class XeniaManager(QMainWindow):
         container.setLayout(layout)
         self.setCentralWidget(container)
 
+    def prestage_predicted_game(self):
+        game = predict_next_game(self.load_config().get('games', []))
+        if game:
+            logging.info(f"Pre-staging save data for {game['name']}, the last game played")
+            self.launcher.prestage(game['path'])
+
+    def closeEvent(self, event):
+        self.launcher.cancel_prestage()
+        super().closeEvent(event)
+
     def open_folder(self, game_path):
         folder_path = os.path.join(CORE_DIR, game_path)
         if os.path.isdir(folder_path):
@@ -511,34 +4309,85 @@ class XeniaManager(QMainWindow):
         else:
             QMessageBox.warning(self, "Error", f"The folder {folder_path} does not exist.")
 
-    def launch_game(self, path):
+    def lookup_game(self, game_id):
+        _, registry = self.load_registry()
+        game = registry.get(game_id)
+        if game is None:
+            QMessageBox.warning(self, "Error", "This game is no longer in the configuration.")
+        return game
+
+    def launch_game_by_id(self, game_id):
+        game = self.lookup_game(game_id)
+        if game:
+            self.launch_game(game['path'], game.get('title_id'), build_store.resolve(game.get('build')),
+                             game.get('game_file') or None)
+
+    def set_game_file(self, game_id):
+        config, registry = self.load_registry()
+        game = registry.get(game_id)
+        if game is None:
+            QMessageBox.warning(self, "Error", "This game is no longer in the configuration.")
+            return
+        start_dir = os.path.dirname(game.get('game_file') or '') or BASE_DIR
+        file_path, _ = QFileDialog.getOpenFileName(self, f"Game file for {game['name']}", start_dir,
+                                                   "Xbox 360 games (*.xex *.iso *.zar);;All files (*)")
+        if not file_path:
+            return
+        registry.update(game_id, game_file=os.path.normpath(file_path))
+        self.save_registry(config, registry)
+        QMessageBox.information(self, "Info", f"{game['name']} will boot {file_path} directly.")
+
+    def edit_game_config(self, game_id):
+        game = self.lookup_game(game_id)
+        if game:
+            self.edit_config(game['path'])
+
+    def open_game_folder(self, game_id):
+        game = self.lookup_game(game_id)
+        if game:
+            self.open_folder(game['path'])
+
+    def manage_patches(self, game_id):
+        config, registry = self.load_registry()
+        game = registry.get(game_id)
+        if game is None:
+            QMessageBox.warning(self, "Error", "This game is no longer in the configuration.")
+            return
+        title_id = game.get('title_id')
+        if not title_id:
+            title_id, ok = QInputDialog.getText(self, "Input", "Enter the game's title ID\n\n(8 hex digits, shown in Xenia's title bar):")
+            title_id = title_id.strip().upper()
+            if not ok or not re.fullmatch(r'[0-9A-F]{8}', title_id):
+                return
+            registry.update(game_id, title_id=title_id)
+            self.save_registry(config, registry)
+        if getattr(self, 'patch_index', None) is None:
+            self.patch_index = PatchIndex()
+        self.patch_index.refresh()
+        if not self.patch_index.for_title(title_id):
+            QMessageBox.information(self, "Info", f"No patches found for {title_id}. Try updating patches.")
+            return
+        PatchesDialog(self.patch_index, title_id, self).exec_()
+
+    def launch_game(self, path, title_key=None, build_dir=None, game_file=None):
         progress_label = QLabel("", self)
         progress_label.setAlignment(Qt.AlignCenter)
         layout = self.centralWidget().layout()
         layout.addWidget(progress_label)
-        self.launch_xenia(path, progress_label)
+        self.launch_xenia(path, progress_label, title_key, build_dir, game_file)
 
     def help_menu(self):
         QMessageBox.information(self, "Help", "Black Screen after you select a game?\n\n"
-                                    "Press Esc\n\n"
-                                    "Click File - Open\n\n"
-                                    "Select the default.xex/iso file of the game you selected to play from within your games folder\n\n"
-                                    "Emulator will now update the correct path for the file\n\n"
-                                    "\n\n"
+                                    "Open the game's options and use Set Game File to pick its default.xex/iso file.\n\n"
+                                    "The game will then boot directly every time you press Launch.\n\n"
                                     "Only 1 Backup is kept at a time\n\n"
                                     "You should copy your cache and content folders into SaveData & the app will manage your save data across games.\n\n"
-                                    "Auto launch will only work once you have played a game at least once using the app.\n\n" 
-                                    "When updating Xenia nothing is copied to your custom games folders, you must update these. \n\nYou can use the `Open folder` option to easily find your games xenia_canary.exe \n\n"
+                                    "Fullscreen can be turned on under Extra Options - Launch.\n\n"
+                                    "Games share the Xenia build in Core\\Xenia, so updating Xenia updates every game. Older game folders with their own xenia_canary.exe keep using it until you run `thin-games`.\n\n"
                                     "App is still WIP")
 
-    def toggle_auto_fullscreen(self):
-        self._toggle_config_option("auto_fullscreen", "Auto Fullscreen")
-
-    def set_auto_fullscreen_key(self):
-        self._set_config_value("auto_fullscreen_key", "Enter the key for auto-fullscreen:", "f11")
-    
-    def set_auto_fullscreen_delay(self):
-        self._set_config_value("auto_fullscreen_delay", "Enter the fullscreen delay in seconds:", 2)
+    def set_update_source(self):
+        self._set_config_value("update_source", "Enter github, a mirror folder or an update bundle .zip:", "github")
 
     def extra_options(self):
         self.clear_layout()
@@ -567,6 +4416,7 @@ class XeniaManager(QMainWindow):
             ("Backup Save Data", "fa.save", self.confirm_backup_save_data),
             ("Restore Save Data", "fa.history", self.confirm_restore_save_data),
             ("Delete Save Data Backup", "fa.trash", self.confirm_delete_save_backups),
+            ("Verify Save Data", "fa.check-circle", self.verify_save_data),
         ]
         for text, icon, func in backup_restore_buttons:
             backup_restore_layout.addWidget(create_button(text, icon, func))
@@ -580,37 +4430,34 @@ class XeniaManager(QMainWindow):
             ("Update Xenia", "fa.download", self.update_xenia),
             ("Update Patches", "fa.download", self.update_patches),
             ("Update Non-Canary Xenia", "fa.download", self.update_non_canary_xenia),
+            ("Update Everything", "fa.refresh", self.update_everything),
+            ("Roll Back Xenia", "fa.undo", self.rollback_xenia),
+            ("Set Update Source", "fa.server", self.set_update_source),
         ]
         for text, icon, func in update_buttons:
             update_layout.addWidget(create_button(text, icon, func))
         update_section.setLayout(update_layout)
         layout.addWidget(update_section)
 
-        # Auto Launch Section
-        auto_launch_section = QGroupBox("Auto Launch")
-        auto_launch_layout = QVBoxLayout()
-        auto_launch_buttons = [
-            ("Toggle Auto Launch", "fa.toggle-on", self.toggle_auto_launch),
-            ("Set Auto Launch Delay", "fa.clock-o", self.set_auto_launch_delay),
-            ("Set Auto Launch Key", "fa.keyboard-o", self.set_auto_launch_key),
+        # Cache Section
+        cache_section = QGroupBox("Shader Cache")
+        cache_layout = QVBoxLayout()
+        cache_buttons = [
+            ("Cache Usage", "fa.pie-chart", self.show_cache_report),
+            ("Remove Stale Cache", "fa.eraser", self.prune_stale_cache),
+            ("Deduplicate Cache", "fa.compress", self.dedupe_cache),
         ]
-        for text, icon, func in auto_launch_buttons:
-            auto_launch_layout.addWidget(create_button(text, icon, func))
-        auto_launch_section.setLayout(auto_launch_layout)
-        layout.addWidget(auto_launch_section)
-
-        # Auto Fullscreen Section
-        auto_fullscreen_section = QGroupBox("Auto Fullscreen")
-        auto_fullscreen_layout = QVBoxLayout()
-        auto_fullscreen_buttons = [
-            ("Toggle Auto Fullscreen", "fa.toggle-on", self.toggle_auto_fullscreen),
-            ("Set Auto Fullscreen Delay", "fa.clock-o", self.set_auto_fullscreen_delay),
-            ("Set Auto Fullscreen Key", "fa.keyboard-o", self.set_auto_fullscreen_key),
-        ]
-        for text, icon, func in auto_fullscreen_buttons:
-            auto_fullscreen_layout.addWidget(create_button(text, icon, func))
-        auto_fullscreen_section.setLayout(auto_fullscreen_layout)
-        layout.addWidget(auto_fullscreen_section)
+        for text, icon, func in cache_buttons:
+            cache_layout.addWidget(create_button(text, icon, func))
+        cache_section.setLayout(cache_layout)
+        layout.addWidget(cache_section)
+
+        # Launch Section
+        launch_section = QGroupBox("Launch")
+        launch_layout = QVBoxLayout()
+        launch_layout.addWidget(create_button("Toggle Fullscreen", "fa.arrows-alt", self.toggle_fullscreen))
+        launch_section.setLayout(launch_layout)
+        layout.addWidget(launch_section)
 
         # Folder Access Section
         folder_access_section = QGroupBox("Folder Access")
@@ -632,11 +4479,55 @@ class XeniaManager(QMainWindow):
         container.setLayout(layout)
         self.setCentralWidget(container)
 
+    def show_cache_report(self):
+        manager = CacheManager()
+        manager.refresh()
+        report = manager.report()
+        if not report:
+            QMessageBox.information(self, "Cache Usage", "The SaveData cache folder is empty.")
+            return
+        total = sum(info['bytes'] for info in report.values())
+        lines = [f"{title}: {info['bytes'] / (1024 * 1024):.1f} MB{' (stale)' if info['stale'] else ''}"
+                 for title, info in list(report.items())[:20]]
+        QMessageBox.information(self, "Cache Usage", f"Total: {total / (1024 * 1024):.1f} MB\n\n" + "\n".join(lines))
+
+    def prune_stale_cache(self):
+        manager = CacheManager()
+        manager.refresh()
+        files, freed = manager.prune(stale=True, dry_run=True)
+        if not files:
+            QMessageBox.information(self, "Info", "No stale cache found.")
+            return
+        reply = QMessageBox.question(self, "Confirm", f"Remove {files} cache files ({freed / (1024 * 1024):.1f} MB) "
+                                     "that were built with Xenia versions no longer installed?", QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply == QMessageBox.Yes:
+            manager.prune(stale=True)
+            QMessageBox.information(self, "Info", "Stale cache removed!")
+
+    def dedupe_cache(self):
+        manager = CacheManager()
+        manager.refresh()
+        linked, saved = manager.dedupe()
+        QMessageBox.information(self, "Info", f"Linked {linked} duplicate files, saving {saved / (1024 * 1024):.1f} MB.")
+
     def confirm_backup_save_data(self):
-        self._confirm_action("Backup Save Data", "Are you sure you want to backup save data?", self.backup_save_data)
+        self._confirm_copy("Backup Save Data", "Are you sure you want to backup save data?", SAVE_DATA_DIR, BACKUPS_DIR,
+                           "Backup completed!")
 
     def confirm_restore_save_data(self):
-        self._confirm_action("Restore Save Data", "Are you sure you want to restore save data?", self.restore_save_data)
+        self._confirm_copy("Restore Save Data", "Are you sure you want to restore save data?", BACKUPS_DIR, SAVE_DATA_DIR,
+                           "Restore completed!")
+
+    def _confirm_copy(self, title, question, src_dir, dst_dir, success_message):
+        plan = plan_save_data_copy(src_dir, dst_dir)
+        if not plan.fits:
+            QMessageBox.critical(self, "Error", f"{title} needs more disk space than is free.\n\n{plan.summary()}")
+            return
+        if not plan.files:
+            QMessageBox.information(self, "Info", f"Nothing to copy, every title is already up to date.\n\n{plan.summary()}")
+            return
+        self._confirm_action(title, f"{question}\n\n{plan.summary()}",
+                             lambda: self._backup_or_restore(src_dir, dst_dir, success_message, plan))
 
     def confirm_delete_save_backups(self):
         self._confirm_action("Delete Save Data Backup", "Are you sure you want to delete save data backups?", self.delete_save_backups)
@@ -647,93 +4538,143 @@ class XeniaManager(QMainWindow):
             action()
 
     def backup_save_data(self):
-        self._backup_or_restore(SAVE_DATA_DIR, 'Backups', "Backup completed!")
+        self._backup_or_restore(SAVE_DATA_DIR, BACKUPS_DIR, "Backup completed!")
 
     def restore_save_data(self):
-        self._backup_or_restore('Backups', SAVE_DATA_DIR, "Restore completed!")
+        self._backup_or_restore(BACKUPS_DIR, SAVE_DATA_DIR, "Restore completed!")
 
-    def _backup_or_restore(self, src_dir, dst_dir, success_message):
-        self.run_xcopy(os.path.join(src_dir, 'cache'), os.path.join(BASE_DIR, dst_dir, 'cache'))
-        self.run_xcopy(os.path.join(src_dir, 'content'), os.path.join(BASE_DIR, dst_dir, 'content'))
+    def _backup_or_restore(self, src_dir, dst_dir, success_message, plan=None):
+        if getattr(self, 'save_data_copy_signals', None):
+            QMessageBox.information(self, "Info", "A save data backup or restore is already running.")
+            return
+        self.save_data_copy_signals = signals = SaveDataCopySignals(self)
+        signals.finished.connect(lambda problems: self.save_data_copy_finished(problems, success_message))
+        signals.failed.connect(self.save_data_copy_failed)
+        self.statusBar().showMessage("Copying and verifying save data...")
+        QThreadPool.globalInstance().start(SaveDataCopyJob(src_dir, dst_dir, plan, signals))
+
+    def save_data_copy_finished(self, problems, success_message):
+        self.save_data_copy_signals = None
+        self.statusBar().clearMessage()
+        if problems:
+            QMessageBox.critical(self, "Error", f"{len(problems)} files did not copy correctly, e.g. {problems[0]}")
+            return
         QMessageBox.information(self, "Info", success_message)
 
+    def save_data_copy_failed(self, message):
+        self.save_data_copy_signals = None
+        self.statusBar().clearMessage()
+        QMessageBox.critical(self, "Error", message)
+
+    def verify_save_data(self):
+        manifest = save_data_manifest()
+        if not manifest.exists():
+            manifest.update()
+            QMessageBox.information(self, "Info", "No checksums were recorded yet; the current save data is now the baseline.")
+            return
+        result = manifest.verify()
+        if not result['missing'] and not result['corrupt']:
+            modified = f" {len(result['modified'])} were changed by games since they were recorded." if result['modified'] else ""
+            QMessageBox.information(self, "Info", f"All {result['ok'] + len(result['modified'])} save data files are intact.{modified}")
+            return
+        reply = QMessageBox.question(self, "Save Data Problems",
+                                     f"{len(result['corrupt'])} files are damaged and {len(result['missing'])} are missing.\n\n"
+                                     "Restore them from the backup?", QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply == QMessageBox.Yes:
+            restored, older, lost = repair_from_backup(result)
+            QMessageBox.information(self, "Info", f"Restored {len(restored)} files, {len(older)} from an older backup. "
+                                                  f"{len(lost)} could not be recovered.")
+
+    def check_for_updates(self):
+        if getattr(self, 'update_check_thread', None) and self.update_check_thread.isRunning():
+            return
+        self.update_check_thread = UpdateCheckThread(self.update_checker, self)
+        self.update_check_thread.checked.connect(self.show_available_updates)
+        self.update_check_thread.start()
+
+    def show_available_updates(self, results):
+        self.available_updates = results
+        available = [f"{'Xenia' if channel == 'canary' else 'Non Canary Xenia'} {release['version']} "
+                     f"({release['size'] / (1024 * 1024):.0f} MB)"
+                     for channel, release in results.items() if release['update_available']]
+        if available:
+            self.statusBar().showMessage("Update available: " + ", ".join(available) + " - see Extra Options > Update")
+
+    def release_details(self, channel):
+        """ Version, size and changelog of the newest known release, for the update prompts """
+        release = self.available_updates.get(channel) or self.update_checker.cached(channel)
+        if not release:
+            return ""
+        changelog = release.get('changelog', '').strip()
+        if len(changelog) > 800:
+            changelog = changelog[:800] + "..."
+        details = f"\n\nLatest version: {release['version']} ({release.get('size', 0) / (1024 * 1024):.0f} MB download)"
+        if release['version'] == build_store.active(channel):
+            details += "\nYou already have this version."
+        return details + (f"\n\nChangelog:\n{changelog}" if changelog else "")
+
     def update_xenia(self):
         message = ("This will download and update Xenia to the latest version from the repository.\n"
                    "Do you want to continue?\n\n"
                    "Details:\n"
                    "- The latest version will be fetched from https://github.com/xenia-canary/xenia-canary.\n"
                    "- Existing Xenia files will be replaced with the new ones.\n"
-                   "- Your game data and added games will not be affected.")
+                   "- Your game data and added games will not be affected.") + self.release_details("canary")
         self._confirm_action("Update Xenia", message, self._update_xenia_files)
 
     def _update_xenia_files(self):
-        self.initialize_directories()
-        repo_url = "https://api.github.com/repos/xenia-canary/xenia-canary/releases/latest"
-        response = requests.get(repo_url)
-        response.raise_for_status()
-        release_info = response.json()
-
-        asset = next((asset for asset in release_info['assets'] if asset['name'].endswith('.zip')), None)
-        if not asset:
-            QMessageBox.critical(self, "Error", "No zip file found in the latest release assets.")
-            return
-
-        zip_url = asset['browser_download_url']
-        response = requests.get(zip_url)
-        response.raise_for_status()
-
-        update_dir = os.path.join(BASE_DIR, 'Update', 'Depo')
-        if os.path.exists(update_dir):
-            self.clear_directory(update_dir)
-        os.makedirs(update_dir, exist_ok=True)
+        self.run_updates(["canary"])
 
-        with zipfile.ZipFile(io.BytesIO(response.content)) as z:
-            z.extractall(update_dir)
+    def update_everything(self):
+        message = ("This will update Xenia, Non Canary Xenia and the game patches at the same time.\n"
+                   "Do you want to continue?")
+        self._confirm_action("Update Everything", message, lambda: self.run_updates(["canary", "non-canary", "patches"]))
 
-        self.run_xcopy(update_dir, os.path.join(CORE_DIR, 'Xenia'))
-        self.run_xcopy(update_dir, os.path.join(CORE_DIR, '4k\\Xenia'))
-        self.run_xcopy(update_dir, os.path.join(BASE_DIR, 'Resources'))
+    def run_updates(self, job_names):
+        self.initialize_directories()
+        dialog = UpdateProgressDialog(job_names, self)
+        thread = UpdateThread(job_names, self)
+        thread.progress.connect(dialog.update_job)
+        thread.completed.connect(lambda results: self.finish_updates(dialog, results))
+        thread.finished.connect(thread.deleteLater)
+        self.update_thread = thread
+        dialog.show()
+        thread.start()
+
+    def finish_updates(self, dialog, results):
+        dialog.close()
+        self.collect_old_builds()
+        lines = [f"{name}: {result['message']}" for name, result in results.items()]
+        if all(result['ok'] for result in results.values()):
+            QMessageBox.information(self, "Info", "Update completed!\n\n" + "\n".join(lines))
+        else:
+            QMessageBox.critical(self, "Error", "Some updates failed:\n\n" + "\n".join(lines))
 
-        QMessageBox.information(self, "Info", "Update completed! - Core & Resources Only - Your games have not been updated!")
-        
     def update_non_canary_xenia(self):
         message = ("This will download and update Non Canary Xenia to the latest version from the repository.\n"
                    "Do you want to continue?\n\n"
                    "Details:\n"
                    "- The latest version will be fetched from https://api.github.com/repos/xenia-project/release-builds-windows/releases/latest \n"
                    "- Existing Non Canary Xenia files will be replaced with the new ones.\n"
-                   "- Your game data and added games will not be affected.")
+                   "- Your game data and added games will not be affected.") + self.release_details("non-canary")
         self._confirm_action("Update Non Canary Xenia", message, self._update_non_canary_xenia_files)
         
     def _update_non_canary_xenia_files(self):
-        self.initialize_directories()
-        repo_url = "https://api.github.com/repos/xenia-project/release-builds-windows/releases/latest"
-        response = requests.get(repo_url)
-        response.raise_for_status()
-        release_info = response.json()
-
-        # Fetch the specific asset named 'xenia_master.zip'
-        asset = next((asset for asset in release_info['assets'] if asset['name'] == 'xenia_master.zip'), None)
-        if not asset:
-            QMessageBox.critical(self, "Error", "No 'xenia_master.zip' file found in the latest release assets.")
-            return
-
-        zip_url = asset['browser_download_url']
-        response = requests.get(zip_url)
-        response.raise_for_status()
-
-        update_dir = os.path.join(BASE_DIR, 'Update', 'NonCanaryDepo')
-        if os.path.exists(update_dir):
-            self.clear_directory(update_dir)
-        os.makedirs(update_dir, exist_ok=True)
+        self.run_updates(["non-canary"])
 
-        with zipfile.ZipFile(io.BytesIO(response.content)) as z:
-            z.extractall(update_dir)
-
-        self.run_xcopy(update_dir, os.path.join(CORE_DIR, 'NonCanaryXenia'))
-        self.run_xcopy(update_dir, os.path.join(BASE_DIR, 'NonCanaryXResources'))
-
-        QMessageBox.information(self, "Info", "Update completed! - Non Canary Core & Non Canary Resources Only - Your games have not been updated!")
+    def collect_old_builds(self):
+        config = self.load_config()
+        pinned = [game['build'] for game in config.get('games', []) if game.get('build')]
+        in_use = [session.command[0] for session in self.supervisor.running()]
+        for channel, version in build_store.gc(pinned, config.get("build_retention", BUILD_RETENTION), in_use):
+            logging.info(f"Removed old {channel} build {version}")
+
+    def rollback_xenia(self):
+        version = build_store.rollback("canary")
+        if version:
+            QMessageBox.information(self, "Info", f"Xenia rolled back to {version}.")
+        else:
+            QMessageBox.warning(self, "Error", "There is no previous Xenia build to roll back to.")
 
     def update_patches(self):
         message = ("This will remove all current patches and download new ones from the repository.\n"
@@ -745,39 +4686,7 @@ class XeniaManager(QMainWindow):
         self._confirm_action("Update Patches", message, self._update_patches_files)
 
     def _update_patches_files(self):
-        patches_dir = resource_path('Patches')
-        temp_extract_dir = resource_path('TempPatches')
-
-        if os.path.exists(patches_dir):
-            self.clear_directory(patches_dir)
-        os.makedirs(patches_dir, exist_ok=True)
-
-        if os.path.exists(temp_extract_dir):
-            self.clear_directory(temp_extract_dir)
-        os.makedirs(temp_extract_dir, exist_ok=True)
-
-        patches_url = "https://github.com/xenia-canary/game-patches/archive/refs/heads/main.zip"
-
-        try:
-            response = requests.get(patches_url)
-            response.raise_for_status()
-
-            with zipfile.ZipFile(io.BytesIO(response.content)) as z:
-                z.extractall(temp_extract_dir)
-
-            extracted_patches_dir = os.path.join(temp_extract_dir, "game-patches-main", "patches")
-            if os.path.exists(extracted_patches_dir):
-                for item in os.listdir(extracted_patches_dir):
-                    shutil.move(os.path.join(extracted_patches_dir, item), os.path.join(patches_dir, item))
-
-            shutil.rmtree(temp_extract_dir)
-            QMessageBox.information(self, "Info", "Patches updated successfully!")
-        except requests.RequestException as e:
-            logging.error(f"Error downloading patches: {e}")
-            QMessageBox.critical(self, "Error", f"Error downloading patches: {e}")
-        except zipfile.BadZipFile as e:
-            logging.error(f"Error extracting patches: {e}")
-            QMessageBox.critical(self, "Error", f"Error extracting patches: {e}")
+        self.run_updates(["patches"])
 
     def delete_save_backups(self):
         self.clear_directory(os.path.join(BASE_DIR, 'Backups', 'cache'))
@@ -785,30 +4694,44 @@ class XeniaManager(QMainWindow):
         QMessageBox.information(self, "Info", "Backups removed!")
 
     def add_new_game(self):
-        config = self.load_config()
-        new_id = str(len(config['games']) + 1)
+        config, registry = self.load_registry()
         name, ok1 = QInputDialog.getText(self, "Input", "Enter the game name\n\n(This can be anything you want):")
         path, ok2 = QInputDialog.getText(self, "Input", "Enter a name for your game folder\n\n(One will be created if it doesnt exist):")
         image_path, ok3 = QInputDialog.getText(self, "Input", "Enter the image name with extension\n\n(Your image should be placed in images folder, enter none for no image):")
 
         if ok1 and ok2 and ok3 and name and path and image_path:
-            game_path = os.path.join(CORE_DIR, path)
-            if not os.path.exists(game_path):
-                os.makedirs(game_path)
-            self.run_xcopy(EXAMPLE_FOLDER, game_path)
-            config_file_src = resource_path('defaultconfig.toml')
-            config_file_dst = os.path.join(game_path, 'xenia-canary.config.toml')
-            if os.path.isfile(config_file_src):
-                shutil.copy2(config_file_src, config_file_dst)
-            config['games'].append({"id": new_id, "name": name, "path": path, "image_path": image_path})
-            self.save_config(config)
+            if registry.find_by_path(path):
+                QMessageBox.critical(self, "Error", f"The folder '{path}' is already used by another game!")
+                return
+            game_file, _ = QFileDialog.getOpenFileName(self, "Select the game's default.xex or disc image (Cancel to set it later)",
+                                                       BASE_DIR, "Xbox 360 games (*.xex *.iso *.zar);;All files (*)")
+            provision_game_folder(path)
+            registry.add(name, path, image_path, game_file=os.path.normpath(game_file) if game_file else "")
+            self.save_registry(config, registry)
             QMessageBox.information(self, "Success", "Game added successfully!")
             self.games_menu()  # Refresh the games menu
         else:
             QMessageBox.critical(self, "Error", "Invalid input!")
 
-    def remove_game(self, game):
-        config = self.load_config()
+    def import_games_from_file(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Import Games", BASE_DIR, "Game lists (*.csv *.json)")
+        if not file_path:
+            return
+        try:
+            games = import_games(read_game_list(file_path))
+        except Exception as e:
+            logging.error(f"Error importing games: {e}")
+            QMessageBox.critical(self, "Error", f"Error importing games: {e}")
+            return
+        QMessageBox.information(self, "Success", f"{len(games)} games imported successfully!")
+        self.games_menu()
+
+    def remove_game(self, game_id):
+        config, registry = self.load_registry()
+        game = registry.get(game_id)
+        if game is None:
+            QMessageBox.warning(self, "Error", "This game is no longer in the configuration.")
+            return
         game_name = game['name']
         game_path = os.path.join(CORE_DIR, game['path'])
 
@@ -816,8 +4739,8 @@ class XeniaManager(QMainWindow):
         if reply != QMessageBox.Yes:
             return
 
-        config['games'] = [g for g in config['games'] if g['name'] != game_name]
-        self.save_config(config)
+        registry.remove(game_id)
+        self.save_registry(config, registry)
 
         reply = QMessageBox.question(self, "Delete Data", f"Do you want to delete the data for '{game_name}' located at '{game_path}'?", QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
@@ -835,25 +4758,726 @@ class XeniaManager(QMainWindow):
 
     def initialize_directories(self):
         xenia_path = resource_path(os.path.join('Core', 'Xenia'))
-        xenia_4k_path = resource_path(os.path.join('Core', '4k\\Xenia'))
         resources_path = resource_path('Resources')
 
         os.makedirs(xenia_path, exist_ok=True)
-        os.makedirs(xenia_4k_path, exist_ok=True)
-
-        if not os.path.isfile(os.path.join(xenia_path, 'xenia_canary.exe')):
-            self.run_xcopy(resources_path, xenia_path)
 
-        if not os.path.isfile(os.path.join(xenia_4k_path, 'xenia_canary.exe')):
-            self.run_xcopy(resources_path, xenia_4k_path)
-
-        config_file_src = resource_path('4kconfig.toml')
-        config_file_dst = os.path.join(xenia_4k_path, 'xenia-canary.config.toml')
-        if os.path.isfile(config_file_src):
-            shutil.copy2(config_file_src, config_file_dst)
+        # Seeds the shared build from a bundled copy, if there is one; updates install into the build store anyway
+        if os.path.isdir(resources_path) and not os.path.isfile(os.path.join(xenia_path, 'xenia_canary.exe')):
+            try:
+                self.run_xcopy(resources_path, xenia_path)
+            except subprocess.CalledProcessError:
+                logging.warning("Could not seed Core\\Xenia from Resources, it will be filled by the next Xenia update")
+
+        # The 4K profile is a thin folder that runs the shared build with its own config
+        provision_game_folder('4k\\Xenia', resource_path('4kconfig.toml'))
+
+def benchmark_games_menu(counts, repeats):
+    class BenchmarkManager(XeniaManager):
+        def __init__(self, config):
+            self.bench_config = config
+            super().__init__()
+
+        def load_config(self):
+            return self.bench_config
+
+        def save_config(self, config):
+            pass
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = {}
+    for count in counts:
+        games = [{"id": str(i), "name": f"Game {i}", "path": f"Game{i}", "image_path": f"cover{i}.jpg"}
+                 for i in range(count)]
+        window = BenchmarkManager({"prompt_shown": True, "check_updates": False, "games": games})
+        window.show()
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            window.games_menu()
+            app.processEvents()
+            timings.append(time.perf_counter() - start)
+            window.initUI()
+            app.processEvents()
+        window.close()
+        results[count] = timings
+        logging.info(f"games_menu with {count} games: best {min(timings) * 1000:.1f} ms, "
+                     f"mean {sum(timings) / len(timings) * 1000:.1f} ms over {repeats} runs")
+    return results
+
+BENCH_SHADER_FILES = {"small": 2000, "medium": 10000, "large": 40000}
+BENCH_GAME_COUNTS = {"small": 100, "medium": 1000, "large": 10000}
+BENCH_CHILD_ENV = 'XENIA_MANAGER_BENCH'
+
+# Stands in for xenia_canary.exe in benchmark builds: rewrites a few saves so write-back has work to do
+FAKE_EMULATOR_SCRIPT = '''import os, sys
+content_root = next(arg.split('=', 1)[1] for arg in sys.argv if arg.startswith('--content_root='))
+saves = [os.path.join(root, name) for root, dirs, files in os.walk(content_root) for name in files]
+for path in sorted(saves)[:20]:
+    with open(path, 'r+b') as file:
+        file.write(os.urandom(64))
+'''
+
+def stub_emulator_script(seconds=0):
+    """ FAKE_EMULATOR_SCRIPT as an executable script that also stays running for `seconds` """
+    return f"#!{sys.executable}\n{FAKE_EMULATOR_SCRIPT}import time\ntime.sleep({float(seconds)})\n"
+
+def write_stub_build(build_dir, seconds=0):
+    """ A build folder whose emulators are stub scripts, to exercise launches without Xenia (e.g. daemon --build) """
+    os.makedirs(build_dir, exist_ok=True)
+    for exe in BuildStore.CHANNELS.values():
+        path = os.path.join(build_dir, exe)
+        with open(path, 'w') as file:
+            file.write(stub_emulator_script(seconds))
+        os.chmod(path, 0o755)
+
+def generate_save_data_fixture(root, shader_files, rng):
+    """ A SaveData tree shaped like a real one: many small shader cache files spread over a few titles plus a
+    handful of large saves. Returns (files, bytes). """
+    titles = [f"{rng.getrandbits(32):08X}" for _ in range(max(1, shader_files // 500))]
+    total = 0
+    for i in range(shader_files):
+        folder = os.path.join(root, 'cache', 'shaders', 'shareable', titles[i % len(titles)])
+        os.makedirs(folder, exist_ok=True)
+        data = rng.randbytes(rng.randint(256, 8192))
+        with open(os.path.join(folder, f"{i:08x}.bin"), 'wb') as file:
+            file.write(data)
+        total += len(data)
+    for i, title in enumerate(titles[:4]):
+        folder = os.path.join(root, 'content', title, '00000001')
+        os.makedirs(folder, exist_ok=True)
+        data = rng.randbytes(8 * 1024 * 1024)
+        with open(os.path.join(folder, f"save{i}.bin"), 'wb') as file:
+            file.write(data)
+        total += len(data)
+    return shader_files + min(4, len(titles)), total
+
+def generate_build_zip(path, rng, payload_mb=24):
+    """ A release zip about the size of a canary build, whose emulator is FAKE_EMULATOR_SCRIPT """
+    script = stub_emulator_script()
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr(XENIA_EXE, script)
+        z.writestr(BuildStore.CHANNELS["non-canary"], script)
+        # Executables compress to roughly half their size; mimic that with half random, half repetitive data
+        half = payload_mb * 1024 * 1024 // 2
+        z.writestr('xenia_canary.pdb', rng.randbytes(half) + bytes(range(256)) * (half // 256))
+        z.writestr('LICENSE', "Fake build for benchmarks\n" * 100)
+
+def generate_patches_zip(path, rng, count=1500):
+    """ A game-patches repository archive: game-patches-main/patches/<title id> - <name>.patch.toml """
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+        for i in range(count):
+            title_id = f"{rng.getrandbits(32):08X}"
+            lines = [f'title_name = "Game {i}"', f'title_id = "{title_id}"', f'hash = "{rng.getrandbits(64):016X}"', ""]
+            for n in range(rng.randint(1, 6)):
+                lines += ["[[patch]]", f'    name = "Patch {n}"', '    author = "bench"', "    is_enabled = false", "",
+                          "    [[patch.be32]]", f"        address = 0x{rng.getrandbits(32):08x}",
+                          f"        value = 0x{rng.getrandbits(32):08x}", ""]
+            z.writestr(f"game-patches-main/patches/{title_id} - Game {i}.patch.toml", "\n".join(lines))
+
+def time_runs(repeats, func, setup=None):
+    runs = []
+    for _ in range(repeats):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return {"best": min(runs), "mean": sum(runs) / len(runs), "runs": runs}
+
+def run_benchmarks(sizes, repeats):
+    """ Times the I/O hot paths against generated fixtures. Only meant to run with DATA_ROOT_ENV pointing at a
+    scratch folder, since it replaces SaveData, Backups, Builds and the games config there. """
+    app = QApplication.instance() or QApplication(sys.argv)
+    rng = random.Random(0)
+    fixtures = resource_path('BenchFixtures')
+    os.makedirs(fixtures, exist_ok=True)
+    build_zip = os.path.join(fixtures, 'xenia_canary.zip')
+    generate_build_zip(build_zip, rng)
+    generate_patches_zip(os.path.join(fixtures, 'main.zip'), rng)
+    with open(DEFAULT_CONFIG_FILE, 'w') as file:
+        file.write('[GPU]\ngpu = "any"\n')
+    results = {}
+
+    build_store.install_zip("canary", "bench", build_zip)
+    os.chmod(os.path.join(build_store.build_dir("canary", "bench"), XENIA_EXE), 0o755)  # zipfile drops the mode
+    build_store.activate("canary", "bench")
+    provision_game_folder("BenchGame")
+    launcher = InstanceLauncher(ProcessSupervisor(sample_interval=0.5))
+
+    for size in sizes:
+        shutil.rmtree(SAVE_DATA_DIR, ignore_errors=True)
+        files, size_bytes = generate_save_data_fixture(SAVE_DATA_DIR, BENCH_SHADER_FILES[size], rng)
+        info = {"files": files, "bytes": size_bytes}
+        logging.info(f"Benchmarking {size}: {files} files, {size_bytes / (1024 * 1024):.0f} MiB of save data")
+
+        copy_dst = resource_path('BenchCopy')
+
+        def copy_with_thread():
+            thread = CopyThread(SAVE_DATA_DIR, copy_dst)
+            thread.start()
+            thread.wait()
+        results[f"copy_thread/{size}"] = dict(info, **time_runs(
+            repeats, copy_with_thread, lambda: shutil.rmtree(copy_dst, ignore_errors=True)))
+        shutil.rmtree(copy_dst, ignore_errors=True)
+
+        # One run_instance is stage + emulator + write-back; the progress messages mark where each phase starts
+        phases = {"stage": [], "write_back": []}
+
+        def stage_and_write_back():
+            marks = {"start": time.perf_counter()}
+
+            def progress(message, percent):
+                if message.startswith("Launching"):
+                    marks.setdefault("launch", time.perf_counter())
+                elif message.startswith("Waiting to copy"):
+                    marks.setdefault("write_back", time.perf_counter())
+            launcher.run_instance("BenchGame", progress=progress)
+            phases["stage"].append(marks["launch"] - marks["start"])
+            phases["write_back"].append(time.perf_counter() - marks["write_back"])
+        results[f"launch_cycle/{size}"] = dict(info, **time_runs(repeats, stage_and_write_back))
+        for phase, runs in phases.items():
+            results[f"{phase}/{size}"] = dict(info, best=min(runs), mean=sum(runs) / len(runs), runs=runs)
+
+        results[f"backup/{size}"] = dict(info, **time_runs(repeats, lambda: copy_save_data(SAVE_DATA_DIR, BACKUPS_DIR)))
+        results[f"restore/{size}"] = dict(info, **time_runs(repeats, lambda: copy_save_data(BACKUPS_DIR, SAVE_DATA_DIR)))
+        shutil.rmtree(BACKUPS_DIR, ignore_errors=True)
+
+        count = BENCH_GAME_COUNTS[size]
+        config = dict(default_config(), prompt_shown=True, games=[
+            {"id": uuid.UUID(int=rng.getrandbits(128)).hex, "name": f"Game {i}", "path": f"Game{i}",
+             "image_path": f"cover{i}.jpg", "title_id": f"{rng.getrandbits(32):08X}"} for i in range(count)])
+        results[f"config_save/{size}"] = dict(games=count, **time_runs(repeats, lambda: save_config(config)))
+        results[f"config_load/{size}"] = dict(games=count, **time_runs(repeats, load_config))
+        runs = benchmark_games_menu([count], repeats)[count]
+        results[f"games_menu/{size}"] = dict(games=count, best=min(runs), mean=sum(runs) / len(runs), runs=runs)
+
+    version = iter(range(repeats))
+    results["zip_extract"] = dict(bytes=os.path.getsize(build_zip), **time_runs(
+        repeats, lambda: build_store.install_zip("canary", f"extract-{next(version)}", build_zip)))
+
+    # Update jobs end to end, downloading from a local HTTP server laid out like the GitHub API
+    release_file = os.path.join(fixtures, CANARY_RELEASES_PATH.lstrip('/'))
+    os.makedirs(os.path.dirname(release_file), exist_ok=True)
+
+    class QuietHandler(SimpleHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+    server = ThreadingHTTPServer(('127.0.0.1', 0), partial(QuietHandler, directory=fixtures))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    with open(release_file, 'w') as file:
+        json.dump({"tag_name": "bench-download", "body": "", "assets": [
+            {"name": "xenia_canary.zip", "size": os.path.getsize(build_zip),
+             "browser_download_url": f"{url}/xenia_canary.zip"}]}, file)
+    source = GitHubSource(url, f"{url}/main.zip")
+
+    def update():
+        update_results, _ = UpdateOrchestrator(["canary", "patches"], source=source).run()
+        failed = [f"{name}: {result['message']}" for name, result in update_results.items() if not result["ok"]]
+        if failed:
+            raise RuntimeError("; ".join(failed))
+    try:
+        results["update_download_install"] = time_runs(
+            repeats, update, lambda: shutil.rmtree(build_store.build_dir("canary", "bench-download"), ignore_errors=True))
+    finally:
+        server.shutdown()
+    return results
+
+def compare_benchmarks(results, baseline, threshold):
+    """ Returns [(name, baseline best, best, ratio)] for every benchmark in both runs, and the regressed ones """
+    rows = [(name, baseline[name]["best"], result["best"], result["best"] / baseline[name]["best"])
+            for name, result in results.items() if name in baseline and baseline[name]["best"] > 0]
+    return rows, [row for row in rows if row[3] > 1 + threshold]
+
+def run_bench_command(args, argv):
+    if not os.environ.get(BENCH_CHILD_ENV):
+        # Rerun in a child whose data root is a scratch folder, so no real save data or build is touched
+        root = args.fixtures or tempfile.mkdtemp(prefix='xenia-bench-')
+        env = dict(os.environ, **{DATA_ROOT_ENV: os.path.abspath(root), BENCH_CHILD_ENV: "1"})
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+        command = [sys.executable] + ([] if getattr(sys, 'frozen', False) else [os.path.abspath(__file__)]) + argv
+        try:
+            return subprocess.call(command, env=env)
+        finally:
+            if not args.fixtures:
+                shutil.rmtree(root, ignore_errors=True)
+
+    results = run_benchmarks(args.sizes, args.repeats)
+    for name, result in results.items():
+        print(f"{name:32} best {result['best'] * 1000:9.1f} ms  mean {result['mean'] * 1000:9.1f} ms")
+    report = {"meta": {"created": time.time(), "python": platform.python_version(), "platform": platform.platform(),
+                       "cpus": os.cpu_count(), "sizes": args.sizes, "repeats": args.repeats},
+              "results": results}
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=4)
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)["results"]
+    rows, regressions = compare_benchmarks(results, baseline, args.threshold)
+    print(f"\nCompared with {args.baseline} (regression if more than {args.threshold:.0%} slower):")
+    for name, old, new, ratio in rows:
+        print(f"{name:32} {old * 1000:9.1f} -> {new * 1000:9.1f} ms  {ratio:5.2f}x{'  REGRESSION' if ratio > 1 + args.threshold else ''}")
+    return 1 if regressions else 0
+
+def run_verify_command(args):
+    manifests = []
+    if args.target in ("savedata", "all"):
+        manifests.append(save_data_manifest())
+    if args.target in ("backup", "all"):
+        manifests.append(backup_manifest())
+    if args.target in ("builds", "all"):
+        for channel in BuildStore.CHANNELS:
+            manifests.extend(build_manifest(channel, manifest['version']) for manifest in build_store.builds(channel))
+    damaged = False
+    for manifest in manifests:
+        start = time.perf_counter()
+        if args.update or not manifest.exists():
+            hashed = manifest.update()
+            print(f"{manifest.name}: recorded ({hashed} files hashed) in {time.perf_counter() - start:.2f}s")
+            continue
+        result = manifest.verify(args.full)
+        damaged = damaged or bool(result['missing'] or result['corrupt'])
+        print(f"{manifest.name}: {result['ok']} ok, {len(result['corrupt'])} corrupt, {len(result['missing'])} missing, "
+              f"{len(result['modified'])} modified, {len(result['untracked'])} untracked in {time.perf_counter() - start:.2f}s")
+        for rel in result['corrupt']:
+            print(f"  corrupt: {rel}")
+        for rel in result['missing']:
+            print(f"  missing: {rel}")
+    return 1 if damaged else 0
+
+def run_launch_stats_command(args):
+    """ Time to play (staging before the emulator starts) by how the instance folder was prepared """
+    by_mode = {}
+    for stats_file in sorted(glob_session_stats(SESSIONS_DIR)):
+        with open(stats_file) as file:
+            stats = json.load(file)
+        staging = stats.get("staging")
+        if staging and (not args.game or stats.get("name") == args.game):
+            by_mode.setdefault(staging["mode"], []).append(staging["seconds"])
+    if not by_mode:
+        print("No launches with staging telemetry yet")
+        return 0
+    for mode, seconds in sorted(by_mode.items()):
+        seconds.sort()
+        print(f"{mode:10} {len(seconds):5} launches  median {seconds[len(seconds) // 2] * 1000:8.0f} ms  "
+              f"worst {seconds[-1] * 1000:8.0f} ms")
+    if "cold" in by_mode and "prestaged" in by_mode:
+        cold, warm = by_mode["cold"][len(by_mode["cold"]) // 2], by_mode["prestaged"][len(by_mode["prestaged"]) // 2]
+        print(f"Pre-staging saves {(cold - warm) * 1000:.0f} ms per launch at the median")
+    return 0
+
+def run_plan_command(args):
+    """ Prints what a backup, restore or launch would copy, without copying anything """
+    if args.operation == "stage":
+        plan = TransferPlan("stage", SAVE_DATA_DIR, os.path.join(STAGING_DIR, 'plan'), src_index=save_data_sizes(), dst_files={})
+    else:
+        src_dir, dst_dir = (SAVE_DATA_DIR, BACKUPS_DIR) if args.operation == "backup" else (BACKUPS_DIR, SAVE_DATA_DIR)
+        plan = plan_save_data_copy(src_dir, dst_dir)
+    for step in plan.steps:
+        if step['strategy'] != "skip" or args.all:
+            print(f"{step['strategy']:6} {len(step['files']):7} files {step['bytes'] / (1024 * 1024):10.1f} MiB  {step['subtree']}")
+    print(f"{args.operation}: {plan.summary()}")
+    if not plan.fits:
+        print("Does not fit on the target disk", file=sys.stderr)
+        return 1
+    return 0
+
+def run_perf_command(args):
+    summary = perf_summary(game=args.game)
+    if not summary:
+        print("No sessions with log stats yet")
+        return 0
+    for name, rows in summary.items():
+        print(name)
+        previous = None
+        for row in rows:
+            fps = f"{row['fps']:6.1f}" if row['fps'] is not None else "     -"
+            p50 = f"{row['p50_ms']:6.1f}" if row['p50_ms'] is not None else "     -"
+            p99 = f"{row['p99_ms']:6.1f}" if row['p99_ms'] is not None else "     -"
+            change = ""
+            if previous and previous['fps'] and row['fps']:
+                change = f"  {(row['fps'] / previous['fps'] - 1) * 100:+.0f}% fps vs {previous['build']} / {previous['preset']}"
+            print(f"  {row['build']:28} {row['preset']:26} {row['sessions']:3} sessions {row['crashes']:2} crashes  "
+                  f"fps {fps}  p50 {p50} ms  p99 {p99} ms  shaders {row['shader_compiles'] / row['sessions']:7.0f}/session  "
+                  f"missing imports {len(row['missing_imports'])}{change}")
+            previous = row
+    return 0
+
+def glob_session_stats(sessions_dir):
+    for game_dir in os.scandir(sessions_dir) if os.path.isdir(sessions_dir) else []:
+        if game_dir.is_dir():
+            for session_dir in os.scandir(game_dir.path):
+                stats_file = os.path.join(session_dir.path, 'stats.json')
+                if os.path.isfile(stats_file):
+                    yield stats_file
+
+def run_cache_command(args):
+    manager = CacheManager()
+    start = time.perf_counter()
+    changed = manager.refresh()
+    logging.info(f"Cache index refreshed in {time.perf_counter() - start:.2f}s ({changed} new or changed files)")
+    if args.action == "report":
+        for title, info in manager.report().items():
+            print(f"{title}: {info['bytes'] / (1024 * 1024):.1f} MiB in {info['files']} files, last written "
+                  f"{time.strftime('%Y-%m-%d', time.localtime(info['newest']))}{'  (stale)' if info['stale'] else ''}")
+    elif args.action == "prune":
+        max_bytes = int(args.max_size * 1024 ** 3) if args.max_size is not None else None
+        files, freed = manager.prune(args.older_than, max_bytes, args.stale, args.dry_run)
+        print(f"{'Would remove' if args.dry_run else 'Removed'} {files} files, {freed / (1024 * 1024):.1f} MiB")
+    else:
+        linked, saved = manager.dedupe(args.dry_run)
+        print(f"{'Would link' if args.dry_run else 'Linked'} {linked} duplicate files, saving {saved / (1024 * 1024):.1f} MiB")
+    return 0
+
+def run_patches_command(args):
+    if args.action == "index" and args.benchmark:
+        index_file = PATCH_INDEX_FILE + '.bench'
+        start = time.perf_counter()
+        index = PatchIndex(index_file=index_file)
+        parsed = index.refresh()
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        PatchIndex(index_file=index_file).refresh()
+        warm = time.perf_counter() - start
+        title_ids = list(index.by_title_id) or ["00000000"]
+        start = time.perf_counter()
+        for i in range(100000):
+            index.for_title(title_ids[i % len(title_ids)])
+        lookup = (time.perf_counter() - start) / 100000
+        os.remove(index_file)
+        print(f"Cold build: {parsed} files in {cold * 1000:.0f} ms; warm refresh {warm * 1000:.0f} ms; "
+              f"lookup {lookup * 1e6:.2f} us")
+        return 0
+    index = PatchIndex()
+    parsed = index.refresh()
+    if args.action == "index":
+        print(f"Indexed {len(index.files)} patch files ({parsed} re-read) for {len(index.by_title_id)} titles")
+    elif not args.title_id:
+        print("A title ID is required")
+        return 1
+    elif args.action == "list":
+        for file_name, entry in index.for_title(args.title_id):
+            print(f"{file_name}: {entry['title_name']} [{', '.join(entry['hashes'])}]")
+            for patch in entry['patches']:
+                print(f"  [{'x' if patch['enabled'] else ' '}] {patch['name']}")
+    else:
+        changed = index.set_enabled(args.title_id, args.action == "enable", args.names or None)
+        print(f"{changed} patches {args.action}d")
+    return 0
+
+def run_builds_command(args):
+    config = load_config()
+    registry = GameRegistry(config.get('games', []))
+    if args.action == "list":
+        active = build_store.active(args.channel)
+        pins = {}
+        for game in registry:
+            if game.get('build'):
+                pins.setdefault(game['build'], []).append(game['name'])
+        for manifest in build_store.builds(args.channel):
+            marker = "*" if manifest['version'] == active else " "
+            pinned = f"  pinned by {', '.join(pins[manifest['version']])}" if manifest['version'] in pins else ""
+            print(f"{marker} {manifest['version']}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(manifest['installed']))}{pinned}")
+    elif args.action == "activate":
+        build_store.activate(args.channel, args.values[0])
+    elif args.action == "rollback":
+        print(build_store.rollback(args.channel) or "No previous build")
+    elif args.action in ("pin", "unpin"):
+        game = registry.get(args.values[0])
+        if game is None:
+            print(f"No game with id {args.values[0]}")
+            return 1
+        if args.action == "pin":
+            if not build_store.has("canary", args.values[1]):
+                print(f"Build {args.values[1]} is not installed")
+                return 1
+            game['build'] = args.values[1]
+        else:
+            game.pop('build', None)
+        config['games'] = registry.to_list()
+        save_config(config)
+    elif args.action == "gc":
+        pinned = [game['build'] for game in registry if game.get('build')]
+        # Games launched through the manager service must keep their build too
+        client = DaemonClient.connect()
+        in_use = [session['exe'] for session in client.request("GET", "/status")['sessions']] if client else []
+        for channel, version in build_store.gc(pinned, config.get("build_retention", BUILD_RETENTION), in_use):
+            print(f"Removed {channel} {version}")
+    return 0
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Xenia Manager")
+    parser.add_argument("--trace", metavar="FILE", help=f"Record a Chrome trace-event JSON of this run (or set {TRACE_ENV})")
+    subparsers = parser.add_subparsers(dest="command")
+
+    bench_menu = subparsers.add_parser("bench-menu", help="Time opening the games menu with synthetic libraries")
+    bench_menu.add_argument("--counts", type=int, nargs="+", default=[1000, 10000])
+    bench_menu.add_argument("--repeats", type=int, default=5)
+
+    bench_parser = subparsers.add_parser("bench", help="Time copies, staging, backups, extraction and config I/O on generated fixtures")
+    bench_parser.add_argument("--sizes", nargs="+", default=["small", "medium"], help="Any of small, medium, large")
+    bench_parser.add_argument("--repeats", type=int, default=3)
+    bench_parser.add_argument("--output", help="Write the results as JSON to this file")
+    bench_parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against")
+    bench_parser.add_argument("--threshold", type=float, default=0.2, help="Slowdown counted as a regression (0.2 = 20%%)")
+    bench_parser.add_argument("--fixtures", help="Generate fixtures in this folder and keep them, instead of a temp folder")
+
+    import_parser = subparsers.add_parser("import-games", help="Add many games at once from a CSV/JSON list or a folder scan")
+    import_source = import_parser.add_mutually_exclusive_group(required=True)
+    import_source.add_argument("file", nargs="?", help="CSV with name,path,image_path,title_id,game_file columns, or a JSON list")
+    import_source.add_argument("--scan", metavar="DIR", help="Import every game folder found in DIR")
+    import_parser.add_argument("--workers", type=int, default=8)
+
+    thin_parser = subparsers.add_parser("thin-games", help="Remove per-game emulator copies so games use the shared build")
+    thin_parser.add_argument("--dry-run", action="store_true", help="Only list the files that would be deleted")
+    thin_parser.add_argument("--yes", action="store_true", help="Delete without asking")
+
+    update_parser = subparsers.add_parser("update", help="Download updates, in parallel unless --sequential")
+    update_parser.add_argument("jobs", nargs="*", help=f"Any of {', '.join(sorted(UPDATE_JOBS))} (default: all)")
+    update_parser.add_argument("--sequential", action="store_true", help="Run one job at a time, for comparison")
+    update_parser.add_argument("--source", help="github, a mirror folder/file:// URL or a bundle .zip (default: update_source in config)")
+
+    check_parser = subparsers.add_parser("check-updates", help="Show whether newer builds exist, without downloading")
+    check_parser.add_argument("--force", action="store_true", help="Ignore the check interval (rate-limit backoff still applies)")
+
+    export_source_parser = subparsers.add_parser("export-update-source", help="Pack the active builds and patches for offline updates")
+    export_source_parser.add_argument("output", help="Folder for a mirror, or a .zip path for a single bundle")
+
+    patches_parser = subparsers.add_parser("patches", help="Index patch files and turn patches on or off")
+    patches_parser.add_argument("action", choices=["index", "list", "enable", "disable"])
+    patches_parser.add_argument("title_id", nargs="?")
+    patches_parser.add_argument("names", nargs="*", help="Patch names (default: all patches of the title)")
+    patches_parser.add_argument("--benchmark", action="store_true", help="index: time a cold build, a warm refresh and lookups")
+
+    cache_parser = subparsers.add_parser("cache", help="Report, prune and dedupe the SaveData shader/pipeline cache")
+    cache_parser.add_argument("action", choices=["report", "prune", "dedupe"])
+    cache_parser.add_argument("--older-than", type=float, metavar="DAYS", help="prune: files not written for DAYS")
+    cache_parser.add_argument("--max-size", type=float, metavar="GB", help="prune: least recently used files until under GB")
+    cache_parser.add_argument("--stale", action="store_true", help="prune: titles last cached under builds that are no longer installed")
+    cache_parser.add_argument("--dry-run", action="store_true")
+
+    daemon_parser = subparsers.add_parser("daemon", help="Run the resident manager service used by xenia_client.py and the GUI")
+    daemon_parser.add_argument("--port", type=int, default=0, help="Port on 127.0.0.1 (default: any free port)")
+    daemon_parser.add_argument("--build", help="Launch every game with this build folder, e.g. one made by stub-build")
+
+    stub_parser = subparsers.add_parser("stub-build", help="Write a build folder whose emulator is a stub script")
+    stub_parser.add_argument("folder")
+    stub_parser.add_argument("--seconds", type=float, default=5, help="How long the stub emulator keeps running")
+
+    perf_parser = subparsers.add_parser("perf", help="FPS, frame times, shader compiles and crashes per game, build and preset")
+    perf_parser.add_argument("--game", help="Only this game folder")
+
+    export_parser = subparsers.add_parser("export", help="Write the whole setup into one deduplicated archive")
+    export_parser.add_argument("output", help="Archive to write, or - for stdout")
+    export_parser.add_argument("--include-backups", action="store_true")
+    export_parser.add_argument("--workers", type=int, help="Hashing threads")
+
+    setup_import_parser = subparsers.add_parser("import", help="Rebuild a setup from an archive made by export")
+    setup_import_parser.add_argument("archive")
+    setup_import_parser.add_argument("--target", help="Folder to rebuild it in (default: this installation)")
+    setup_import_parser.add_argument("--workers", type=int, help="Extraction threads")
+    setup_import_parser.add_argument("--overwrite", action="store_true", help="Replace files that already exist")
+
+    sync_serve_parser = subparsers.add_parser("sync-serve", help="Let other manager instances sync SaveData with this one")
+    sync_serve_parser.add_argument("--host", default="127.0.0.1", help="Address to listen on, 0.0.0.0 for other machines")
+    sync_serve_parser.add_argument("--port", type=int, default=SYNC_PORT)
+    sync_serve_parser.add_argument("--secret", help="Shared secret peers must know (default: sync_secret in the config)")
+
+    sync_parser = subparsers.add_parser("sync", help="Two-way SaveData sync with a machine running sync-serve")
+    sync_parser.add_argument("peer", help="HOST or HOST:PORT")
+    sync_parser.add_argument("--secret", help="Shared secret (default: sync_secret in the config)")
+    sync_parser.add_argument("--dry-run", action="store_true", help="Only show which titles would move")
+
+    launch_stats_parser = subparsers.add_parser("launch-stats", help="Time to play per launch, with and without pre-staging")
+    launch_stats_parser.add_argument("--game", help="Only launches of this game folder")
+
+    plan_parser = subparsers.add_parser("plan", help="Show what a backup, restore or launch would copy, its disk space and ETA")
+    plan_parser.add_argument("operation", choices=["backup", "restore", "stage"])
+    plan_parser.add_argument("--all", action="store_true", help="Also list titles that would be skipped")
+
+    verify_parser = subparsers.add_parser("verify", help="Check SaveData, the backup or installed builds against their checksums")
+    verify_parser.add_argument("target", choices=["savedata", "backup", "builds", "all"], nargs="?", default="all")
+    verify_parser.add_argument("--full", action="store_true", help="Hash every file, not only ones whose size/mtime changed")
+    verify_parser.add_argument("--update", action="store_true", help="Accept the current files as known good")
+
+    repair_parser = subparsers.add_parser("repair-from-backup", help="Restore damaged or missing SaveData files from the backup")
+    repair_parser.add_argument("--dry-run", action="store_true")
+
+    builds_parser = subparsers.add_parser("builds", help="List, switch, pin and clean up installed Xenia builds")
+    builds_parser.add_argument("action", choices=["list", "activate", "rollback", "pin", "unpin", "gc"])
+    builds_parser.add_argument("values", nargs="*", help="activate: VERSION, pin: GAME_ID VERSION, unpin: GAME_ID")
+    builds_parser.add_argument("--channel", choices=sorted(BuildStore.CHANNELS), default="canary")
+
+    compat_parser = subparsers.add_parser("compat", help="Run each game for a fixed time and report how it went")
+    compat_parser.add_argument("--build", help="Folder containing xenia_canary.exe (default: Core/Xenia)")
+    compat_parser.add_argument("--preset", help="Config toml to run every game with (default: each game's own)")
+    compat_parser.add_argument("--time-budget", type=float, default=60, help="Seconds to run each game")
+    compat_parser.add_argument("--concurrency", type=int, default=max(1, (os.cpu_count() or 4) // 4))
+    compat_parser.add_argument("--filter", default="", help="Only run games whose name or folder contains this")
+    compat_parser.add_argument("--output", default="compat_report.json")
+
+    compare_parser = subparsers.add_parser("compat-compare", help="Compare two compat reports")
+    compare_parser.add_argument("old_report")
+    compare_parser.add_argument("new_report")
+    compare_parser.add_argument("--output", default="compat_comparison.json")
+
+    args = parser.parse_args(argv)
+    if args.trace:
+        tracer.enable(os.path.abspath(args.trace))
+
+    if args.command == "bench-menu":
+        benchmark_games_menu(args.counts, args.repeats)
+        return 0
+    if args.command == "bench":
+        unknown = set(args.sizes) - set(BENCH_SHADER_FILES)
+        if unknown:
+            parser.error(f"unknown sizes: {', '.join(sorted(unknown))}")
+        return run_bench_command(args, argv)
+    if args.command == "thin-games":
+        plan = thin_legacy_game_folders(dry_run=True)
+        total = sum(size for removed in plan.values() for _, size in removed)
+        for path, removed in plan.items():
+            print(f"{path}: {len(removed)} files, {sum(size for _, size in removed) / (1024 * 1024):.1f} MiB")
+            for rel_file, _ in removed:
+                print(f"  {rel_file}")
+        if not plan:
+            print("No game folder has its own copy of the emulator")
+            return 0
+        if args.dry_run:
+            print(f"Would free {total / (1024 * 1024):.1f} MiB")
+            return 0
+        if not args.yes and input(f"Delete these files ({total / (1024 * 1024):.1f} MiB)? [y/N] ").strip().lower() != 'y':
+            print("Nothing deleted")
+            return 1
+        results = thin_legacy_game_folders()
+        print(f"Freed {sum(size for removed in results.values() for _, size in removed) / (1024 * 1024):.1f} MiB")
+        return 0
+    if args.command == "update":
+        unknown = [name for name in args.jobs if name not in UPDATE_JOBS]
+        if unknown:
+            parser.error(f"unknown update job: {', '.join(unknown)}")
+        source = update_source_from_config(args.source) if args.source else None
+        results, wall = UpdateOrchestrator(args.jobs or sorted(UPDATE_JOBS), 1 if args.sequential else None, source=source).run()
+        for name, result in results.items():
+            print(f"{name}: {'ok' if result['ok'] else 'FAILED'} in {result['seconds']:.1f}s - {result['message']}")
+        print(f"Total wall time {wall:.1f}s")
+        return 0 if all(result['ok'] for result in results.values()) else 1
+    if args.command == "check-updates":
+        config = load_config()
+        checker = UpdateChecker(update_source_from_config(config.get("update_source"), config.get("github_api_url")),
+                                min_interval=config.get("update_check_interval", UPDATE_CHECK_INTERVAL))
+        for channel, release in checker.check(force=args.force).items():
+            status = "update available" if release['update_available'] else "up to date"
+            print(f"{channel}: {release['version']} ({release['size'] / (1024 * 1024):.0f} MB), installed {release['current']} - {status}")
+        return 0
+    if args.command == "export-update-source":
+        manifest = export_update_source(args.output)
+        print(f"Exported {', '.join(manifest) or 'nothing'} to {args.output}")
+        return 0
+    if args.command == "patches":
+        return run_patches_command(args)
+    if args.command == "cache":
+        return run_cache_command(args)
+    if args.command == "verify":
+        return run_verify_command(args)
+    if args.command == "daemon":
+        if DaemonClient.connect():
+            print("The manager service is already running", file=sys.stderr)
+            return 1
+        ManagerDaemon(args.port, os.path.abspath(args.build) if args.build else None).serve_forever()
+        return 0
+    if args.command == "stub-build":
+        write_stub_build(args.folder, args.seconds)
+        print(f"Stub build written to {args.folder}")
+        return 0
+    if args.command == "export":
+        start = time.perf_counter()
+        summary = export_setup(sys.stdout.buffer if args.output == "-" else args.output, args.include_backups, args.workers)
+        print(f"Exported {summary['files']} files ({summary['bytes'] / (1024 * 1024):.1f} MiB) as {summary['blobs']} unique blobs "
+              f"({summary['stored_bytes'] / (1024 * 1024):.1f} MiB before compression) in {time.perf_counter() - start:.1f}s",
+              file=sys.stderr)
+        return 0
+    if args.command == "import":
+        start = time.perf_counter()
+        try:
+            summary = import_setup(args.archive, os.path.abspath(args.target) if args.target else BASE_DIR,
+                                   args.workers, args.overwrite)
+        except (FileExistsError, ValueError) as e:
+            print(f"Import failed: {e}", file=sys.stderr)
+            return 1
+        print(f"Restored {summary['files']} files from {summary['blobs']} blobs in {time.perf_counter() - start:.1f}s")
+        return 0
+    if args.command == "sync-serve":
+        try:
+            server = SyncServer((args.host, args.port), args.secret or load_config().get("sync_secret"))
+        except ValueError as e:
+            parser.error(str(e))
+        logging.info(f"Serving SaveData sync on {args.host}:{server.server_address[1]}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+    if args.command == "sync":
+        host, _, port = args.peer.rpartition(':') if ':' in args.peer else (args.peer, '', SYNC_PORT)
+        try:
+            report = sync_with_peer(host, int(port), args.secret or load_config().get("sync_secret"), args.dry_run)
+        except (OSError, RuntimeError, ValueError, LookupError) as e:
+            print(f"Sync failed: {e}", file=sys.stderr)
+            return 1
+        for key in ("pulled", "pushed", "conflicts"):
+            print(f"{key}: {', '.join(report[key]) or '-'}")
+        if not args.dry_run:
+            print(f"Received {report['bytes_received'] / (1024 * 1024):.1f} MiB, sent {report['bytes_sent'] / (1024 * 1024):.1f} MiB "
+                  f"in {report['seconds']:.2f}s")
+        return 0
+    if args.command == "perf":
+        return run_perf_command(args)
+    if args.command == "launch-stats":
+        return run_launch_stats_command(args)
+    if args.command == "plan":
+        return run_plan_command(args)
+    if args.command == "repair-from-backup":
+        result = save_data_manifest().verify()
+        restored, older, lost = repair_from_backup(result, args.dry_run)
+        print(f"{'Would restore' if args.dry_run else 'Restored'} {len(restored)} files exactly, {len(older)} as older "
+              f"versions; {len(lost)} unrecoverable")
+        for rel in lost:
+            print(f"  lost: {rel}")
+        return 0 if not lost else 1
+    if args.command == "builds":
+        return run_builds_command(args)
+    if args.command == "compat":
+        needle = args.filter.lower()
+        games = [game for game in load_config().get('games', [])
+                 if needle in game['name'].lower() or needle in game['path'].lower()]
+        report = run_compatibility(games, args.build, args.preset, args.time_budget, args.concurrency)
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=4)
+        outcomes = [result['outcome'] for result in report['results'].values()]
+        print(", ".join(f"{outcome}: {outcomes.count(outcome)}" for outcome in sorted(set(outcomes))) or "No games matched")
+        return 0
+    if args.command == "compat-compare":
+        with open(args.old_report) as old_file, open(args.new_report) as new_file:
+            comparison = compare_compatibility(json.load(old_file), json.load(new_file))
+        with open(args.output, 'w') as file:
+            json.dump(comparison, file, indent=4)
+        print(", ".join(f"{key}: {value}" for key, value in comparison['summary'].items()))
+        return 0
+    if args.command == "import-games":
+        entries = scan_games(args.scan) if args.scan else read_game_list(args.file)
+        start = time.perf_counter()
+        games = import_games(entries, args.workers)
+        print(f"Imported {len(games)} games in {time.perf_counter() - start:.2f}s")
+        return 0
 
-if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = XeniaManager()
     window.show()
-    sys.exit(app.exec_())
+    return app.exec_()
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,62 @@
+""" ProcessSupervisor against stub emulator scripts, so it runs without Xenia. Run with python -m unittest. """
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+DATA_ROOT = tempfile.mkdtemp(prefix="xenia-manager-test-")
+os.environ.setdefault('XENIA_MANAGER_ROOT', DATA_ROOT)  # Before Xenia is imported, it resolves its folders then
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Xenia
+
+
+def tearDownModule():
+    shutil.rmtree(DATA_ROOT, ignore_errors=True)
+
+
+class ProcessSupervisorTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(dir=DATA_ROOT)
+        self.content_root = os.path.join(self.root, 'content')
+        os.makedirs(self.content_root)
+        self.supervisor = Xenia.ProcessSupervisor(os.path.join(self.root, 'Sessions'), sample_interval=0.05)
+
+    def start_stub(self, seconds):
+        # A stand-in emulator: a Python script that just stays running for a while
+        script = os.path.join(self.root, f'stub-{seconds}.py')
+        with open(script, 'w') as file:
+            file.write(f"import time\ntime.sleep({float(seconds)})\n")
+        command = [sys.executable, script, f"--content_root={self.content_root}"]
+        return self.supervisor.start("Stub Game", command, self.root)
+
+    def assertForgotten(self, session):
+        # on_exit callbacks run just after wait() returns
+        deadline = time.monotonic() + 5
+        while session.id in self.supervisor.sessions and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertNotIn(session.id, self.supervisor.sessions)
+
+    def test_running_session_is_tracked_until_it_exits(self):
+        session = self.start_stub(1)
+        self.assertIn(session, self.supervisor.running())
+        self.assertEqual(session.wait(30), 0)
+        self.assertForgotten(session)
+        self.assertTrue(os.path.isfile(os.path.join(session.session_dir, 'stats.json')))
+
+    def test_session_that_exits_at_once_is_forgotten(self):
+        session = self.start_stub(0)
+        self.assertEqual(session.wait(30), 0)
+        self.assertForgotten(session)
+        self.assertEqual(self.supervisor.running(), [])
+
+    def test_failed_start_leaves_no_session(self):
+        with self.assertRaises(OSError):
+            self.supervisor.start("Stub Game", [os.path.join(self.root, 'missing.exe')], self.root)
+        self.assertEqual(self.supervisor.sessions, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+""" SaveData sync between two manager instances on localhost: this process is one, a SyncServer on port 0 in a
+child process with its own data root is the other. Run with python -m unittest. """
+import io
+import json
+import os
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+DATA_ROOT = tempfile.mkdtemp(prefix="xenia-manager-test-")
+os.environ.setdefault('XENIA_MANAGER_ROOT', DATA_ROOT)  # Before Xenia is imported, it resolves its folders then
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import Xenia
+
+SECRET = "test-secret"
+SERVER_SCRIPT = f"""import sys
+import Xenia
+server = Xenia.SyncServer(('127.0.0.1', 0), {SECRET!r})
+print(server.server_address[1], flush=True)
+server.serve_forever()
+"""
+
+
+def tearDownModule():
+    shutil.rmtree(DATA_ROOT, ignore_errors=True)
+
+
+def write(root, rel, data, mtime=None):
+    path = os.path.join(root, *rel.split('/'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(data)
+    if mtime:
+        os.utime(path, (mtime, mtime))
+
+
+def read(root, rel):
+    with open(os.path.join(root, *rel.split('/')), 'rb') as file:
+        return file.read()
+
+
+def frame(header, payload=b''):
+    data = json.dumps(header).encode()
+    return struct.pack('>II', len(data), len(payload)) + data + payload
+
+
+class FrameTest(unittest.TestCase):
+    def test_keep_alives_are_skipped(self):
+        stream = io.BytesIO(frame({"op": "working"}) + frame({"op": "manifest", "files": {}}))
+        self.assertEqual(Xenia.recv_frame(stream), ({"op": "manifest", "files": {}}, b''))
+
+    def test_oversized_payload_is_refused(self):
+        stream = io.BytesIO(struct.pack('>II', 2, Xenia.SYNC_MAX_PAYLOAD + 1) + b'{}')
+        with self.assertRaisesRegex(ValueError, "too large"):
+            Xenia.recv_frame(stream)
+        self.assertEqual(stream.tell(), 8)
+
+
+class SyncTest(unittest.TestCase):
+    def setUp(self):
+        # The local side is whatever data root Xenia was imported with; start it from an empty SaveData
+        for path in (Xenia.SAVE_DATA_DIR, Xenia.SYNC_CONFLICTS_DIR):
+            shutil.rmtree(path, ignore_errors=True)
+        for path in (Xenia.SYNC_STATE_FILE, Xenia.SYNC_CHUNK_CACHE):
+            if os.path.exists(path):
+                os.remove(path)
+        self.local = Xenia.SAVE_DATA_DIR
+        os.makedirs(self.local)
+        self.peer_root = tempfile.mkdtemp(dir=DATA_ROOT)
+        self.remote = os.path.join(self.peer_root, 'SaveData')
+        os.makedirs(self.remote)
+        env = dict(os.environ, XENIA_MANAGER_ROOT=self.peer_root, PYTHONPATH=REPO_DIR, QT_QPA_PLATFORM='offscreen')
+        self.server = subprocess.Popen([sys.executable, '-c', SERVER_SCRIPT], env=env, cwd=self.peer_root,
+                                       stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        self.addCleanup(self.stop_server)
+        self.port = int(self.server.stdout.readline())
+
+    def stop_server(self):
+        self.server.kill()
+        self.server.wait()
+        self.server.stdout.close()
+
+    def sync(self, secret=SECRET):
+        return Xenia.sync_with_peer('127.0.0.1', self.port, secret)
+
+    def test_pull(self):
+        save = os.urandom(3 * Xenia.SYNC_CHUNK_SIZE + 100)
+        write(self.remote, 'content/4D5307E6/00000001/save.bin', save)
+        report = self.sync()
+        self.assertEqual(report["pulled"], ['content/4D5307E6'])
+        self.assertEqual(read(self.local, 'content/4D5307E6/00000001/save.bin'), save)
+
+    def test_push(self):
+        write(self.local, 'content/415607E6/00000001/save.bin', b'local save')
+        report = self.sync()
+        self.assertEqual(report["pushed"], ['content/415607E6'])
+        self.assertEqual(read(self.remote, 'content/415607E6/00000001/save.bin'), b'local save')
+
+    def test_conflict_keeps_the_losing_copy(self):
+        rel = 'content/4D5307E6/00000001/save.bin'
+        write(self.local, rel, b'first')
+        self.sync()
+        now = time.time()
+        write(self.local, rel, b'changed here', now - 60)
+        write(self.remote, rel, b'changed there', now)
+        report = self.sync()
+        self.assertEqual(report["conflicts"], ['content/4D5307E6'])
+        self.assertEqual(read(self.local, rel), b'changed there')
+        kept = [os.path.join(root, name) for root, dirs, files in os.walk(Xenia.SYNC_CONFLICTS_DIR) for name in files]
+        self.assertEqual(len(kept), 1)
+        with open(kept[0], 'rb') as file:
+            self.assertEqual(file.read(), b'changed here')
+
+    def test_wrong_secret_is_refused(self):
+        write(self.remote, 'content/4D5307E6/00000001/save.bin', b'remote save')
+        with self.assertRaisesRegex(RuntimeError, "wrong sync secret"):
+            self.sync("not the secret")
+        self.assertFalse(os.path.exists(os.path.join(self.local, 'content')))
+
+    def test_oversized_frame_is_refused_before_reading(self):
+        with socket.create_connection(('127.0.0.1', self.port), timeout=10) as sock:
+            stream = sock.makefile('rb')
+            Xenia.recv_frame(stream)  # hello
+            sock.sendall(struct.pack('>II', Xenia.SYNC_MAX_HELLO + 1, 0))
+            with self.assertRaisesRegex(RuntimeError, "too large"):
+                Xenia.recv_frame(stream)
+
+    def test_request_before_manifest_is_refused(self):
+        with socket.create_connection(('127.0.0.1', self.port), timeout=10) as sock:
+            stream = sock.makefile('rb')
+            hello, _ = Xenia.recv_frame(stream)
+            Xenia.send_frame(sock, {"op": "hello", "id": "test", "auth": Xenia.sync_auth(SECRET, hello['nonce'])})
+            Xenia.send_frame(sock, {"op": "get", "hashes": []})
+            with self.assertRaisesRegex(RuntimeError, "before 'manifest'"):
+                Xenia.recv_frame(stream)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+""" UpdateChecker against a local stand-in for the GitHub releases API. Run with python -m unittest. """
+import http.server
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+DATA_ROOT = tempfile.mkdtemp(prefix="xenia-manager-test-")
+os.environ.setdefault('XENIA_MANAGER_ROOT', DATA_ROOT)  # Before Xenia is imported, it resolves its folders then
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Xenia
+
+RELEASE = {"tag_name": "v1.0", "body": "Fixes",
+           "assets": [{"name": "xenia_canary.zip", "size": 123, "browser_download_url": "http://example.invalid/xenia_canary.zip"}]}
+
+
+def tearDownModule():
+    shutil.rmtree(DATA_ROOT, ignore_errors=True)
+
+
+class StubGitHub(http.server.BaseHTTPRequestHandler):
+    """ Answers each request with the next scripted (status, headers, body) and records what was asked """
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get('If-None-Match')))
+        status, headers, body = self.server.responses.pop(0)
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UpdateCheckerTest(unittest.TestCase):
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StubGitHub)
+        self.server.requests = []
+        self.server.responses = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        source = Xenia.GitHubSource(f"http://127.0.0.1:{self.server.server_address[1]}")
+        self.cache_file = os.path.join(tempfile.mkdtemp(dir=DATA_ROOT), 'release_cache.json')
+        self.checker = Xenia.UpdateChecker(source, cache_file=self.cache_file, min_interval=0)
+        self.checker.session.trust_env = False  # Never route the stub through a proxy from the environment
+
+    def check(self):
+        return self.checker.check(channels=("canary",))
+
+    def test_etag_then_not_modified(self):
+        self.server.responses = [(200, {"ETag": '"abc"'}, RELEASE), (304, {"ETag": '"abc"'}, None)]
+        first = self.check()
+        self.assertEqual(first["canary"]["version"], "v1.0")
+        second = self.check()
+        self.assertEqual(second["canary"]["version"], "v1.0")
+        self.assertEqual(self.server.requests, [(Xenia.CANARY_RELEASES_PATH, None), (Xenia.CANARY_RELEASES_PATH, '"abc"')])
+
+    def test_rate_limit_backs_off_until_reset(self):
+        reset = int(time.time()) + 3600
+        self.server.responses = [(200, {"ETag": '"abc"'}, RELEASE),
+                                 (403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(reset)}, {"message": "rate limited"})]
+        self.check()
+        # The cached release is still reported while rate limited
+        self.assertEqual(self.check()["canary"]["version"], "v1.0")
+        with open(self.cache_file) as file:
+            self.assertEqual(json.load(file)["github"]["canary"]["retry_after"], reset)
+        self.check()
+        self.assertEqual(len(self.server.requests), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
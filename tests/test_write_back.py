@@ -0,0 +1,73 @@
+""" Three-way write-back of staged save data, so instances of one title finishing out of order lose nothing. """
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+DATA_ROOT = tempfile.mkdtemp(prefix="xenia-manager-test-")
+os.environ.setdefault('XENIA_MANAGER_ROOT', DATA_ROOT)  # Before Xenia is imported, it resolves its folders then
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Xenia
+
+
+def tearDownModule():
+    shutil.rmtree(DATA_ROOT, ignore_errors=True)
+
+
+class WriteBackBaseTest(unittest.TestCase):
+    REL = os.path.join('content', 'title', 'save.bin')
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(dir=DATA_ROOT)
+        self.save_data = os.path.join(self.root, 'SaveData')
+        self.write(self.save_data, b'original')
+
+    def write(self, folder, data, mtime=None):
+        path = os.path.join(folder, self.REL)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(data)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def read(self, folder):
+        with open(os.path.join(folder, self.REL), 'rb') as file:
+            return file.read()
+
+    def stage(self, name):
+        instance = os.path.join(self.root, name)
+        Xenia.copy_tree(self.save_data, instance)
+        return instance, Xenia.WriteBackBase(instance, self.save_data)
+
+    def test_untouched_save_is_not_written_back(self):
+        instance, base = self.stage('a')
+        self.assertEqual(base.changed(), [])
+        self.assertFalse(base.write_back(self.REL))
+
+    def test_out_of_order_finish_keeps_both_sessions(self):
+        first, first_base = self.stage('first')
+        second, second_base = self.stage('second')
+        # The first instance saves last, but the second one finishes first
+        self.write(second, b'second', mtime=2000000000)
+        self.write(first, b'first', mtime=2000000100)
+        self.assertEqual(second_base.changed(), [self.REL])
+        self.assertTrue(second_base.write_back(self.REL))
+        self.assertFalse(first_base.write_back(self.REL))
+        self.assertEqual(self.read(self.save_data), b'second')
+        self.assertEqual(first_base.conflicts, {self.REL})
+        self.assertEqual(self.read(first_base.conflict_dir), b'first')
+
+    def test_repeated_write_back_of_own_saves(self):
+        instance, base = self.stage('a')
+        self.write(instance, b'one', mtime=2000000000)
+        self.assertTrue(base.write_back(self.REL))
+        self.write(instance, b'two', mtime=2000000100)
+        self.assertTrue(base.write_back(self.REL))
+        self.assertEqual(self.read(self.save_data), b'two')
+        self.assertEqual(base.conflicts, set())
+
+
+if __name__ == '__main__':
+    unittest.main()
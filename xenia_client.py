@@ -0,0 +1,99 @@
+""" Thin client for the resident manager service started with `Xenia.py daemon`. Only uses the standard library,
+so launching a game from a script or shortcut doesn't pay for importing PyQt5 and friends. """
+import os
+import sys
+import json
+import time
+import argparse
+import urllib.request
+import urllib.error
+
+DATA_ROOT_ENV = 'XENIA_MANAGER_ROOT'  # Overrides where all data lives, used by the benchmark fixtures
+DAEMON_FILE = 'daemon.json'  # Port and access token of the running service, readable only by its user
+
+def daemon_file_path():
+    base_path = os.environ.get(DATA_ROOT_ENV) or \
+        os.path.dirname(os.path.abspath(sys.executable if getattr(sys, 'frozen', False) else __file__))
+    return os.path.join(base_path, DAEMON_FILE)
+
+class DaemonClient:
+    def __init__(self, port, token, timeout=10):
+        self.url = f"http://127.0.0.1:{port}"
+        self.token = token
+        self.timeout = timeout
+        # Never route localhost requests through a configured HTTP proxy
+        self.opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+    @classmethod
+    def connect(cls, timeout=10):
+        """ Returns a client for the running service, or None if there is none """
+        try:
+            with open(daemon_file_path()) as file:
+                info = json.load(file)
+            client = cls(info['port'], info['token'], timeout)
+            client.request("GET", "/ping")
+            return client
+        except (OSError, ValueError, KeyError, RuntimeError):
+            return None
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.url + path, data=data, method=method,
+                                         headers={"X-Manager-Token": self.token, "Content-Type": "application/json"})
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                return json.load(response)
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.load(e).get("error", e.reason)
+            except ValueError:
+                message = e.reason
+            raise RuntimeError(f"{method} {path} failed: {message}") from None
+
+    def wait(self, task_id, poll_interval=0.5):
+        while True:
+            task = self.request("GET", f"/tasks/{task_id}")
+            if task['state'] in ("done", "failed"):
+                return task
+            time.sleep(poll_interval)
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Talk to the running Xenia Manager service")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status", help="Running sessions, recent tasks and active builds")
+    launch_parser = subparsers.add_parser("launch", help="Launch a game by id, name or folder")
+    launch_parser.add_argument("game")
+    launch_parser.add_argument("--wait", action="store_true", help="Return once the game has exited")
+    update_parser = subparsers.add_parser("update", help="Install the latest builds and patches")
+    update_parser.add_argument("jobs", nargs="*", default=["canary", "non-canary", "patches"])
+    update_parser.add_argument("--wait", action="store_true")
+    backup_parser = subparsers.add_parser("backup", help="Back up SaveData")
+    backup_parser.add_argument("--wait", action="store_true")
+    subparsers.add_parser("shutdown", help="Stop the service once running games have exited")
+    args = parser.parse_args(argv)
+
+    client = DaemonClient.connect()
+    if client is None:
+        print("The manager service is not running (start it with: Xenia.py daemon)", file=sys.stderr)
+        return 2
+    try:
+        if args.command == "status":
+            result = client.request("GET", "/status")
+        elif args.command == "launch":
+            result = client.request("POST", "/launch", {"game": args.game})
+        elif args.command == "update":
+            result = client.request("POST", "/update", {"jobs": args.jobs})
+        elif args.command == "backup":
+            result = client.request("POST", "/backup", {})
+        else:
+            result = client.request("POST", "/shutdown", {})
+        if getattr(args, 'wait', False):
+            result = client.wait(result['id'])
+    except (OSError, RuntimeError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(json.dumps(result, indent=4))
+    return 1 if result.get('state') == "failed" else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))